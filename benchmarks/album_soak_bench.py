@@ -0,0 +1,124 @@
+"""Длительная нагрузка альбомами: память и размеры служебных структур
+MediaGroupCollector и SerialDispatcher не должны расти с числом альбомов.
+
+Альбомы идут тем же путём, что в AlbumBot: части собирает коллектор,
+собранный альбом встаёт в очередь пользователя. Среди альбомов есть
+собранные по периоду тишины и отклонённые.
+
+При каждом замере проверяется, что память и размеры структур не вышли за
+постоянные пределы (не зависящие от числа альбомов); иначе прогон падает.
+
+Запуск из корня проекта: python -m benchmarks.album_soak_bench [альбомов]
+"""
+
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from database.deadlines import DeadlineScheduler
+from handlers.dispatcher import SerialDispatcher
+from handlers.media_groups import MAX_CLOSED, MediaGroupCollector
+
+ALBUMS = 1_000_000
+USERS = 1000
+REPORT_EVERY = 100_000
+# Сколько альбомов в сборке и в очередях допускается перед паузой генератора
+IDLE_LIMIT = 5000
+IDLE_CHECK_EVERY = 1000
+# Пределы: между проверками wait_idle успевает прийти ещё IDLE_CHECK_EVERY
+MAX_COLLECTING = IDLE_LIMIT + IDLE_CHECK_EVERY
+MAX_PENDING = IDLE_LIMIT + IDLE_CHECK_EVERY
+MAX_DEADLINES = MAX_CLOSED + MAX_COLLECTING
+MAX_MEMORY_KIB = 32 * 1024
+
+
+def part(media_group_id, user_id):
+    return SimpleNamespace(
+        media_group_id=media_group_id, from_user=SimpleNamespace(id=user_id)
+    )
+
+
+def wait_idle(collector, dispatcher, limit):
+    # Не даём генератору обогнать обработку: иначе растут очереди пулов,
+    # а не проверяемые структуры
+    while (
+        collector.stats()["collecting"] > limit
+        or dispatcher.stats()["pending"] > limit
+    ):
+        time.sleep(0.01)
+
+
+def check_bounds(collector, dispatcher, scheduler, memory_kib):
+    """Все структуры ограничены постоянными пределами"""
+    stats = collector.stats()
+    queues = dispatcher.stats()
+    limits = [
+        ("память, КиБ", memory_kib, MAX_MEMORY_KIB),
+        ("альбомов в сборке", stats["collecting"], MAX_COLLECTING),
+        ("закрытых отметок", stats["closed"], MAX_CLOSED),
+        ("собранных по тишине", stats["finished"], MAX_CLOSED),
+        ("очередей пользователей", queues["queues"], USERS),
+        ("апдейтов в очередях", queues["pending"], MAX_PENDING),
+        ("сроков в планировщике", scheduler.pending(), MAX_DEADLINES),
+    ]
+    for name, value, limit in limits:
+        assert value <= limit, f"{name}: {value:.0f} > {limit}"
+
+
+def main():
+    albums = int(sys.argv[1]) if len(sys.argv) > 1 else ALBUMS
+    # Короткий прогон тоже должен дать замеры, а не только итог
+    report_every = max(1, min(REPORT_EVERY, albums // 10))
+    scheduler = DeadlineScheduler()
+    collector = MediaGroupCollector(scheduler=scheduler)
+    dispatcher = SerialDispatcher()
+    handled = [0]
+
+    def handle(messages):
+        handled[0] += 1
+
+    def on_complete(messages):
+        dispatcher.submit(messages[0].from_user.id, handle, messages)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    print(f"{'альбомов':>9} {'память, КиБ':>12} {'сборка':>7} {'закрыто':>8} "
+          f"{'очереди':>8} {'сроки':>6} {'тишина, с':>10}")
+    for i in range(1, albums + 1):
+        media_group_id = f"album{i}"
+        user_id = i % USERS
+        kind = i % 20
+        if kind == 0:
+            # Отклонённый альбом: первая часть, отказ, остальные пропускаются
+            collector.add(part(media_group_id, user_id), on_complete)
+            collector.reject(media_group_id)
+            collector.add(part(media_group_id, user_id), on_complete)
+        else:
+            # Завершается по периоду тишины
+            for _ in range(2 + kind % 2):
+                collector.add(part(media_group_id, user_id), on_complete)
+
+        if i % IDLE_CHECK_EVERY == 0:
+            wait_idle(collector, dispatcher, limit=IDLE_LIMIT)
+        if i % report_every == 0:
+            stats = collector.stats()
+            queues = dispatcher.stats()
+            current, _ = tracemalloc.get_traced_memory()
+            print(
+                f"{i:>9} {current / 1024:>12.0f} {stats['collecting']:>7} "
+                f"{stats['closed']:>8} {queues['queues']:>8} "
+                f"{scheduler.pending():>6} {stats['quiet_period']:>10}"
+            )
+            check_bounds(collector, dispatcher, scheduler, current / 1024)
+
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    scheduler.shutdown()
+    collector.shutdown(wait=True)
+    dispatcher.shutdown()
+    print(f"{albums} альбомов за {elapsed:.1f} с, обработано до остановки: {handled[0]}")
+
+
+if __name__ == "__main__":
+    main()
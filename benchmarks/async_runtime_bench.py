@@ -0,0 +1,178 @@
+"""Пропускная способность бота: апдейты через SerialDispatcher, обработчик
+которых делает типичные для бота вызовы Bot API - удаляет сообщение с
+кнопками, присылает альбом предпросмотра и после него - сообщение с
+кнопками. Синхронный TeleBot (вызовы в потоках обработчиков) против
+AsyncRuntime (call_soon, продолжение через dispatcher.then).
+
+Вместо Telegram - локальный поддельный Bot API на aiohttp, который отвечает
+на любой метод через API_DELAY, как медленный round-trip до api.telegram.org.
+Лимиты Telegram сняты (планировщик с заведомо большими лимитами) - меряется
+сама обработка. Нужен aiohttp (pip install aiohttp).
+
+Запуск из корня проекта: python -m benchmarks.async_runtime_bench [апдейтов]
+"""
+
+import asyncio
+import sys
+import threading
+import time
+
+from aiohttp import web
+from telebot import TeleBot, apihelper, asyncio_helper, types
+
+from handlers.async_runtime import AsyncRuntime
+from handlers.dispatcher import SerialDispatcher
+from handlers.outbound import OutboundScheduler
+
+UPDATES = 1000
+API_DELAY = 0.05
+TOKEN = "123456:bench"
+PHOTOS = 3
+# Потоков диспетчера: как у бота и с запасом
+DISPATCH_WORKERS = (8, 64)
+CONCURRENCY = 500
+UNLIMITED = 10**9
+
+
+class FakeBotApi:
+    """/bot<token>/<method> -> {"ok": true, "result": ...}"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.port = None
+        self.requests = 0
+        self._ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._run, name="fake-bot-api", daemon=True).start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        # sendMediaGroup TeleBot отправляет GET-запросом
+        app.router.add_route("*", "/bot{token}/{method}", self._handle)
+        runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0, backlog=1024)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handle(self, request):
+        await request.read()
+        await asyncio.sleep(self.delay)
+        self.requests += 1
+        method = request.match_info["method"]
+        message = {
+            "message_id": self.requests,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "text": "ok",
+        }
+        if method == "deleteMessage":
+            result = True
+        elif method == "sendMediaGroup":
+            result = [message] * PHOTOS
+        else:
+            result = message
+        return web.json_response({"ok": True, "result": result})
+
+
+class Progress:
+    def __init__(self, expected):
+        self.failed = 0
+        self._left = expected
+        self._cond = threading.Condition()
+
+    def done(self, error=None):
+        with self._cond:
+            self._left -= 1
+            self.failed += error is not None
+            self._cond.notify_all()
+
+    def wait(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._left <= 0)
+
+
+MEDIA = [types.InputMediaPhoto(f"photo{i}") for i in range(PHOTOS)]
+
+
+def bench_threaded(updates, workers):
+    bot = TeleBot(TOKEN, threaded=False)
+    dispatcher = SerialDispatcher(workers=workers)
+    progress = Progress(updates)
+
+    def handle(user_id):
+        try:
+            bot.delete_message(user_id, 1)
+            bot.send_media_group(user_id, MEDIA)
+            bot.send_message(user_id, "Все верно?")
+        except Exception as e:
+            progress.done(e)
+        else:
+            progress.done()
+
+    started = time.perf_counter()
+    for i in range(updates):
+        dispatcher.submit(1000 + i, handle, 1000 + i)
+    threads = threading.active_count()
+    progress.wait()
+    elapsed = time.perf_counter() - started
+    dispatcher.shutdown()
+    return elapsed, progress.failed, threads
+
+
+def bench_async(updates, workers):
+    scheduler = OutboundScheduler(
+        global_rate=UNLIMITED,
+        global_burst=UNLIMITED,
+        private_rate=UNLIMITED,
+        private_burst=UNLIMITED,
+    )
+    runtime = AsyncRuntime(TOKEN, max_concurrency=CONCURRENCY, scheduler=scheduler)
+    dispatcher = SerialDispatcher(workers=workers)
+    progress = Progress(updates)
+
+    def handle(user_id):
+        runtime.call_soon("delete_message", user_id, 1)
+
+        def ask(_):
+            runtime.call_soon("send_message", user_id, "Все верно?").add_done_callback(
+                lambda done: progress.done(done.exception())
+            )
+
+        dispatcher.then(
+            runtime.call_soon("send_media_group", user_id, MEDIA), ask, on_error=progress.done
+        )
+
+    started = time.perf_counter()
+    for i in range(updates):
+        dispatcher.submit(1000 + i, handle, 1000 + i)
+    threads = threading.active_count()
+    progress.wait()
+    elapsed = time.perf_counter() - started
+    dispatcher.shutdown()
+    runtime.shutdown()
+    return elapsed, progress.failed, threads
+
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else UPDATES
+    api = FakeBotApi(API_DELAY)
+    url = f"http://127.0.0.1:{api.port}/bot{{0}}/{{1}}"
+    apihelper.API_URL = url
+    asyncio_helper.API_URL = url
+
+    print(f"{updates} апдейтов по 3 запроса к API, ответ API через {API_DELAY * 1000:.0f} мс")
+    print(f"{'режим':<26} {'апдейтов/с':>10} {'время, с':>9} {'потоков':>8} {'ошибок':>7}")
+    for mode, bench in (("threaded", bench_threaded), ("async", bench_async)):
+        for workers in DISPATCH_WORKERS:
+            elapsed, failed, threads = bench(updates, workers)
+            print(f"{f'{mode}, {workers} потоков':<26} {updates / elapsed:>10.0f} "
+                  f"{elapsed:>9.2f} {threads:>8} {failed:>7}")
+
+
+if __name__ == "__main__":
+    main()
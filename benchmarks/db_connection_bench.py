@@ -0,0 +1,98 @@
+"""Замер задержки одного обращения к БД: новое соединение на вызов против
+постоянного соединения потока.
+
+Запуск из корня проекта: python -m benchmarks.db_connection_bench
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+
+from database.connection import Database
+
+CALLS = 2000
+
+
+def setup(path):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """CREATE TABLE judges
+                (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                username TEXT,
+                full_name TEXT NOT NULL)"""
+    )
+    conn.executemany(
+        "INSERT INTO judges (user_id, username, full_name) VALUES (?, ?, ?)",
+        [(i, f"user{i}", f"Judge {i}") for i in range(500)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def old_read(path, user_id):
+    conn = sqlite3.connect(path)
+    try:
+        c = conn.cursor()
+        c.execute("SELECT 1 FROM judges WHERE user_id = ?", (user_id,))
+        return c.fetchone() is not None
+    finally:
+        conn.close()
+
+
+def old_write(path, user_id):
+    conn = sqlite3.connect(path)
+    try:
+        c = conn.cursor()
+        c.execute(
+            "UPDATE judges SET username = ? WHERE user_id = ?", (f"u{user_id}", user_id)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def new_read(database, user_id):
+    return (
+        database.execute(
+            "SELECT 1 FROM judges WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        is not None
+    )
+
+
+def new_write(database, user_id):
+    with database.transaction() as c:
+        c.execute(
+            "UPDATE judges SET username = ? WHERE user_id = ?", (f"u{user_id}", user_id)
+        )
+
+
+def measure(func, target):
+    started = time.perf_counter()
+    for i in range(CALLS):
+        func(target, i % 500)
+    return (time.perf_counter() - started) / CALLS * 1_000_000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        setup(path)
+        database = Database(path)
+
+        results = [
+            ("чтение, connect на вызов", measure(old_read, path)),
+            ("чтение, постоянное соединение", measure(new_read, database)),
+            ("запись, connect на вызов", measure(old_write, path)),
+            ("запись, постоянное соединение + WAL", measure(new_write, database)),
+        ]
+        database.close_all()
+
+    for name, usec in results:
+        print(f"{name:<40} {usec:8.1f} мкс/вызов")
+
+
+if __name__ == "__main__":
+    main()
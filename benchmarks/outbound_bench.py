@@ -0,0 +1,264 @@
+"""Наплыв работ на конкурс: пересылки альбомов в чат конкурса, уведомления
+и ответы пользователям одновременно.
+
+Апдейты обрабатываются так же, как в боте: через SerialDispatcher с тем же
+числом потоков. Сравниваются три варианта: без планировщика исходящих
+запросов (OutboundScheduler), с планировщиком и пересылками прямо в потоках
+обработчиков и с планировщиком и очередью пересылок (RelayQueue). Задержка
+ответа считается от постановки апдейта в очередь: пока поток обработчика
+ждёт токенов для пересылки, ответы другим пользователям стоят в очереди.
+
+Поддельный Bot API на http.server отвечает через API_DELAY и, как Telegram,
+возвращает 429 с retry_after при превышении лимитов (общего, на личный чат
+и на группу). Все лимиты и там, и в планировщике ускорены в SPEED раз,
+чтобы прогон занимал секунды, а не минуты.
+
+Запуск из корня проекта: python -m benchmarks.outbound_bench
+"""
+
+import json
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from telebot import TeleBot, apihelper, types
+
+from handlers import outbound as limits
+from handlers.dispatcher import SerialDispatcher
+from handlers.outbound import (
+    Lane,
+    OutboundScheduler,
+    RelayQueue,
+    TokenBucket,
+    api_call,
+)
+
+SPEED = 10
+API_DELAY = 0.02
+TOKEN = "123456:bench"
+CONTEST_CHAT = -1001
+WORKS = 20  # Работ, отправленных разом: альбом из PHOTOS фото и текст
+PHOTOS = 5
+NOTIFICATIONS = 200
+USERS = 20
+REPLIES = 5  # Сообщений от каждого пользователя, на каждое - ответ
+
+
+class _FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        params.update(parse_qs(body.decode(errors="ignore")))
+        method = url.path.rsplit("/", 1)[-1]
+        chat_id = int(params["chat_id"][0]) if "chat_id" in params else None
+        cost = len(json.loads(params["media"][0])) if method == "sendMediaGroup" else 1
+        time.sleep(API_DELAY)
+        retry_after = self.server.limit(chat_id, cost)
+        if retry_after:
+            self._reply(429, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {retry_after}",
+                "parameters": {"retry_after": retry_after},
+            })
+            return
+        message = {"message_id": 1, "date": 0, "chat": {"id": chat_id, "type": "private"}}
+        result = [message] * cost if method == "sendMediaGroup" else message
+        self._reply(200, {"ok": True, "result": result})
+
+    # sendMediaGroup telebot отправляет GET-запросом
+    do_GET = do_POST
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeBotApi(ThreadingHTTPServer):
+    """Bot API с лимитами Telegram: вместо отправки - 429"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _FakeApiHandler)
+        self._lock = threading.Lock()
+        self.reset()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def reset(self):
+        now = time.monotonic()
+        self._global = TokenBucket(limits.GLOBAL_RATE * SPEED, limits.GLOBAL_BURST, now)
+        self._chats = {}
+        self.rejected = 0
+
+    def limit(self, chat_id, cost):
+        """0 - запрос принят, иначе retry_after"""
+        with self._lock:
+            now = time.monotonic()
+            buckets = [self._global]
+            if chat_id is not None:
+                if chat_id not in self._chats:
+                    rate, burst = (
+                        (limits.GROUP_RATE, limits.GROUP_BURST) if chat_id < 0
+                        else (limits.PRIVATE_RATE, limits.PRIVATE_BURST)
+                    )
+                    self._chats[chat_id] = TokenBucket(rate * SPEED, burst, now)
+                buckets.append(self._chats[chat_id])
+            wait = max(bucket.wait_time(now, cost) for bucket in buckets)
+            if wait > 0:
+                self.rejected += 1
+                # Telegram присылает целые секунды; при ускорении - доли
+                return round(max(wait, 0.05), 2)
+            for bucket in buckets:
+                bucket.take(cost)
+            return 0
+
+
+class Results:
+    """Задержки и ошибки по приоритетам; ждёт, пока придут все результаты"""
+
+    def __init__(self, expected):
+        self.latencies = {lane: [] for lane in Lane}
+        self.errors = {lane: 0 for lane in Lane}
+        self._expected = expected
+        self._cond = threading.Condition()
+
+    def add(self, lane, started, error=None):
+        with self._cond:
+            self.latencies[lane].append(time.perf_counter() - started)
+            if error is not None:
+                self.errors[lane] += 1
+            self._expected -= 1
+            self._cond.notify_all()
+
+    def timed(self, lane, started, func, *args, **kwargs):
+        try:
+            func(*args, **kwargs)
+        except apihelper.ApiException as e:
+            self.add(lane, started, e)
+        else:
+            self.add(lane, started)
+
+    def wait(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._expected <= 0)
+
+
+def run(bot, scheduler, relay_queue):
+    results = Results(WORKS * 2 + NOTIFICATIONS + USERS * REPLIES)
+    lane = scheduler.lane if scheduler else (lambda _: nullcontext())
+    # Столько же потоков, сколько у диспетчера бота
+    dispatcher = SerialDispatcher()
+    media = [types.InputMediaPhoto(f"photo{i}") for i in range(PHOTOS)]
+
+    def relay_calls():
+        return (
+            api_call("send_media_group", CONTEST_CHAT, media),
+            api_call("send_message", CONTEST_CHAT, "работа"),
+        )
+
+    def submit_work(user_id, started):
+        # Обработчик отправки работы: пересылка в чат конкурса и ответ
+        if relay_queue is None:
+            try:
+                with lane(Lane.RELAY):
+                    for method, args, kwargs in relay_calls():
+                        getattr(bot, method)(*args, **kwargs)
+            except apihelper.ApiException as e:
+                results.add(Lane.RELAY, started, e)
+            else:
+                results.add(Lane.RELAY, started)
+        else:
+            relay_queue.put(*relay_calls()).add_done_callback(
+                lambda done: results.add(Lane.RELAY, started, done.exception())
+            )
+        results.timed(Lane.REPLY, started, bot.send_message, user_id, "работа принята")
+
+    def reply(user_id, started):
+        results.timed(Lane.REPLY, started, bot.send_message, user_id, "ответ")
+
+    def notify():
+        # Уведомления рассылает свой поток (NotificationQueue)
+        with lane(Lane.NOTIFY):
+            for i in range(NOTIFICATIONS):
+                results.timed(
+                    Lane.NOTIFY, time.perf_counter(), bot.send_message, 50000 + i, "уведомление"
+                )
+
+    def user(user_id):
+        for _ in range(REPLIES):
+            dispatcher.submit(user_id, reply, user_id, time.perf_counter())
+            time.sleep(0.1)
+
+    started = time.perf_counter()
+    for i in range(WORKS):
+        dispatcher.submit(2000 + i, submit_work, 2000 + i, time.perf_counter())
+    threads = [threading.Thread(target=notify)]
+    threads += [threading.Thread(target=user, args=(1000 + i,)) for i in range(USERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.wait()
+    elapsed = time.perf_counter() - started
+    dispatcher.shutdown()
+    return elapsed, results.latencies, results.errors
+
+
+def report(title, elapsed, latencies, errors, rejected):
+    print(f"\n{title}: {elapsed:.1f} с, ответов 429 от API: {rejected}")
+    print(f"{'очередь':<8} {'запросов':>9} {'ошибок':>7} {'p50, мс':>8} {'p95, мс':>8}")
+    for lane in Lane:
+        values = sorted(latencies[lane])
+        print(
+            f"{lane.name.lower():<8} {len(values):>9} {errors[lane]:>7} "
+            f"{values[len(values) // 2] * 1000:>8.0f} "
+            f"{values[int(len(values) * 0.95)] * 1000:>8.0f}"
+        )
+
+
+def main():
+    api = FakeBotApi()
+    apihelper.API_URL = f"http://127.0.0.1:{api.server_address[1]}/bot{{0}}/{{1}}"
+    bot = TeleBot(TOKEN, threaded=False)
+
+    print(f"Лимиты Telegram ускорены в {SPEED} раз, ответ API через {API_DELAY * 1000:.0f} мс")
+    elapsed, latencies, errors = run(bot, None, None)
+    report("Без планировщика", elapsed, latencies, errors, api.rejected)
+
+    for title, queued in (
+        ("С планировщиком, пересылки в потоках обработчиков", False),
+        ("С планировщиком и очередью пересылок", True),
+    ):
+        api.reset()
+        scheduler = OutboundScheduler(
+            global_rate=limits.GLOBAL_RATE * SPEED,
+            private_rate=limits.PRIVATE_RATE * SPEED,
+            group_rate=limits.GROUP_RATE * SPEED,
+        )
+        scheduler.install()
+        relay_queue = RelayQueue(bot, scheduler=scheduler) if queued else None
+        try:
+            elapsed, latencies, errors = run(bot, scheduler, relay_queue)
+        finally:
+            apihelper.CUSTOM_REQUEST_SENDER = None
+            if relay_queue is not None:
+                relay_queue.shutdown()
+        report(title, elapsed, latencies, errors, api.rejected)
+        print(f"\n{scheduler.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Конкурентная загрузка альбомов: хранилище сессий под одной блокировкой
+против хранилища с частями (database.sessions.SessionStore).
+
+Каждое фото альбома проходит тот же путь, что в обработчиках: фильтр
+обработчика (contains), чтение работы (get), продление активности (get)
+и сохранение при первом фото (set).
+
+Запуск из корня проекта: python -m benchmarks.session_contention_bench
+"""
+
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import RLock
+
+from database.deadlines import DeadlineScheduler
+from database.sessions import SessionStore
+
+USERS = 500
+PHOTOS = 10
+THREADS = 64
+FLOW = "contest"
+
+
+class GlobalLockStore:
+    """Хранилище до разбиения на части: одна блокировка, скользящий срок
+    переносится в планировщике при каждом чтении"""
+
+    def __init__(self, scheduler, ttl=600):
+        self.scheduler = scheduler
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = RLock()
+
+    def _schedule(self, key, entry):
+        if entry[1] is not None:
+            entry[1].cancel()
+        entry[1] = self.scheduler.call_later(self.ttl, self._expire, key)
+
+    def _expire(self, key):
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def get(self, user_id, flow, default=None):
+        with self._lock:
+            entry = self._sessions.get((user_id, flow))
+            if entry is None:
+                return default
+            self._sessions.move_to_end((user_id, flow))
+            self._schedule((user_id, flow), entry)
+            return entry[0]
+
+    def contains(self, user_id, flow):
+        with self._lock:
+            return (user_id, flow) in self._sessions
+
+    def set(self, user_id, flow, value):
+        with self._lock:
+            old = self._sessions.get((user_id, flow))
+            if old is not None:
+                old[1].cancel()
+            entry = self._sessions[(user_id, flow)] = [value, None]
+            self._schedule((user_id, flow), entry)
+
+
+def upload_photo(store, user_id, index):
+    if index == 0:
+        store.set(user_id, FLOW, [])
+    # Фильтры обработчиков фото и медиагрупп
+    store.contains(user_id, FLOW)
+    store.contains(user_id, FLOW)
+    photos = store.get(user_id, FLOW)
+    if photos is not None:
+        photos.append(index)
+    # update_last_activity
+    store.get(user_id, FLOW)
+
+
+def run(store):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        # Альбомы приходят вперемешку: сначала первые фото всех пользователей
+        for index in range(PHOTOS):
+            for user_id in range(USERS):
+                pool.submit(upload_photo, store, user_id, index)
+    elapsed = time.perf_counter() - started
+    photos = USERS * PHOTOS
+    return photos / elapsed, elapsed / photos * 1_000_000
+
+
+def main():
+    results = []
+    for name, factory in (
+        ("одна блокировка", lambda s: GlobalLockStore(s)),
+        ("64 части, чтение без блокировок", lambda s: SessionStore(scheduler=s)),
+    ):
+        scheduler = DeadlineScheduler()
+        results.append((name, *run(factory(scheduler))))
+        scheduler.shutdown()
+
+    print(f"{USERS} альбомов по {PHOTOS} фото, {THREADS} потоков")
+    for name, per_second, usec in results:
+        print(f"{name:<34} {per_second:9.0f} фото/с  {usec:6.1f} мкс/фото")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Память, занятая черновиками контента: словари-копии шаблона против
+классов со __slots__ (database.db_classes).
+
+Запуск из корня проекта: python -m benchmarks.session_memory_bench
+"""
+
+import tracemalloc
+
+from database.db_classes import DRAFT_TYPES, ContestSubmission
+
+DRAFTS = 10000
+PHOTOS = 2
+
+# Шаблоны, из которых раньше копировались черновики
+OLD_DEFAULTS = {
+    "news": {
+        "type": "news",
+        "photos": [],
+        "description": None,
+        "speaker": None,
+        "island": None,
+        "progress_message_id": None,
+    },
+    "code": {
+        "type": "code",
+        "code": None,
+        "photos": [],
+        "speaker": None,
+        "island": None,
+        "progress_message_id": None,
+    },
+    "pocket": {"type": "pocket", "photos": [], "media_group_id": None},
+}
+
+
+def photo(i):
+    return {"file_id": f"file{i}", "unique_id": f"unique{i}"}
+
+
+def old_draft(content_type, i):
+    data = OLD_DEFAULTS[content_type].copy()
+    # copy() неглубокий - свой список нужно создавать явно
+    data["photos"] = [photo(i + k) for k in range(PHOTOS)]
+    return data
+
+
+def new_draft(content_type, i):
+    data = DRAFT_TYPES[content_type]()
+    data.photos.extend(photo(i + k) for k in range(PHOTOS))
+    return data
+
+
+class DictSubmission:
+    """ContestSubmission до __slots__: те же поля в __dict__"""
+
+
+def old_submission(i):
+    submission = DictSubmission()
+    submission.__dict__.update(
+        {name: None for name in ContestSubmission.__slots__}, photos=[photo(i)]
+    )
+    return submission
+
+
+def new_submission(i):
+    submission = ContestSubmission()
+    submission.photos.append(photo(i))
+    return submission
+
+
+def measure(factory, *args):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    drafts = [factory(*args, i) for i in range(DRAFTS)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del drafts
+    return size
+
+
+def main():
+    results = []
+    for content_type in OLD_DEFAULTS:
+        results.append((f"{content_type}, словарь", measure(old_draft, content_type)))
+        results.append((f"{content_type}, __slots__", measure(new_draft, content_type)))
+    results.append(("ContestSubmission, __dict__", measure(old_submission)))
+    results.append(("ContestSubmission, __slots__", measure(new_submission)))
+
+    print(f"{DRAFTS} черновиков по {PHOTOS} фото")
+    for name, size in results:
+        print(f"{name:<32} {size / 1024:9.0f} КиБ  {size / DRAFTS:6.0f} байт/шт")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Пропускная способность приёма апдейтов в режиме вебхука без Telegram:
+апдейты отправляются POST-запросами на локальный WebhookServer, как это
+делает Telegram (до 40 соединений, заголовок с секретом).
+
+Апдейты - записанные (JSON по строке на апдейт) или сгенерированные
+текстовые сообщения от USERS пользователей. Обработчик имитирует вызов
+API задержкой HANDLER_DELAY: ответ вебхуку от неё не зависит.
+
+Запуск из корня проекта: python -m benchmarks.webhook_ingest_bench [updates.jsonl]
+"""
+
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+# Токен нужен только для создания объекта бота, запросов к Telegram нет
+os.environ.setdefault("BOT_TOKEN", "123456:bench")
+
+from bot_instance import AlbumBot  # noqa: E402
+from handlers.dispatcher import SerialDispatcher  # noqa: E402
+from handlers.media_groups import MediaGroupCollector  # noqa: E402
+from handlers.webhook import SECRET_HEADER, WebhookServer  # noqa: E402
+
+UPDATES = 20000
+USERS = 1000
+CONNECTIONS = 40
+HANDLER_DELAY = 0.005
+SECRET = "bench-secret"
+
+
+def generate_updates(count):
+    for i in range(1, count + 1):
+        user_id = 1000 + i % USERS
+        yield {
+            "update_id": i,
+            "message": {
+                "message_id": i,
+                "date": 0,
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "bench"},
+                "text": f"сообщение {i}",
+            },
+        }
+
+
+def load_updates(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def post(connection, body, secret=SECRET):
+    connection.request(
+        "POST",
+        "/webhook",
+        body=body,
+        headers={"Content-Type": "application/json", SECRET_HEADER: secret},
+    )
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+
+def client(port, bodies, latencies, errors):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    for body in bodies:
+        started = time.perf_counter()
+        if post(connection, body) != 200:
+            errors.append(body)
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+
+
+def main():
+    updates = load_updates(sys.argv[1]) if len(sys.argv) > 1 else list(generate_updates(UPDATES))
+    bodies = [json.dumps(update).encode() for update in updates]
+
+    dispatcher = SerialDispatcher(workers=16)
+    bot = AlbumBot("123456:bench", collector=MediaGroupCollector(), serial=dispatcher)
+    handled = []
+
+    @bot.message_handler(func=lambda message: True, content_types=["text", "photo"])
+    def handle(message):
+        time.sleep(HANDLER_DELAY)
+        handled.append(message.message_id)
+
+    server = WebhookServer(bot, port=0, secret_token=SECRET)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Запрос с чужим секретом должен быть отклонён
+    connection = http.client.HTTPConnection("127.0.0.1", server.port)
+    assert post(connection, bodies[0], secret="wrong") == 403
+    connection.close()
+
+    latencies, errors = [], []
+    started = time.perf_counter()
+    clients = [
+        threading.Thread(
+            target=client,
+            args=(server.port, bodies[i::CONNECTIONS], latencies, errors),
+        )
+        for i in range(CONNECTIONS)
+    ]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    ingested = time.perf_counter() - started
+
+    dispatcher.shutdown()
+    processed = time.perf_counter() - started
+    server.shutdown()
+    server.server_close()
+
+    latencies.sort()
+    print(f"{len(bodies)} апдейтов, {CONNECTIONS} соединений, обработчик {HANDLER_DELAY * 1000:.0f} мс")
+    print(f"приём:     {len(bodies) / ingested:8.0f} апдейтов/с")
+    print(f"ответ p50: {latencies[len(latencies) // 2] * 1000:8.2f} мс")
+    print(f"ответ p99: {latencies[int(len(latencies) * 0.99)] * 1000:8.2f} мс")
+    print(f"обработка: {len(handled) / processed:8.0f} апдейтов/с ({len(handled)} обработано)")
+    print(f"ошибки:    {len(errors)}, вебхук: {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
 import os
+import threading
+import time
+from collections import OrderedDict
 
 import telebot
 from dotenv import load_dotenv
 from telebot.storage import StateMemoryStorage  # Импорт хранилища состояний
 
+from handlers.dispatcher import dispatcher
+from handlers.media_groups import albums
+
 # Загружаем переменные из .env
 load_dotenv()
 
@@ -12,4 +18,131 @@ TOKEN = os.getenv("BOT_TOKEN")
 if not TOKEN:
     raise ValueError("Токен не найден в .env!")
 
-bot = telebot.TeleBot(TOKEN, state_storage=StateMemoryStorage())
+
+# Ответ пользователю, чей апдейт отброшен из-за переполненной очереди
+OVERFLOW_TEXT = "⏳ Слишком много сообщений подряд - подождите и повторите"
+OVERFLOW_REPLY_INTERVAL = 30
+MAX_OVERFLOW_REPLIES = 1000
+
+
+def update_user_id(update):
+    """Пользователь, от которого пришёл апдейт (None - неизвестно)"""
+    for event in (update.message, update.edited_message, update.callback_query):
+        if event is not None and event.from_user is not None:
+            return event.from_user.id
+    return None
+
+
+class AlbumBot(telebot.TeleBot):
+    """TeleBot, который обрабатывает апдейты каждого пользователя строго по
+    очереди и передаёт альбом обработчикам целиком
+
+    Апдейты раскладываются по очередям пользователей SerialDispatcher:
+    следующий апдейт пользователя начинает обрабатываться только после
+    предыдущего, а разные пользователи обрабатываются параллельно. Поэтому
+    бот создаётся с threaded=False - потоки даёт диспетчер.
+
+    Части альбома (сообщения с общим media_group_id) не попадают
+    в обработчики по одной: их собирает MediaGroupCollector, и обработчики
+    вызываются один раз - с первой частью, у которой message.album - все
+    части по порядку (см. handlers.media_groups.album_of). Место альбома
+    в очереди занимается при первой части, поэтому апдейты, присланные
+    после альбома (например, "готово"), обрабатываются после него.
+    """
+
+    def __init__(self, *args, collector=albums, serial=dispatcher, **kwargs):
+        super().__init__(*args, threaded=False, **kwargs)
+        self.collector = collector
+        self.serial = serial
+        # media_group_id -> место альбома в очереди пользователя
+        self._album_slots = {}
+        self._album_lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        # Кому уже ответили о переполнении очереди: user_id -> время ответа
+        self._overflow_replies = OrderedDict()
+
+    def process_new_updates(self, updates):
+        for update in updates:
+            # Отмечаем сразу: следующий getUpdates не должен вернуть апдейты,
+            # которые ещё ждут в очередях. Под замком - потоки вебхука
+            # вызывают process_new_updates параллельно
+            with self._update_lock:
+                if update.update_id > self.last_update_id:
+                    self.last_update_id = update.update_id
+            message = update.message
+            if message is not None and message.media_group_id and message.from_user:
+                # Части альбома собираются сразу, мимо очереди: в очереди
+                # пользователя альбом занимает место первой части
+                self._collect(message)
+                continue
+            user_id = update_user_id(update)
+            if not self.serial.submit(user_id, super().process_new_updates, [update]):
+                self._overflow(user_id, update)
+
+    def _collect(self, message):
+        media_group_id = message.media_group_id
+        user_id = message.from_user.id
+        with self._album_lock:
+            new = media_group_id not in self._album_slots
+            if new:
+                slot = self.serial.reserve(user_id)
+                if slot is not None:
+                    self._album_slots[media_group_id] = slot
+        if new and slot is None:
+            # Очередь пользователя переполнена - альбом не примем целиком,
+            # остальные его части пропускаются
+            self.collector.reject(media_group_id)
+            self._overflow(user_id, None)
+            return
+        accepted = self.collector.add(
+            message, self._process_album, on_discard=self._discard_album
+        )
+        if new and not accepted:
+            # Альбом уже закрыт - место не понадобится
+            self._discard_album([message])
+
+    def _take_slot(self, messages):
+        with self._album_lock:
+            return self._album_slots.pop(messages[0].media_group_id, None)
+
+    def _process_album(self, messages):
+        first = messages[0]
+        first.album = messages
+        slot = self._take_slot(messages)
+        if slot is not None:
+            self.serial.fill(slot, super().process_new_messages, [first])
+        elif not self.serial.submit(
+            first.from_user.id, super().process_new_messages, [first]
+        ):
+            self._overflow(first.from_user.id, None)
+
+    def _discard_album(self, messages):
+        slot = self._take_slot(messages)
+        if slot is not None:
+            self.serial.cancel(slot)
+
+    def _overflow(self, user_id, update):
+        """Апдейт отброшен (очередь пользователя переполнена) - говорим об
+        этом пользователю, но не чаще раза в OVERFLOW_REPLY_INTERVAL"""
+        if user_id is None:
+            return
+        now = time.monotonic()
+        with self._album_lock:
+            replied = self._overflow_replies.get(user_id)
+            if replied is not None and now - replied < OVERFLOW_REPLY_INTERVAL:
+                return
+            self._overflow_replies[user_id] = now
+            self._overflow_replies.move_to_end(user_id)
+            while len(self._overflow_replies) > MAX_OVERFLOW_REPLIES:
+                self._overflow_replies.popitem(last=False)
+        call = update.callback_query if update is not None else None
+        # Отправка - в пуле, без порядка: поток приёма апдейтов не ждёт сеть
+        if call is not None:
+            self.serial.submit(
+                None, self.answer_callback_query, call.id, OVERFLOW_TEXT, True
+            )
+        else:
+            self.serial.submit(None, self.send_message, user_id, OVERFLOW_TEXT)
+
+
+bot = AlbumBot(TOKEN, state_storage=StateMemoryStorage())
@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+DB_PATH = "database/contests.db"
+
+
+class Database:
+    """Общий доступ к SQLite: одно постоянное соединение на поток"""
+
+    def __init__(self, path=DB_PATH, busy_timeout=5000, cached_statements=256):
+        self.path = path
+        self.busy_timeout = busy_timeout  # мс ожидания снятия блокировки
+        self.cached_statements = cached_statements  # кэш подготовленных запросов
+        self._local = threading.local()
+        self._connections = set()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        # check_same_thread=False нужен только для закрытия соединения
+        # из финализатора завершившегося потока
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout)}")
+        return conn
+
+    def connection(self):
+        """Соединение текущего потока (открывается один раз)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.add(conn)
+            # Закрываем соединение, когда поток завершится
+            weakref.finalize(threading.current_thread(), self._release, conn)
+        return conn
+
+    def _release(self, conn):
+        with self._lock:
+            self._connections.discard(conn)
+        conn.close()
+
+    def execute(self, sql, params=()):
+        """Выполнение запроса на чтение"""
+        return self.connection().execute(sql, params)
+
+    @contextmanager
+    def transaction(self):
+        """Курсор внутри транзакции: commit при успехе, rollback при ошибке"""
+        conn = self.connection()
+        with conn:
+            yield conn.cursor()
+
+    def close(self):
+        """Закрывает соединение текущего потока"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            self._release(conn)
+
+    def close_all(self):
+        """Закрывает все открытые соединения (при остановке бота)"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+db = Database()
@@ -1,178 +1,376 @@
+from collections import namedtuple
 from datetime import datetime
-import json
-import sqlite3
-import os
-from threading import Lock
+from itertools import islice
+import logging
+from threading import Lock, Thread
 import time
 
-from menu.constants import UserState
+from database.connection import db
+from database.sessions import Flow, sessions
+from menu.constants import MONTHS_RU, UserState
+
+logger = logging.getLogger(__name__)
+
+# Порядок полей в contest_stats
+STATS_FIELDS = ("pending", "approved", "rejected", "judges")
+# Размер страницы списков по умолчанию
+PAGE_SIZE = 10
+# Сколько секунд работа закреплена за открывшим её админом
+CLAIM_TTL = 15 * 60
+# Работа свободна: не закреплена, аренда истекла или она уже у этого админа
+CLAIMABLE = "(claimed_by IS NULL OR claimed_until < ? OR claimed_by = ?)"
+
+
+def format_date_ru(date_str: str) -> str:
+    try:
+        date_obj = datetime.strptime(date_str, "%d.%m.%Y")
+        return f"{date_obj.day} {MONTHS_RU[date_obj.month]} {date_obj.year}"
+    except:
+        return date_str
+
+
+class ContestInfo:
+    """Разобранная запись о конкурсе: даты уже приведены к date и к тексту"""
+
+    __slots__ = (
+        "id",
+        "theme",
+        "description",
+        "contest_date_text",
+        "end_date_text",
+        "contest_date",
+        "end_date",
+        "contest_date_ru",
+        "end_date_ru",
+    )
+
+    def __init__(self, row):
+        self.id, self.theme, self.description = row[0], row[1], row[2]
+        self.contest_date_text = row[3]  # Даты в исходном виде ДД.ММ.ГГГГ
+        self.end_date_text = row[4]
+        self.contest_date = self._parse_date(row[3])
+        self.end_date = self._parse_date(row[4])
+        self.contest_date_ru = format_date_ru(row[3])
+        self.end_date_ru = format_date_ru(row[4])
+
+    @staticmethod
+    def _parse_date(date_str):
+        try:
+            return datetime.strptime(date_str, "%d.%m.%Y").date()
+        except (TypeError, ValueError):
+            return None
 
 
 class ContestManager:
-    def _init_db():
-        """Инициализация БД"""
-        if not os.path.exists("database"):
-            os.makedirs("database")
-
-        conn = sqlite3.connect("database/contests.db")
-        c = conn.cursor()
-
-        # Таблица для инфо о конкурсе
-        c.execute(
-            """CREATE TABLE IF NOT EXISTS contests
-                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    theme TEXT NOT NULL,
-                    description TEXT NOT NULL,
-                    contest_date TEXT NOT NULL,
-                    end_date_of_admission TEXT NOT NULL)"""
-        )
+    # Кэш текущего конкурса: _NOT_LOADED - ещё не читали, None - конкурса нет
+    _NOT_LOADED = object()
+    _cache = _NOT_LOADED
+    _cache_lock = Lock()
 
-        # Таблица для работ
-        c.execute(
-            """CREATE TABLE IF NOT EXISTS submissions
-                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    username TEXT,
-                    full_name TEXT,
-                    photos TEXT NOT NULL,
-                    caption TEXT,
-                    status TEXT DEFAULT 'pending',
-                    reason TEXT,
-                    submission_number INTEGER,
-                    timestamp DATETIME)"""
-        )
+    @staticmethod
+    def update_contest(theme, description, contest_date, end_date_of_admission):
+        # Запись и обновление кэша под одной блокировкой - читатели не увидят
+        # устаревший конкурс после изменения
+        with ContestManager._cache_lock:
+            with db.transaction() as c:
+                c.execute("DELETE FROM contests")
+                c.execute(
+                    """INSERT INTO contests 
+                            (theme, description, contest_date, end_date_of_admission)
+                            VALUES (?, ?, ?, ?)""",
+                    (theme, description, contest_date, end_date_of_admission),
+                )
+                contest_id = c.lastrowid
+            ContestManager._cache = ContestInfo(
+                (contest_id, theme, description, contest_date, end_date_of_admission)
+            )
 
-        c.execute(
-            """CREATE TABLE IF NOT EXISTS approved_submissions (
-                user_id INTEGER NOT NULL,
-                submission_id INTEGER NOT NULL,
-                PRIMARY KEY (user_id, submission_id)
-            )"""
-        )
+    @staticmethod
+    def clear_contest():
+        """Удаление информации о текущем конкурсе"""
+        with ContestManager._cache_lock:
+            with db.transaction() as c:
+                c.execute("DELETE FROM contests")
+            ContestManager._cache = None
 
-        # Таблица для судей
-        c.execute(
-            """CREATE TABLE IF NOT EXISTS judges
-                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    username TEXT,
-                    full_name TEXT NOT NULL)"""
-        )
+    @staticmethod
+    def invalidate_cache():
+        """Сброс кэша - следующее чтение пойдёт в БД"""
+        with ContestManager._cache_lock:
+            ContestManager._cache = ContestManager._NOT_LOADED
 
-        # Таблица для счетчиков
-        c.execute(
-            """CREATE TABLE IF NOT EXISTS counters
-                    (name TEXT PRIMARY KEY,
-                    value INTEGER)"""
-        )
-        # Инициализация счетчика
-        c.execute("INSERT OR IGNORE INTO counters VALUES ('submission', 0)")
+    @staticmethod
+    def get_current_contest():
+        """Текущий конкурс (ContestInfo) или None"""
+        cached = ContestManager._cache
+        if cached is not ContestManager._NOT_LOADED:
+            return cached
+
+        with ContestManager._cache_lock:
+            if ContestManager._cache is ContestManager._NOT_LOADED:
+                row = db.execute(
+                    """SELECT id, theme, description, contest_date, end_date_of_admission
+                       FROM contests ORDER BY id DESC LIMIT 1"""
+                ).fetchone()
+                ContestManager._cache = ContestInfo(row) if row else None
+            return ContestManager._cache
 
-        c.execute(
-            "CREATE INDEX IF NOT EXISTS idx_submissions_status ON submissions(status)"
-        )
-        c.execute(
-            "CREATE INDEX IF NOT EXISTS idx_submissions_user ON submissions(user_id)"
-        )
 
-        # Таблица ЧС
-        c.execute(
-            """CREATE TABLE IF NOT EXISTS blocked_users
-                 (user_id INTEGER PRIMARY KEY,
-                  username TEXT,
-                  full_name TEXT,
-                  blocked_at DATETIME DEFAULT CURRENT_TIMESTAMP)"""
+# Страница выборки: строки и курсоры соседних страниц (None - страницы нет)
+Page = namedtuple("Page", ["items", "next_cursor", "prev_cursor"])
+
+
+def keyset_page(
+    select, key, where="", params=(), after_id=0, before_id=None, limit=PAGE_SIZE
+):
+    """Постраничная выборка по ключу (первый столбец select) без OFFSET
+
+    Вперёд - строки с key > after_id, назад - строки с key < before_id.
+    """
+    rows_iter = keyset_iter(select, key, where, params, after_id, before_id)
+    try:
+        rows = list(islice(rows_iter, limit + 1))
+    finally:
+        rows_iter.close()
+
+    if before_id is not None:
+        has_prev = len(rows) > limit
+        rows = rows[:limit][::-1]
+        return Page(
+            rows,
+            rows[-1][0] if rows else None,
+            rows[0][0] if has_prev and rows else None,
         )
 
-        conn.commit()
-        conn.close()
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    return Page(
+        rows,
+        rows[-1][0] if has_next else None,
+        rows[0][0] if after_id and rows else None,
+    )
 
-    _init_db()
 
-    @staticmethod
-    def update_contest(theme, description, contest_date, end_date_of_admission):
-        ContestManager._init_db()
-        conn = sqlite3.connect("database/contests.db")
-        c = conn.cursor()
-
-        c.execute("DELETE FROM contests")
-        c.execute(
-            """INSERT INTO contests 
-                    (theme, description, contest_date, end_date_of_admission)
-                    VALUES (?, ?, ?, ?)""",
-            (theme, description, contest_date, end_date_of_admission),
+def keyset_iter(select, key, where="", params=(), after_id=0, before_id=None):
+    """Строки выборки по ключу потоком из курсора, без загрузки всей таблицы
+
+    Вперёд - key > after_id по возрастанию, назад - key < before_id по
+    убыванию. Недочитанный генератор нужно закрыть (close()), чтобы
+    освободить курсор.
+    """
+    condition = f"{where} AND " if where else ""
+    if before_id is not None:
+        cursor = db.execute(
+            f"{select} WHERE {condition}{key} < ? ORDER BY {key} DESC",
+            (*params, before_id),
         )
+    else:
+        cursor = db.execute(
+            f"{select} WHERE {condition}{key} > ? ORDER BY {key}",
+            (*params, after_id or 0),
+        )
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
 
-        conn.commit()
-        conn.close()
 
-    @staticmethod
-    def get_current_contest():
-        ContestManager._init_db()
-        conn = sqlite3.connect("database/contests.db")
-        c = conn.cursor()
+class DataVersion:
+    """Счётчик изменений таблицы - ключ для кэшей, построенных по выборкам
 
-        c.execute("SELECT * FROM contests ORDER BY id DESC LIMIT 1")
-        contest = c.fetchone()
-        conn.close()
+    Увеличивается после каждой записи в таблицу; кэш со старой версией
+    считается устаревшим.
+    """
 
-        return contest
+    def __init__(self):
+        self._value = 0
+        self._lock = Lock()
+
+    @property
+    def value(self):
+        return self._value
+
+    def bump(self):
+        with self._lock:
+            self._value += 1
+
+
+submissions_version = DataVersion()
+judges_version = DataVersion()
+
+
+class CachedIdSet:
+    """Множество user_id из БД в памяти процесса
+
+    Изменения записываются сквозным образом (add/discard после коммита),
+    а раз в refresh_interval секунд множество перечитывается из БД, чтобы
+    подхватить изменения, сделанные другими процессами. Устаревшее
+    множество перечитывается в фоновом потоке - проверка роли в обработчике
+    не ждёт БД. add/discard, пришедшие во время чтения, записываются в
+    журнал и повторяются на прочитанном множестве, поэтому не теряются.
+    """
+
+    def __init__(self, query, refresh_interval=60):
+        self.query = query
+        self.refresh_interval = refresh_interval
+        self._ids = set()
+        self._loaded_at = None
+        self._lock = Lock()
+        self._load_lock = Lock()  # Одно чтение из БД за раз
+        self._journal = None  # [(метод, user_id)] во время чтения
+        self._refreshing = False
+
+    def load(self):
+        """(Пере)загрузка множества из БД - хук обновления"""
+        with self._load_lock:
+            with self._lock:
+                self._journal = []
+            try:
+                ids = {row[0] for row in db.execute(self.query).fetchall()}
+            except BaseException:
+                with self._lock:
+                    self._journal = None
+                raise
+            with self._lock:
+                for method, user_id in self._journal:
+                    if method == "clear":
+                        ids = set()
+                    else:
+                        getattr(ids, method)(user_id)
+                self._journal = None
+                self._ids = ids
+                self._loaded_at = time.monotonic()
+
+    refresh = load
+
+    def _refresh_in_background(self):
+        try:
+            self.load()
+        except Exception as e:
+            logger.error(f"Не удалось перечитать {self.query}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _ensure_fresh(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            # Первое обращение - без данных ответить нечего
+            self.load()
+            return
+        if time.monotonic() - loaded_at <= self.refresh_interval:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        Thread(
+            target=self._refresh_in_background, name="ids-refresh", daemon=True
+        ).start()
+
+    def __contains__(self, user_id):
+        self._ensure_fresh()
+        return user_id in self._ids
+
+    def __len__(self):
+        self._ensure_fresh()
+        return len(self._ids)
+
+    def add(self, user_id):
+        with self._lock:
+            self._ids.add(user_id)
+            if self._journal is not None:
+                self._journal.append(("add", user_id))
+
+    def discard(self, user_id):
+        with self._lock:
+            self._ids.discard(user_id)
+            if self._journal is not None:
+                self._journal.append(("discard", user_id))
+
+    def clear(self):
+        with self._lock:
+            self._ids = set()
+            if self._journal is not None:
+                self._journal.append(("clear", None))
+
+
+blocked_users = CachedIdSet("SELECT user_id FROM blocked_users")
+judge_users = CachedIdSet("SELECT user_id FROM judges")
+approved_users = CachedIdSet("SELECT user_id FROM approved_submissions")
 
 
 class SubmissionManager:
     @staticmethod
     def create_submission(user_id, username, full_name, photos, caption):
-
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
+        with db.transaction() as c:
+            # Колонка photos оставлена для совместимости схемы, фото
+            # хранятся в submission_photos
             c.execute(
                 """INSERT INTO submissions 
                     (user_id, username, full_name, photos, caption, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?)""",
+                    VALUES (?, ?, ?, '', ?, ?)""",
                 (
                     user_id,
                     username,
                     full_name,
-                    json.dumps(photos),
                     caption,
                     datetime.now().isoformat(),
                 ),
             )
             submission_id = c.lastrowid
-            conn.commit()
-            return submission_id
-        finally:
-            conn.close()
+            c.executemany(
+                """INSERT INTO submission_photos
+                    (submission_id, position, file_id, unique_id)
+                    VALUES (?, ?, ?, ?)""",
+                [
+                    (submission_id, position, photo["file_id"], photo.get("unique_id"))
+                    for position, photo in enumerate(photos)
+                ],
+            )
+        submissions_version.bump()
+        return submission_id
 
     @staticmethod
-    def get_pending_submissions():
-        conn = sqlite3.connect("database/contests.db")
-        c = conn.cursor()
-        c.execute("SELECT id, user_id FROM submissions WHERE status = 'pending'")
-        result = c.fetchall()
-        conn.close()
-        return result
+    def find_photo_submissions(unique_id):
+        """ID работ, в которых уже есть фото с таким unique_id"""
+        rows = db.execute(
+            "SELECT DISTINCT submission_id FROM submission_photos WHERE unique_id = ?",
+            (unique_id,),
+        ).fetchall()
+        return [row[0] for row in rows]
 
     @staticmethod
     def update_submission(submission_id, status, reason=None):
-        conn = sqlite3.connect("database/contests.db")
-        c = conn.cursor()
-        c.execute(
-            """UPDATE submissions 
-                    SET status = ?, reason = ?
-                    WHERE id = ?""",
-            (status, reason, submission_id),
-        )
-        conn.commit()
-        conn.close()
+        with db.transaction() as c:
+            c.execute(
+                """UPDATE submissions 
+                        SET status = ?, reason = ?,
+                            claimed_by = NULL, claimed_until = NULL
+                        WHERE id = ?""",
+                (status, reason, submission_id),
+            )
+        submissions_version.bump()
 
     @staticmethod
-    def reset_counter():
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
+    def delete_submission(submission_id):
+        """Удаляет работу, которую не удалось переслать в чат конкурса
+        (фото и статистику чистят триггеры). Работа, которую админ уже
+        рассмотрел или взял на проверку, остаётся; True - удалена"""
+        with db.transaction() as c:
+            c.execute(
+                """DELETE FROM submissions
+                   WHERE id = ? AND status = 'pending' AND claimed_by IS NULL""",
+                (submission_id,),
+            )
+            deleted = c.rowcount == 1
+        if deleted:
+            submissions_version.bump()
+        return deleted
 
+    @staticmethod
+    def reset_counter():
+        with db.transaction() as c:
             # Обнуляем счетчик
             c.execute("UPDATE counters SET value = 0 WHERE name = 'submission'")
 
@@ -189,58 +387,126 @@ class SubmissionManager:
             c.execute(
                 "DELETE FROM sqlite_sequence WHERE name IN ('submissions', 'approved_submissions', 'judges')"
             )
-
-            conn.commit()
-        finally:
-            conn.close()
+        judge_users.clear()
+        approved_users.clear()
+        submissions_version.bump()
+        judges_version.bump()
 
     @staticmethod
     def get_current_number():
         """Возвращает текущее количество участников"""
-        conn = sqlite3.connect("database/contests.db")
-        c = conn.cursor()
-        c.execute("SELECT value FROM counters WHERE name = 'submission'")
-        result = c.fetchone()[0]
-        conn.close()
-        return result
+        return db.execute(
+            "SELECT value FROM counters WHERE name = 'submission'"
+        ).fetchone()[0]
 
     @staticmethod
     def approve_submission(submission_id):
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            with conn:  # Автоматический commit/rollback
-                c = conn.cursor()
-                # Получаем и увеличиваем счетчик ТОЛЬКО для подтвержденных работ
-                c.execute(
-                    "UPDATE counters SET value = value + 1 WHERE name = 'submission'"
-                )
-                c.execute("SELECT value FROM counters WHERE name = 'submission'")
-                number = c.fetchone()[0]
+        with db.transaction() as c:  # Автоматический commit/rollback
+            # Получаем и увеличиваем счетчик ТОЛЬКО для подтвержденных работ
+            c.execute(
+                "UPDATE counters SET value = value + 1 WHERE name = 'submission'"
+            )
+            c.execute("SELECT value FROM counters WHERE name = 'submission'")
+            number = c.fetchone()[0]
 
-                c.execute(
-                    """UPDATE submissions 
-                            SET status = 'approved', submission_number = ?
-                            WHERE id = ?""",
-                    (number, submission_id),
-                )
+            c.execute(
+                """UPDATE submissions 
+                        SET status = 'approved', submission_number = ?,
+                            claimed_by = NULL, claimed_until = NULL
+                        WHERE id = ?""",
+                (number, submission_id),
+            )
 
-                c.execute(
-                    """
-                    INSERT INTO approved_submissions (user_id, submission_id) 
-                    VALUES ((SELECT user_id FROM submissions WHERE id = ?), ?)
-                """,
-                    (submission_id, submission_id),
-                )
-            return number
-        finally:
-            conn.close()
+            c.execute(
+                """
+                INSERT INTO approved_submissions (user_id, submission_id) 
+                VALUES ((SELECT user_id FROM submissions WHERE id = ?), ?)
+            """,
+                (submission_id, submission_id),
+            )
+            c.execute("SELECT user_id FROM submissions WHERE id = ?", (submission_id,))
+            user_id = c.fetchone()[0]
+        approved_users.add(user_id)
+        submissions_version.bump()
+        return number
 
     @staticmethod
-    def rollback_submission(submission_id):
-        conn = sqlite3.connect("database/contests.db")
-        c = conn.cursor()
+    def approve_many(submission_ids, admin_id=None):
+        """Одобряет несколько работ одной транзакцией
 
-        try:
+        Номера выдаются подряд в порядке id. Пропускаются работы не на
+        модерации и (если передан admin_id) закреплённые за другим админом.
+        Возвращает [(submission_id, user_id, number), ...].
+        """
+        with db.transaction() as c:
+            rows = SubmissionManager._select_for_batch(c, submission_ids, admin_id)
+            if not rows:
+                return []
+            c.execute(
+                "UPDATE counters SET value = value + ? WHERE name = 'submission'",
+                (len(rows),),
+            )
+            c.execute("SELECT value FROM counters WHERE name = 'submission'")
+            first = c.fetchone()[0] - len(rows) + 1
+            approved = [
+                (submission_id, user_id, first + i)
+                for i, (submission_id, user_id) in enumerate(rows)
+            ]
+            c.executemany(
+                """UPDATE submissions
+                        SET status = 'approved', submission_number = ?,
+                            claimed_by = NULL, claimed_until = NULL
+                        WHERE id = ?""",
+                [(number, submission_id) for submission_id, _, number in approved],
+            )
+            c.executemany(
+                "INSERT INTO approved_submissions (user_id, submission_id) VALUES (?, ?)",
+                [(user_id, submission_id) for submission_id, user_id, _ in approved],
+            )
+        for _, user_id, _ in approved:
+            approved_users.add(user_id)
+        submissions_version.bump()
+        return approved
+
+    @staticmethod
+    def reject_many(submission_ids, reason, admin_id=None):
+        """Отклоняет несколько работ одной транзакцией
+
+        Пропускает те же работы, что approve_many.
+        Возвращает [(submission_id, user_id), ...].
+        """
+        with db.transaction() as c:
+            rows = SubmissionManager._select_for_batch(c, submission_ids, admin_id)
+            c.executemany(
+                """UPDATE submissions
+                        SET status = 'rejected', reason = ?,
+                            claimed_by = NULL, claimed_until = NULL
+                        WHERE id = ?""",
+                [(reason, submission_id) for submission_id, _ in rows],
+            )
+        if rows:
+            submissions_version.bump()
+        return rows
+
+    @staticmethod
+    def _select_for_batch(c, submission_ids, admin_id):
+        """(id, user_id) работ из списка, которые можно модерировать"""
+        ids = sorted(set(submission_ids))
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        sql = f"""SELECT id, user_id FROM submissions
+                  WHERE id IN ({placeholders}) AND status = 'pending'"""
+        params = list(ids)
+        if admin_id is not None:
+            sql += f" AND {CLAIMABLE}"
+            params += [time.time(), admin_id]
+        c.execute(sql + " ORDER BY id", params)
+        return c.fetchall()
+
+    @staticmethod
+    def rollback_submission(submission_id):
+        with db.transaction() as c:
             c.execute(
                 """UPDATE submissions 
                         SET status = 'pending', 
@@ -248,175 +514,258 @@ class SubmissionManager:
                         WHERE id = ?""",
                 (submission_id,),
             )
-            conn.commit()
-        finally:
-            conn.close()
+        submissions_version.bump()
 
     @staticmethod
     def is_judge(user_id):
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
-            c.execute("SELECT 1 FROM judges WHERE user_id = ?", (user_id,))
-            return c.fetchone() is not None
-        finally:
-            conn.close()
+        return user_id in judge_users
 
     @staticmethod
     def add_judge(user_id, username, full_name):
         if SubmissionManager.is_judge(user_id):
             return False
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
+        with db.transaction() as c:
             c.execute(
                 """INSERT INTO judges 
                     (user_id, username, full_name)
                     VALUES (?, ?, ?)""",
                 (user_id, username, full_name),
             )
-            conn.commit()
-            return True
-        finally:
-            conn.close()
+        judge_users.add(user_id)
+        judges_version.bump()
+        return True
 
     @staticmethod
     def delete_judge(user_id):
         if not SubmissionManager.is_judge(user_id):
             return False
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
+        with db.transaction() as c:
             c.execute("DELETE FROM judges WHERE user_id = ?", (user_id,))
-            conn.commit()
-            return True
-        finally:
-            conn.close()
+        judge_users.discard(user_id)
+        judges_version.bump()
+        return True
+
+    @staticmethod
+    def get_stats():
+        """Статистика конкурса одним чтением из contest_stats"""
+        row = db.execute(
+            "SELECT pending, approved, rejected, judges FROM contest_stats WHERE id = 1"
+        ).fetchone()
+        if not row:
+            return dict.fromkeys(STATS_FIELDS, 0)
+        return dict(zip(STATS_FIELDS, row))
+
+    @staticmethod
+    def check_stats(fix=False):
+        """Пересчитывает статистику с нуля и сравнивает с contest_stats
+
+        Возвращает (сохранённые значения, фактические значения),
+        при fix=True фактические значения записываются в contest_stats
+        """
+        with db.transaction() as c:
+            # Блокировка записи до чтения: триггеры не изменят ни счётчики,
+            # ни таблицы, пока они сравниваются и исправляются
+            c.execute("BEGIN IMMEDIATE")
+            c.execute(
+                "SELECT pending, approved, rejected, judges FROM contest_stats WHERE id = 1"
+            )
+            row = c.fetchone()
+            stored = dict(zip(STATS_FIELDS, row)) if row else dict.fromkeys(STATS_FIELDS, 0)
+            c.execute(
+                """SELECT
+                    (SELECT COUNT(*) FROM submissions WHERE status = 'pending'),
+                    (SELECT COUNT(*) FROM submissions WHERE status = 'approved'),
+                    (SELECT COUNT(*) FROM submissions WHERE status = 'rejected'),
+                    (SELECT COUNT(*) FROM judges)"""
+            )
+            actual = dict(zip(STATS_FIELDS, c.fetchone()))
+            if fix and actual != stored:
+                c.execute(
+                    """INSERT OR REPLACE INTO contest_stats
+                        (id, pending, approved, rejected, judges)
+                        VALUES (1, :pending, :approved, :rejected, :judges)""",
+                    actual,
+                )
+        return stored, actual
 
     @staticmethod
     def get_pending_count():
         """Возвращает количество работ на модерации"""
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
-            c.execute("SELECT COUNT(*) FROM submissions WHERE status = 'pending'")
-            return c.fetchone()[0]
-        finally:
-            conn.close()
+        return SubmissionManager.get_stats()["pending"]
 
     @staticmethod
     def get_approved_count():
         """Возвращает количество одобренных работ"""
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
-            c.execute("SELECT COUNT(*) FROM submissions WHERE status = 'approved'")
-            return c.fetchone()[0]
-        finally:
-            conn.close()
+        return SubmissionManager.get_stats()["approved"]
 
     @staticmethod
     def get_rejected_count():
         """Возвращает количество отвергнутых работ"""
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
-            c.execute("SELECT COUNT(*) FROM submissions WHERE status = 'rejected'")
-            return c.fetchone()[0]
-        finally:
-            conn.close()
+        return SubmissionManager.get_stats()["rejected"]
 
     @staticmethod
     def get_judges_count():
         """Возвращает количество подавших заявку на судейство"""
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
-            c.execute("SELECT COUNT(*) FROM judges")
-            return c.fetchone()[0]
-        finally:
-            conn.close()
+        return SubmissionManager.get_stats()["judges"]
 
     @staticmethod
-    def get_all_submissions_with_info():
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
+    def list_submissions(after_id=0, limit=PAGE_SIZE, before_id=None):
+        """Страница участников: (id, full_name, username, status, submission_number)"""
+        return keyset_page(
+            """SELECT id, full_name, username, status, submission_number
+               FROM submissions""",
+            "id",
+            after_id=after_id,
+            before_id=before_id,
+            limit=limit,
+        )
+
+    @staticmethod
+    def iter_submissions(after_id=0, before_id=None):
+        """Участники потоком из курсора (те же столбцы, что list_submissions)"""
+        return keyset_iter(
+            """SELECT id, full_name, username, status, submission_number
+               FROM submissions""",
+            "id",
+            after_id=after_id,
+            before_id=before_id,
+        )
+
+    @staticmethod
+    def list_pending(after_id=0, limit=PAGE_SIZE, before_id=None):
+        """Страница работ на модерации, старые первыми:
+        (id, user_id, claimed_by, claimed_until)"""
+        return keyset_page(
+            "SELECT id, user_id, claimed_by, claimed_until FROM submissions",
+            "id",
+            where="status = 'pending'",
+            after_id=after_id,
+            before_id=before_id,
+            limit=limit,
+        )
+
+    @staticmethod
+    def list_judges(after_id=0, limit=PAGE_SIZE, before_id=None):
+        """Страница судей: (id, full_name, username)"""
+        return keyset_page(
+            "SELECT id, full_name, username FROM judges",
+            "id",
+            after_id=after_id,
+            before_id=before_id,
+            limit=limit,
+        )
+
+    @staticmethod
+    def claim_submission(submission_id, admin_id, ttl=CLAIM_TTL):
+        """Закрепляет работу на модерации за админом
+
+        False - работа уже не на модерации или её проверяет другой админ.
+        """
+        now = time.time()
+        with db.transaction() as c:
             c.execute(
-                """SELECT 
-                    full_name, 
-                    username, 
-                    status, 
-                    submission_number 
-                   FROM submissions"""
+                f"""UPDATE submissions
+                        SET claimed_by = ?, claimed_until = ?
+                        WHERE id = ? AND status = 'pending' AND {CLAIMABLE}""",
+                (admin_id, now + ttl, submission_id, now, admin_id),
             )
-            return c.fetchall()
-        finally:
-            conn.close()
+            claimed = c.rowcount == 1
+        if claimed:
+            submissions_version.bump()
+        return claimed
 
     @staticmethod
-    def get_all_judges_with_info():
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
+    def claim_next_pending(admin_id, after_id=0, ttl=CLAIM_TTL):
+        """Закрепляет за админом самую старую свободную работу после after_id
+
+        Возвращает id работы или None, если свободных нет.
+        """
+        while True:
+            now = time.time()
+            row = db.execute(
+                f"""SELECT id FROM submissions
+                    WHERE status = 'pending' AND id > ? AND {CLAIMABLE}
+                    ORDER BY id LIMIT 1""",
+                (after_id, now, admin_id),
+            ).fetchone()
+            if row is None:
+                return None
+            # Между выборкой и записью работу мог забрать другой админ -
+            # тогда берём следующую
+            if SubmissionManager.claim_submission(row[0], admin_id, ttl):
+                return row[0]
+            after_id = row[0]
+
+    @staticmethod
+    def release_claim(submission_id, admin_id):
+        """Снимает закрепление работы (только своё)"""
+        with db.transaction() as c:
             c.execute(
-                """SELECT 
-                    full_name, 
-                    username 
-                   FROM judges"""
+                """UPDATE submissions
+                        SET claimed_by = NULL, claimed_until = NULL
+                        WHERE id = ? AND claimed_by = ?""",
+                (submission_id, admin_id),
             )
-            return c.fetchall()
-        finally:
-            conn.close()
+        submissions_version.bump()
+
+    @staticmethod
+    def iter_judges(after_id=0, before_id=None):
+        """Судьи потоком из курсора (те же столбцы, что list_judges)"""
+        return keyset_iter(
+            "SELECT id, full_name, username FROM judges",
+            "id",
+            after_id=after_id,
+            before_id=before_id,
+        )
+
+    @staticmethod
+    def list_blocked(after_id=0, limit=PAGE_SIZE, before_id=None):
+        """Страница ЧС: (user_id, username, full_name, blocked_at)"""
+        return keyset_page(
+            "SELECT user_id, username, full_name, blocked_at FROM blocked_users",
+            "user_id",
+            after_id=after_id,
+            before_id=before_id,
+            limit=limit,
+        )
 
     @staticmethod
     def insert_replace_blocked(user_id, username, first_name, last_name):
         full_name = f"{first_name or ''} {last_name or ''}".strip()
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
+        with db.transaction() as c:
             c.execute(
                 """INSERT OR REPLACE INTO blocked_users 
                      (user_id, username, full_name) 
                      VALUES (?, ?, ?)""",
                 (user_id, username, full_name),
             )
-            conn.commit()
-        finally:
-            conn.close
-
-    @staticmethod
-    def select_blocked():
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
-            c.execute("""SELECT * FROM blocked_users ORDER BY blocked_at DESC""")
-            return c.fetchall()
-        finally:
-            conn.close
+        blocked_users.add(user_id)
 
     @staticmethod
     def is_blocked(user_id):
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
-            c.execute("SELECT 1 FROM blocked_users WHERE user_id = ?", (user_id,))
-            return c.fetchone() is not None
-        finally:
-            conn.close
+        return user_id in blocked_users
 
     @staticmethod
     def delete_blocked(user_id):
-        conn = sqlite3.connect("database/contests.db")
-        try:
-            c = conn.cursor()
+        with db.transaction() as c:
             c.execute("""DELETE FROM blocked_users WHERE user_id = ?""", (user_id,))
-            conn.commit()
-        finally:
-            conn.close
+        blocked_users.discard(user_id)
 
 
 class ContestSubmission:
+    __slots__ = (
+        "photos",
+        "caption",
+        "media_group_id",
+        "submission_time",
+        "status",
+        "send_by_bot",
+        "last_media_time",
+        "group_check_timer",
+        "progress_message_id",
+        "last_activity",
+    )
+
     def __init__(self):
         self.photos = []  # Список словарей {"file_id": str, "unique_id": str}
         self.caption = ""  # Подпись к работе
@@ -440,61 +789,114 @@ class ContestSubmission:
         self.last_activity = time.time()
 
 
-class SubmissionStorage:
+# Черновики контента (сценарий Flow.CONTENT), у каждого свои списки фото.
+# Фото - словари {"file_id": str, "unique_id": str}, кроме AdminMessageDraft,
+# где хранятся только file_id
+
+
+class AdminMessageDraft:
+    """Сообщение админам: текст и до 10 фото"""
+
+    __slots__ = ("photos", "text", "counter_msg_id")
+    type = "content"
+
     def __init__(self):
-        self.data = {}
-        self.lock = Lock()
-        self.timers = {}
+        self.photos = []
+        self.text = None
+        self.counter_msg_id = None  # ID сообщения со счётчиком фото
+
+
+class NewsDraft:
+    __slots__ = ("photos", "description", "speaker", "island", "progress_message_id")
+    type = "news"
+
+    def __init__(self):
+        self.photos = []
+        self.description = None
+        self.speaker = None
+        self.island = None
+        self.progress_message_id = None
+
+
+class CodeDraft:
+    """Код сна или курорта"""
+
+    __slots__ = ("code", "photos", "speaker", "island", "progress_message_id")
+    type = "code"
+
+    def __init__(self):
+        self.code = None
+        self.photos = []
+        self.speaker = None
+        self.island = None
+        self.progress_message_id = None
 
-    def update_activity(self):
-        self.last_activity = time.time()
+
+class PocketDraft:
+    """Карточка дружбы: ровно 2 фото"""
+
+    __slots__ = ("photos", "media_group_id")
+    type = "pocket"
+
+    def __init__(self):
+        self.photos = []
+        self.media_group_id = None
+
+
+class DesignDraft:
+    __slots__ = ("code", "design_screen", "game_screens", "progress_message_id")
+    type = "design"
+
+    def __init__(self):
+        self.code = None
+        self.design_screen = []
+        self.game_screens = []
+        self.progress_message_id = None
+
+
+DRAFT_TYPES = {
+    draft.type: draft
+    for draft in (AdminMessageDraft, NewsDraft, CodeDraft, PocketDraft, DesignDraft)
+}
+
+
+class SubmissionStorage:
+    """Работы, которые пользователи сейчас отправляют (сценарий Flow.CONTEST)"""
+
+    def __init__(self, store=sessions):
+        self.store = store
 
     def add(self, user_id, submission):
-        with self.lock:
-            if not hasattr(submission, "update_activity"):
-                raise TypeError("Invalid submission type")
-            self.data[user_id] = submission
-            # Используем метод обновления активности
-            submission.update_activity()
-            self.timers[user_id] = (
-                submission.last_activity
-            )  # Используем last_activity из Submission
+        if not hasattr(submission, "update_activity"):
+            raise TypeError("Invalid submission type")
+        submission.update_activity()
+        self.store.set(user_id, Flow.CONTEST, submission)
 
     # Добавляем новые методы для работы с прогрессом
     def update_progress_message(self, user_id, message_id):
-        with self.lock:
-            if user_id in self.data:
-                self.data[user_id].progress_message_id = message_id
+        submission = self.get(user_id)
+        if submission:
+            submission.progress_message_id = message_id
 
     def update_last_activity(self, user_id):
-        with self.lock:
-            if user_id in self.data:
-                self.data[user_id].last_activity = time.time()
-                self.timers[user_id] = self.data[user_id].last_activity
+        submission = self.get(user_id)
+        if submission:
+            submission.update_activity()
 
     def get(self, user_id):
-        with self.lock:
-            return self.data.get(user_id)
+        return self.store.get(user_id, Flow.CONTEST)
 
     def exists(self, user_id):
-        with self.lock:
-            return user_id in self.data
+        return self.store.contains(user_id, Flow.CONTEST)
 
     def remove(self, user_id):
-        with self.lock:
-            if user_id in self.data:
-                del self.data[user_id]
-                if user_id in self.timers:
-                    del self.timers[user_id]
+        self.store.pop(user_id, Flow.CONTEST)
 
     def get_all_users(self):
-        with self.lock:
-            return list(self.data.keys())
+        return self.store.users(Flow.CONTEST)
 
     def clear(self):
-        with self.lock:
-            self.data.clear()
-            self.timers.clear()
+        self.store.clear_flow(Flow.CONTEST)
 
 
 user_submissions = SubmissionStorage()
@@ -502,150 +904,95 @@ user_submissions = SubmissionStorage()
 
 def get_submission(submission_id):
     """Получение данных о заявке по ID"""
-    conn = sqlite3.connect("database/contests.db")
-    c = conn.cursor()
-
-    try:
-        c.execute(
-            """SELECT * FROM submissions 
-                   WHERE id = ?""",
-            (submission_id,),
-        )
-        result = c.fetchone()
-
-        if not result:
-            raise ValueError(f"Заявка {submission_id} не найдена")
-
-        # Десериализуем JSON-строку в список словарей
-        photos = json.loads(result[4]) if result[4] else []
-
-        return {
-            "id": result[0],
-            "user_id": result[1],
-            "username": result[2],
-            "full_name": result[3],
-            "photos": photos,
-            "caption": result[5],
-            "status": result[6],
-            "reason": result[7],
-            "submission_number": result[8],
-            "timestamp": result[9],
-        }
-    except json.JSONDecodeError as e:
-        print(f"Ошибка декодирования JSON: {e}")
-        return {"photos": []}  # Возвращаем пустой список при ошибке
-    except Exception as e:
-        raise e
-    finally:
-        conn.close()
+    rows = db.execute(
+        """SELECT s.id, s.user_id, s.username, s.full_name, s.caption,
+                  s.status, s.reason, s.submission_number, s.timestamp,
+                  p.file_id, p.unique_id
+           FROM submissions s
+           LEFT JOIN submission_photos p ON p.submission_id = s.id
+           WHERE s.id = ?
+           ORDER BY p.position""",
+        (submission_id,),
+    ).fetchall()
+
+    if not rows:
+        raise ValueError(f"Заявка {submission_id} не найдена")
+
+    result = rows[0]
+    return {
+        "id": result[0],
+        "user_id": result[1],
+        "username": result[2],
+        "full_name": result[3],
+        "photos": [
+            {"file_id": row[9], "unique_id": row[10]}
+            for row in rows
+            if row[9] is not None
+        ],
+        "caption": result[4],
+        "status": result[5],
+        "reason": result[6],
+        "submission_number": result[7],
+        "timestamp": result[8],
+    }
 
 
 def is_user_approved(user_id):
-    conn = sqlite3.connect("database/contests.db")
-    cursor = conn.execute(
-        """
-        SELECT COUNT(*) FROM approved_submissions WHERE user_id = ?
-        """,
-        (user_id,),
-    )
-    count = cursor.fetchone()[0]
-    conn.close()
-    return count > 0
+    return user_id in approved_users
 
 
 def is_user_judge(user_id):
-    conn = sqlite3.connect("database/contests.db")
-    cursor = conn.execute(
-        """
-        SELECT COUNT(*) FROM judges WHERE user_id = ?
-        """,
-        (user_id,),
-    )
-    count = cursor.fetchone()[0]
-    conn.close()
-    return count > 0
+    return user_id in judge_users
 
 
 class UserContentStorage:
-    def __init__(self):
-        self.data = {}
-        self.lock = Lock()
-        self.defaults = {
-            "content": {
-                "type": "content",
-                "photos": [],
-                "text": None,
-                "counter_msg_id": None,
-            },
-            "news": {
-                "type": "news",
-                "photos": [],
-                "description": None,
-                "speaker": None,
-                "island": None,
-                "progress_message_id": None,
-            },
-            "code": {
-                "type": "code",
-                "code": None,
-                "photos": [],
-                "speaker": None,
-                "island": None,
-                "progress_message_id": None,
-            },
-            "pocket": {"type": "pocket", "photos": [], "media_group_id": None},
-            "design": {
-                "type": "design",
-                "code": None,
-                "design_screen": [],
-                "game_screens": [],
-                "progress_message_id": None,
-            },
-        }
+    """Черновик контента, который собирает пользователь (сценарий Flow.CONTENT)"""
+
+    def __init__(self, store=sessions):
+        self.store = store
 
     def init_content(self, user_id, content_type="content"):
-        self.data[user_id] = self.defaults.get(content_type, {}).copy()
+        self.store.set(user_id, Flow.CONTENT, DRAFT_TYPES[content_type]())
 
     def init_news(self, user_id, content_type="news"):
-        self.data[user_id] = self.defaults.get(content_type, {}).copy()
+        self.init_content(user_id, content_type)
 
     def init_code(self, user_id, content_type="code"):
-        self.data[user_id] = self.defaults.get(content_type, {}).copy()
+        self.init_content(user_id, content_type)
 
     def init_pocket(self, user_id, content_type="pocket"):
-        self.data[user_id] = self.defaults.get(content_type, {}).copy()
+        self.init_content(user_id, content_type)
 
     def init_design(self, user_id, content_type="design"):
-        self.data[user_id] = self.defaults.get(content_type, {}).copy()
+        self.init_content(user_id, content_type)
 
     def update_counter_message(self, user_id, message_id):
-        if user_id in self.data:
-            self.data[user_id]["counter_msg_id"] = message_id
+        data = self.store.get(user_id, Flow.CONTENT)
+        if data is not None:
+            data.counter_msg_id = message_id
 
     def add_photo(self, user_id, photo_id):
-        with self.lock:
-            if user_id in self.data:
-                self.data[user_id]["photos"].append(photo_id)
+        data = self.store.get(user_id, Flow.CONTENT)
+        if data is not None:
+            data.photos.append(photo_id)
 
     def set_text(self, user_id, text):
-        with self.lock:
-            if user_id in self.data:
-                self.data[user_id]["text"] = text
+        data = self.store.get(user_id, Flow.CONTENT)
+        if data is not None:
+            data.text = text
 
-    def get_data(self, user_id, content_type):
-        with self.lock:
-            if user_id not in self.data:
-                self.init_content(user_id, content_type)
-            return self.data[user_id]
+    def get_data(self, user_id, content_type="content"):
+        """Черновик пользователя; если его нет - новый черновик content_type"""
+        data = self.store.get(user_id, Flow.CONTENT)
+        if data is None:
+            data = self.store.setdefault(user_id, Flow.CONTENT, DRAFT_TYPES[content_type])
+        return data
 
     def update_data(self, user_id, new_data):
-        with self.lock:
-            self.data[user_id] = new_data
+        self.store.set(user_id, Flow.CONTENT, new_data)
 
     def clear(self, user_id):
-        with self.lock:
-            if user_id in self.data:
-                del self.data[user_id]
+        self.store.pop(user_id, Flow.CONTENT)
 
 
 user_content_storage = UserContentStorage()
@@ -0,0 +1,121 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Deadline:
+    """Запланированный вызов; cancel() отменяет его, если он ещё не выполнен"""
+
+    __slots__ = ("due", "seq", "callback", "args", "cancelled", "_scheduler")
+
+    def __init__(self, scheduler, due, seq, callback, args):
+        self._scheduler = scheduler
+        self.due = due
+        self.seq = seq
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.due, self.seq) < (other.due, other.seq)
+
+    def cancel(self):
+        self._scheduler._cancel(self)
+
+
+class DeadlineScheduler:
+    """Вызов функций точно в назначенное время (time.monotonic())
+
+    Сроки лежат в min-куче, один поток спит до ближайшего из них:
+    постановка - O(log n), отмена - O(1) (запись помечается и выбрасывается
+    при извлечении, куча перестраивается, если отменённых больше половины).
+    Обратные вызовы выполняются в потоке планировщика и должны быть
+    короткими - медленную работу (отправку сообщений) нужно передавать
+    в другие очереди.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._cancelled = 0
+        self._thread = None
+        self._running = True
+
+    def _ensure_started(self):
+        # Вызывается под self._cond
+        if self._thread is None and self._running:
+            self._thread = threading.Thread(
+                target=self._loop, name="deadlines", daemon=True
+            )
+            self._thread.start()
+
+    def call_at(self, due, callback, *args):
+        with self._cond:
+            deadline = Deadline(self, due, next(self._seq), callback, args)
+            heapq.heappush(self._heap, deadline)
+            self._ensure_started()
+            # Будим поток, только если новый срок стал ближайшим
+            if self._heap[0] is deadline:
+                self._cond.notify()
+            return deadline
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def _cancel(self, deadline):
+        with self._cond:
+            if deadline.cancelled or deadline.callback is None:
+                return
+            deadline.cancelled = True
+            deadline.args = ()
+            self._cancelled += 1
+            if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+                self._heap = [d for d in self._heap if not d.cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._running:
+                        return
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    head = self._heap[0]
+                    if head.cancelled:
+                        heapq.heappop(self._heap)
+                        self._cancelled -= 1
+                        continue
+                    delay = head.due - time.monotonic()
+                    if delay > 0:
+                        self._cond.wait(delay)
+                        continue
+                    heapq.heappop(self._heap)
+                    callback, args = head.callback, head.args
+                    # Выполнен - повторная отмена ни на что не влияет
+                    head.callback, head.args = None, ()
+                    break
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"Ошибка отложенного вызова {callback}: {e}", exc_info=True)
+
+    def pending(self):
+        """Метрика: число ожидающих (не отменённых) вызовов"""
+        with self._cond:
+            return len(self._heap) - self._cancelled
+
+    def shutdown(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+
+deadlines = DeadlineScheduler()
@@ -0,0 +1,133 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class DbOverloadedError(Exception):
+    """Очередь к БД переполнена - запрос не принят"""
+
+
+class DbExecutor:
+    """Выполнение запросов к БД вне потоков обработчиков
+
+    Все записи идут через один поток-писатель (одно соединение, никаких
+    "database is locked" между своими же писателями), чтения - через пул.
+    Обе очереди ограничены: если БД не успевает, постановка ждёт не дольше
+    put_timeout и затем выбрасывает DbOverloadedError.
+    """
+
+    def __init__(self, readers=4, max_queue=500, put_timeout=5.0):
+        self.max_queue = max_queue
+        self.put_timeout = put_timeout
+        self._writes = queue.Queue(maxsize=max_queue)
+        self._read_slots = threading.BoundedSemaphore(max_queue)
+        self._readers_count = readers
+        self._readers = None
+        self._writer = None
+        self._start_lock = threading.Lock()
+        self._pending_reads = 0
+        self._max_write_depth = 0
+        self._stats_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is None:
+                self._readers = ThreadPoolExecutor(
+                    max_workers=self._readers_count, thread_name_prefix="db-reader"
+                )
+                writer = threading.Thread(
+                    target=self._write_loop, name="db-writer", daemon=True
+                )
+                writer.start()
+                self._writer = writer
+
+    def _write_loop(self):
+        while True:
+            item = self._writes.get()
+            if item is None:
+                break
+            future, func, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def write(self, func, *args, **kwargs):
+        """Ставит запись в очередь писателя, возвращает Future"""
+        self._ensure_started()
+        future = Future()
+        try:
+            self._writes.put((future, func, args, kwargs), timeout=self.put_timeout)
+        except queue.Full:
+            raise DbOverloadedError(
+                f"Очередь записи переполнена ({self.max_queue})"
+            ) from None
+        depth = self._writes.qsize()
+        with self._stats_lock:
+            self._max_write_depth = max(self._max_write_depth, depth)
+        return future
+
+    def read(self, func, *args, **kwargs):
+        """Выполняет чтение в пуле читателей, возвращает Future"""
+        self._ensure_started()
+        if not self._read_slots.acquire(timeout=self.put_timeout):
+            raise DbOverloadedError(f"Очередь чтения переполнена ({self.max_queue})")
+        with self._stats_lock:
+            self._pending_reads += 1
+        try:
+            future = self._readers.submit(func, *args, **kwargs)
+        except BaseException:
+            self._read_done(None)
+            raise
+        future.add_done_callback(self._read_done)
+        return future
+
+    def _read_done(self, _future):
+        with self._stats_lock:
+            self._pending_reads -= 1
+        self._read_slots.release()
+
+    def queue_depth(self):
+        """Метрика: текущая глубина очередей"""
+        with self._stats_lock:
+            return {
+                "write": self._writes.qsize(),
+                "write_max": self._max_write_depth,
+                "read": self._pending_reads,
+            }
+
+    def shutdown(self, wait=True):
+        """Дожидается выполнения поставленных запросов и останавливает потоки"""
+        with self._start_lock:
+            writer, self._writer = self._writer, None
+            readers, self._readers = self._readers, None
+        if writer is not None:
+            self._writes.put(None)
+            if wait:
+                writer.join()
+        if readers is not None:
+            readers.shutdown(wait=wait)
+
+
+def log_errors(future, description):
+    """Логирует ошибку запроса, результат которого никто не ждёт"""
+
+    def callback(done):
+        if done.cancelled():
+            return
+        error = done.exception()
+        if error is not None:
+            logger.error(f"Ошибка БД ({description}): {error}", exc_info=error)
+
+    future.add_done_callback(callback)
+    return future
+
+
+db_executor = DbExecutor()
@@ -0,0 +1,258 @@
+import json
+import logging
+
+from database.connection import db
+
+logger = logging.getLogger(__name__)
+
+
+def _v1_initial_schema(c):
+    """Исходная схема (совпадает с прежним ContestManager._init_db)"""
+    # Таблица для инфо о конкурсе
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS contests
+                (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                theme TEXT NOT NULL,
+                description TEXT NOT NULL,
+                contest_date TEXT NOT NULL,
+                end_date_of_admission TEXT NOT NULL)"""
+    )
+
+    # Таблица для работ
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS submissions
+                (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                username TEXT,
+                full_name TEXT,
+                photos TEXT NOT NULL,
+                caption TEXT,
+                status TEXT DEFAULT 'pending',
+                reason TEXT,
+                submission_number INTEGER,
+                timestamp DATETIME)"""
+    )
+
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS approved_submissions (
+            user_id INTEGER NOT NULL,
+            submission_id INTEGER NOT NULL,
+            PRIMARY KEY (user_id, submission_id)
+        )"""
+    )
+
+    # Таблица для судей
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS judges
+                (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                username TEXT,
+                full_name TEXT NOT NULL)"""
+    )
+
+    # Таблица для счетчиков
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS counters
+                (name TEXT PRIMARY KEY,
+                value INTEGER)"""
+    )
+    # Инициализация счетчика
+    c.execute("INSERT OR IGNORE INTO counters VALUES ('submission', 0)")
+
+    c.execute("CREATE INDEX IF NOT EXISTS idx_submissions_status ON submissions(status)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_submissions_user ON submissions(user_id)")
+
+    # Таблица ЧС
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS blocked_users
+             (user_id INTEGER PRIMARY KEY,
+              username TEXT,
+              full_name TEXT,
+              blocked_at DATETIME DEFAULT CURRENT_TIMESTAMP)"""
+    )
+
+
+def _v2_contest_stats(c):
+    """Счётчики статистики конкурса, которые поддерживаются триггерами"""
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS contest_stats
+                (id INTEGER PRIMARY KEY CHECK (id = 1),
+                pending INTEGER NOT NULL DEFAULT 0,
+                approved INTEGER NOT NULL DEFAULT 0,
+                rejected INTEGER NOT NULL DEFAULT 0,
+                judges INTEGER NOT NULL DEFAULT 0)"""
+    )
+    c.execute(
+        """INSERT OR REPLACE INTO contest_stats (id, pending, approved, rejected, judges)
+           SELECT 1,
+                  (SELECT COUNT(*) FROM submissions WHERE status = 'pending'),
+                  (SELECT COUNT(*) FROM submissions WHERE status = 'approved'),
+                  (SELECT COUNT(*) FROM submissions WHERE status = 'rejected'),
+                  (SELECT COUNT(*) FROM judges)"""
+    )
+
+    # "IS" вместо "=" - чтобы NULL в статусе давал 0, а не NULL
+    c.execute(
+        """CREATE TRIGGER IF NOT EXISTS trg_stats_submission_insert
+           AFTER INSERT ON submissions
+           BEGIN
+               UPDATE contest_stats SET
+                   pending = pending + (NEW.status IS 'pending'),
+                   approved = approved + (NEW.status IS 'approved'),
+                   rejected = rejected + (NEW.status IS 'rejected')
+               WHERE id = 1;
+           END"""
+    )
+    c.execute(
+        """CREATE TRIGGER IF NOT EXISTS trg_stats_submission_delete
+           AFTER DELETE ON submissions
+           BEGIN
+               UPDATE contest_stats SET
+                   pending = pending - (OLD.status IS 'pending'),
+                   approved = approved - (OLD.status IS 'approved'),
+                   rejected = rejected - (OLD.status IS 'rejected')
+               WHERE id = 1;
+           END"""
+    )
+    c.execute(
+        """CREATE TRIGGER IF NOT EXISTS trg_stats_submission_update
+           AFTER UPDATE OF status ON submissions
+           WHEN OLD.status IS NOT NEW.status
+           BEGIN
+               UPDATE contest_stats SET
+                   pending = pending - (OLD.status IS 'pending') + (NEW.status IS 'pending'),
+                   approved = approved - (OLD.status IS 'approved') + (NEW.status IS 'approved'),
+                   rejected = rejected - (OLD.status IS 'rejected') + (NEW.status IS 'rejected')
+               WHERE id = 1;
+           END"""
+    )
+    c.execute(
+        """CREATE TRIGGER IF NOT EXISTS trg_stats_judge_insert
+           AFTER INSERT ON judges
+           BEGIN
+               UPDATE contest_stats SET judges = judges + 1 WHERE id = 1;
+           END"""
+    )
+    c.execute(
+        """CREATE TRIGGER IF NOT EXISTS trg_stats_judge_delete
+           AFTER DELETE ON judges
+           BEGIN
+               UPDATE contest_stats SET judges = judges - 1 WHERE id = 1;
+           END"""
+    )
+
+
+def _v3_submission_photos(c):
+    """Фото работ в отдельной таблице вместо JSON в submissions.photos"""
+    c.execute(
+        """CREATE TABLE IF NOT EXISTS submission_photos
+                (submission_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                file_id TEXT NOT NULL,
+                unique_id TEXT,
+                PRIMARY KEY (submission_id, position)) WITHOUT ROWID"""
+    )
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_submission_photos_unique ON submission_photos(unique_id)"
+    )
+    # Фото удаляются вместе с работой (в т.ч. при сбросе счётчика)
+    c.execute(
+        """CREATE TRIGGER IF NOT EXISTS trg_submission_photos_delete
+           AFTER DELETE ON submissions
+           BEGIN
+               DELETE FROM submission_photos WHERE submission_id = OLD.id;
+           END"""
+    )
+
+    # Переносим существующие JSON-списки
+    rows = c.execute(
+        "SELECT id, photos FROM submissions WHERE photos IS NOT NULL AND photos != ''"
+    ).fetchall()
+    for submission_id, raw_photos in rows:
+        try:
+            photos = json.loads(raw_photos)
+        except json.JSONDecodeError as e:
+            logger.error(f"Работа {submission_id}: некорректный JSON фото ({e})")
+            continue
+        c.executemany(
+            """INSERT OR IGNORE INTO submission_photos
+                (submission_id, position, file_id, unique_id)
+                VALUES (?, ?, ?, ?)""",
+            [
+                (submission_id, position, photo["file_id"], photo.get("unique_id"))
+                for position, photo in enumerate(photos)
+                if photo.get("file_id")
+            ],
+        )
+        c.execute("UPDATE submissions SET photos = '' WHERE id = ?", (submission_id,))
+
+
+def _v4_keyset_indexes(c):
+    """Индекс под постраничный обход работ по статусу в порядке id"""
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_submissions_status_id ON submissions(status, id)"
+    )
+    # Покрывается новым индексом
+    c.execute("DROP INDEX IF EXISTS idx_submissions_status")
+
+
+def _v5_submission_claims(c):
+    """Аренда работы админом на время проверки"""
+    c.execute("ALTER TABLE submissions ADD COLUMN claimed_by INTEGER")
+    # Unix-время окончания аренды
+    c.execute("ALTER TABLE submissions ADD COLUMN claimed_until REAL")
+
+
+# Упорядоченный список миграций: (версия, описание, функция)
+# Новые изменения схемы добавляются сюда с очередным номером версии,
+# уже применённые шаги не редактируются
+MIGRATIONS = [
+    (1, "Исходная схема", _v1_initial_schema),
+    (2, "Таблица contest_stats и триггеры счётчиков", _v2_contest_stats),
+    (3, "Таблица submission_photos вместо JSON", _v3_submission_photos),
+    (4, "Индекс submissions(status, id)", _v4_keyset_indexes),
+    (5, "Аренда работ на проверке (claimed_by, claimed_until)", _v5_submission_claims),
+]
+
+
+def get_schema_version(database=db):
+    conn = database.connection()
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS schema_version
+                (version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at DATETIME DEFAULT CURRENT_TIMESTAMP)"""
+    )
+    conn.commit()
+    return conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+
+
+def migrate(database=db):
+    """Применяет недостающие миграции, вызывается один раз при старте"""
+    current = get_schema_version(database)
+    pending = [m for m in MIGRATIONS if m[0] > current]
+    if not pending:
+        return current
+
+    conn = database.connection()
+    # IMMEDIATE - второй процесс дождётся окончания миграции, а не начнёт свою
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        c = conn.cursor()
+        current = c.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info(f"Миграция БД до версии {version}: {description}")
+            step(c)
+            c.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description),
+            )
+            current = version
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return current
@@ -0,0 +1,312 @@
+import logging
+import time
+from collections import Counter, OrderedDict
+from threading import Lock
+
+from database.deadlines import deadlines
+
+logger = logging.getLogger(__name__)
+
+
+class Flow:
+    """Сценарии диалога, состояние которых хранится в SessionStore"""
+
+    CONTEST = "contest"  # Отправка работы на конкурс (ContestSubmission)
+    CONTENT = "content"  # Сбор новости / кода / кармана / дизайна
+    RELAY = "relay"  # Готовый контент, ожидающий отправки админам
+    ADMIN_CONTEST = "admin_contest"  # Админ заполняет информацию о конкурсе
+    ADMIN_BATCH = "admin_batch"  # Выбор работ для пакетной модерации
+    ADMIN_REPLY = "admin_reply"  # Админ отвечает пользователю (ключ - chat_id)
+
+
+class _FlowConfig:
+    __slots__ = ("ttl", "sliding", "on_expire")
+
+    def __init__(self, ttl, sliding, on_expire):
+        self.ttl = ttl
+        self.sliding = sliding
+        self.on_expire = on_expire
+
+
+class _Entry:
+    __slots__ = ("value", "deadline", "touched")
+
+    def __init__(self, value, deadline, touched):
+        self.value = value
+        self.deadline = deadline
+        self.touched = touched  # time.monotonic() последнего обращения
+
+
+class _Session:
+    __slots__ = ("flows", "referenced")
+
+    def __init__(self):
+        self.flows = {}  # flow -> _Entry
+        self.referenced = False  # Было обращение с момента последней проверки LRU
+
+
+class _Stripe:
+    """Часть сессий со своей блокировкой"""
+
+    __slots__ = ("sessions", "lock", "metrics")
+
+    def __init__(self):
+        self.sessions = OrderedDict()  # user_id -> _Session, порядок вытеснения
+        self.lock = Lock()
+        self.metrics = Counter()
+
+
+class FlowView:
+    """Состояние одного сценария как словарь user_id -> значение"""
+
+    def __init__(self, store, flow):
+        self._store = store
+        self._flow = flow
+
+    def __contains__(self, user_id):
+        return self._store.contains(user_id, self._flow)
+
+    def __getitem__(self, user_id):
+        value = self._store.get(user_id, self._flow, _MISSING)
+        if value is _MISSING:
+            raise KeyError(user_id)
+        return value
+
+    def __setitem__(self, user_id, value):
+        self._store.set(user_id, self._flow, value)
+
+    def __delitem__(self, user_id):
+        if self._store.pop(user_id, self._flow, _MISSING) is _MISSING:
+            raise KeyError(user_id)
+
+    def __len__(self):
+        return len(self._store.users(self._flow))
+
+    def get(self, user_id, default=None):
+        return self._store.get(user_id, self._flow, default)
+
+    def pop(self, user_id, default=None):
+        return self._store.pop(user_id, self._flow, default)
+
+    def keys(self):
+        return self._store.users(self._flow)
+
+
+_MISSING = object()
+
+
+class SessionStore:
+    """Состояние диалогов всех пользователей: одна сессия на user_id,
+    внутри - значения по сценариям (Flow)
+
+    - у каждого сценария свой TTL: скользящий (продлевается при каждом
+      обращении) или от начала сценария; срок каждого значения стоит в
+      планировщике (DeadlineScheduler), значение удаляется точно в срок,
+      и для него вызывается on_expire(user_id, value);
+    - число сессий ограничено max_sessions: при переполнении вытесняется
+      сессия, к которой давно не обращались (алгоритм второго шанса).
+
+    Сессии разложены по stripes частям по user_id, у каждой части своя
+    блокировка - пользователи из разных частей не ждут друг друга. Чтение
+    (get, contains) идёт без блокировок: обращение только отмечает время
+    и флаг использования, а скользящий срок переносится, когда он наступит.
+    """
+
+    def __init__(
+        self, max_sessions=10000, default_ttl=60 * 60, scheduler=deadlines, stripes=64
+    ):
+        self.max_sessions = max_sessions
+        self.default_ttl = default_ttl
+        self.scheduler = scheduler
+        self._flows = {}
+        self._stripes = [_Stripe() for _ in range(stripes)]
+        # Лимит на часть: вытеснение идёт внутри части
+        self._stripe_limit = max(1, -(-max_sessions // stripes))
+
+    def register(self, flow, ttl=None, sliding=True, on_expire=None):
+        """Настройка срока жизни сценария (по умолчанию - default_ttl, скользящий)"""
+        self._flows[flow] = _FlowConfig(
+            self.default_ttl if ttl is None else ttl, sliding, on_expire
+        )
+
+    def _config(self, flow):
+        config = self._flows.get(flow)
+        if config is None:
+            config = self._flows.setdefault(
+                flow, _FlowConfig(self.default_ttl, True, None)
+            )
+        return config
+
+    def _stripe(self, user_id):
+        return self._stripes[hash(user_id) % len(self._stripes)]
+
+    def _entry(self, user_id, flow, touch):
+        # Без блокировки: dict.get атомарен, а устаревшее значение равносильно
+        # чтению чуть раньше параллельного изменения
+        session = self._stripe(user_id).sessions.get(user_id)
+        entry = session.flows.get(flow) if session is not None else None
+        if entry is not None and touch:
+            entry.touched = time.monotonic()
+            session.referenced = True
+        return entry
+
+    def get(self, user_id, flow, default=None):
+        entry = self._entry(user_id, flow, touch=True)
+        return default if entry is None else entry.value
+
+    def contains(self, user_id, flow):
+        return self._entry(user_id, flow, touch=False) is not None
+
+    def set(self, user_id, flow, value):
+        """Новое значение сценария; срок жизни отсчитывается заново"""
+        self._put(user_id, flow, lambda: value, replace=True)
+
+    def setdefault(self, user_id, flow, factory):
+        """Значение сценария; если его нет - сохраняет и возвращает factory()"""
+        return self._put(user_id, flow, factory, replace=False)
+
+    def _put(self, user_id, flow, factory, replace):
+        stripe = self._stripe(user_id)
+        evicted = []
+        with stripe.lock:
+            session = stripe.sessions.get(user_id)
+            if session is None:
+                session = stripe.sessions[user_id] = _Session()
+                session.referenced = True
+                evicted = self._evict(stripe)
+            session.referenced = True
+            old = session.flows.get(flow)
+            if old is not None and not replace:
+                old.touched = time.monotonic()
+                return old.value
+            if old is not None:
+                old.deadline.cancel()
+            value = factory()
+            entry = session.flows[flow] = _Entry(value, None, time.monotonic())
+            entry.deadline = self.scheduler.call_at(
+                entry.touched + self._config(flow).ttl,
+                self._expire_entry,
+                user_id,
+                flow,
+                entry,
+            )
+        for old_user_id, old_session in evicted:
+            for old_entry in old_session.flows.values():
+                old_entry.deadline.cancel()
+            logger.warning(
+                f"Хранилище сессий переполнено ({self.max_sessions}), "
+                f"вытеснена сессия {old_user_id}: {sorted(old_session.flows)}"
+            )
+        return value
+
+    def _evict(self, stripe):
+        # Вызывается под stripe.lock. Сессии, к которым обращались, получают
+        # второй шанс - переносятся в конец очереди со сброшенным флагом
+        evicted = []
+        while len(stripe.sessions) > self._stripe_limit:
+            user_id, session = stripe.sessions.popitem(last=False)
+            if session.referenced:
+                session.referenced = False
+                stripe.sessions[user_id] = session
+            else:
+                evicted.append((user_id, session))
+        stripe.metrics["evicted"] += len(evicted)
+        return evicted
+
+    def touch(self, user_id, flow):
+        """Продлевает скользящий срок сценария без чтения значения"""
+        self._entry(user_id, flow, touch=True)
+
+    def pop(self, user_id, flow, default=None):
+        stripe = self._stripe(user_id)
+        with stripe.lock:
+            session = stripe.sessions.get(user_id)
+            entry = session.flows.pop(flow, None) if session is not None else None
+            if session is not None and not session.flows:
+                del stripe.sessions[user_id]
+        if entry is None:
+            return default
+        entry.deadline.cancel()
+        return entry.value
+
+    def clear(self, user_id, flow=None):
+        """Удаляет сценарий пользователя или всю его сессию (flow=None)"""
+        if flow is not None:
+            self.pop(user_id, flow)
+            return
+        stripe = self._stripe(user_id)
+        with stripe.lock:
+            session = stripe.sessions.pop(user_id, None)
+        if session is not None:
+            for entry in session.flows.values():
+                entry.deadline.cancel()
+
+    def clear_flow(self, flow):
+        """Удаляет сценарий у всех пользователей"""
+        for user_id in self.users(flow):
+            self.pop(user_id, flow)
+
+    def users(self, flow):
+        users = []
+        for stripe in self._stripes:
+            with stripe.lock:
+                users.extend(
+                    user_id
+                    for user_id, session in stripe.sessions.items()
+                    if flow in session.flows
+                )
+        return users
+
+    def _expire_entry(self, user_id, flow, entry):
+        """Срок значения наступил (вызывается планировщиком)"""
+        config = self._config(flow)
+        stripe = self._stripe(user_id)
+        with stripe.lock:
+            session = stripe.sessions.get(user_id)
+            # Значение уже заменено или удалено - срок не актуален
+            if session is None or session.flows.get(flow) is not entry:
+                return
+            if config.sliding:
+                due = entry.touched + config.ttl
+                if due > time.monotonic():
+                    # С тех пор к значению обращались - переносим срок
+                    entry.deadline = self.scheduler.call_at(
+                        due, self._expire_entry, user_id, flow, entry
+                    )
+                    return
+            del session.flows[flow]
+            if not session.flows:
+                del stripe.sessions[user_id]
+            stripe.metrics[f"expired:{flow}"] += 1
+
+        if config.on_expire is not None:
+            try:
+                config.on_expire(user_id, entry.value)
+            except Exception as e:
+                logger.error(f"Ошибка on_expire ({flow}, {user_id}): {e}", exc_info=True)
+
+    def view(self, flow):
+        return FlowView(self, flow)
+
+    def stats(self):
+        """Метрики: число сессий, значения по сценариям, истечения и вытеснения"""
+        flows = Counter()
+        metrics = Counter()
+        total = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                total += len(stripe.sessions)
+                metrics.update(stripe.metrics)
+                for session in stripe.sessions.values():
+                    flows.update(session.flows.keys())
+        return {
+            "sessions": total,
+            "max_sessions": self.max_sessions,
+            "stripes": len(self._stripes),
+            "flows": dict(flows),
+            "deadlines": self.scheduler.pending(),
+            **metrics,
+        }
+
+
+sessions = SessionStore()
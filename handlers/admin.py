@@ -1,5 +1,6 @@
 import logging
 import re
+import time
 from venv import logger
 from datetime import datetime
 import traceback
@@ -12,10 +13,19 @@ from database.db_classes import (
     ContestManager,
     SubmissionManager,
     get_submission,
+    judges_version,
+    submissions_version,
     user_submissions,
 )
+from database.executor import db_executor, log_errors
+from database.sessions import Flow, sessions
 from handlers.decorator import private_chat_only
-from handlers.envParams import admin_ids, news_ids
+from handlers.dispatcher import dispatcher
+from handlers.notifications import call_soon, notifications, relays
+from handlers.outbound import outbound
+from handlers.pagination import TextPaginator
+from handlers.review import review_sessions
+from handlers.roles import Role, UserRoles
 from bot_instance import bot
 from menu.constants import ButtonCallback, ButtonText
 from menu.menu import Menu
@@ -33,33 +43,41 @@ bot_username = bot.get_me().username
 
 
 class TempStorage:
-    def __init__(self):
-        self.data = {}
+    """Данные пошагового сценария админа (словарь на пользователя) в хранилище сессий"""
+
+    def __init__(self, flow, store=sessions):
+        self.flow = flow
+        self.store = store
         self.lock = Lock()
 
     def get_user_step(self, user_id):
-        with self.lock:
-            return self.data.get(user_id, {}).get("step")
+        return self.get(user_id, "step")
 
     def set_user_step(self, user_id, step):
-        with self.lock:
-            if user_id not in self.data:
-                self.data[user_id] = {}
-            self.data[user_id]["step"] = step
+        self.update_data(user_id, step=step)
 
     def update_data(self, user_id, **kwargs):
         with self.lock:
-            if user_id not in self.data:
-                self.data[user_id] = {}
-            self.data[user_id].update(kwargs)
+            data = self.store.get(user_id, self.flow)
+            if data is None:
+                self.store.set(user_id, self.flow, dict(kwargs))
+            else:
+                data.update(kwargs)
 
-    def clear(self, user_id):
+    def get(self, user_id, key, default=None):
+        return self.get_data(user_id).get(key, default)
+
+    def get_data(self, user_id):
         with self.lock:
-            if user_id in self.data:
-                del self.data[user_id]
+            return dict(self.store.get(user_id, self.flow) or {})
+
+    def clear(self, user_id):
+        self.store.pop(user_id, self.flow)
 
 
-storage = TempStorage()
+storage = TempStorage(Flow.ADMIN_CONTEST)
+# Пакетная модерация: selected - выбранные работы, cursor - текущая страница
+batch_storage = TempStorage(Flow.ADMIN_BATCH)
 
 ADMIN_STEPS = {
     "theme": "Введите тему конкурса:",
@@ -70,7 +88,7 @@ ADMIN_STEPS = {
 
 
 def check_admin(call):
-    if call.from_user.id not in admin_ids:
+    if Role.ADMIN not in UserRoles.get(call.from_user.id):
         bot.answer_callback_query(
             call.id,
             "⚠️ Вы не являетесь админом\n\nВы вообще как сюда попали???",
@@ -79,8 +97,20 @@ def check_admin(call):
         return False
     return True
 
+
+def parse_page_cursor(data):
+    """Курсор страницы из callback_data вида <prefix>:n:<id> или <prefix>:p:<id>"""
+    parts = data.split(":")
+    if len(parts) == 3 and parts[2].isdigit():
+        if parts[1] == "n":
+            return {"after_id": int(parts[2])}
+        if parts[1] == "p":
+            return {"before_id": int(parts[2])}
+    return {}
+
+
 def check_admin_or_news(call):
-    if call.from_user.id not in admin_ids and call.from_user.id not in news_ids:
+    if not UserRoles.get(call.from_user.id) & (Role.ADMIN | Role.NEWS):
         bot.answer_callback_query(
             call.id,
             "⚠️ Вы не являетесь админом\n\nВы вообще как сюда попали???",
@@ -96,6 +126,8 @@ def check_admin_or_news(call):
 def handle_adm_contest(call):
     if not check_admin(call):
         return
+    # Ушли с экрана проверки работ
+    review_sessions.cancel(call.from_user.id)
     logger = logging.getLogger(__name__)
     logger.debug(f"Received callback: {call.data}, chat_id: {call.message.chat.id}")
     bot.edit_message_text(
@@ -124,12 +156,12 @@ def start_contest_update(call):
 
         if contest:
             # Экранируем все динамические данные
-            theme = escape_markdown(contest[1], version=2)
-            description = escape_markdown(contest[2], version=2)
+            theme = escape_markdown(contest.theme, version=2)
+            description = escape_markdown(contest.description, version=2)
 
             # Экранируем даты с точками
-            contest_date = escape_markdown(contest[3], version=2)
-            end_date_of_admission = escape_markdown(contest[4], version=2)
+            contest_date = escape_markdown(contest.contest_date_text, version=2)
+            end_date_of_admission = escape_markdown(contest.end_date_text, version=2)
 
             text += (
                 f"🏷 Тема: {theme}\n"
@@ -182,7 +214,7 @@ def start_contest_update(call):
 # Обработчик отмены
 @bot.callback_query_handler(func=lambda call: call.data == "cancel_update")
 def handle_cancel_update(call):
-    bot.delete_message(call.message.chat.id, call.message.message_id)
+    call_soon("delete_message", call.message.chat.id, call.message.message_id)
     bot.send_message(
         call.message.chat.id,
         "Действие отменено",
@@ -212,12 +244,24 @@ def handle_reset_info(call):
 
 @bot.callback_query_handler(func=lambda call: call.data == "confirm_reset_info")
 def handle_reset_info(call):
-    storage.clear
-    bot.edit_message_text(
-        "Данные очищены",
-        chat_id=call.message.chat.id,
-        message_id=call.message.message_id,
-        reply_markup=Menu.back_adm_contest_menu(),
+    if not check_admin(call):
+        return
+    storage.clear(call.from_user.id)
+
+    def cleared(_):
+        bot.edit_message_text(
+            "Данные очищены",
+            chat_id=call.message.chat.id,
+            message_id=call.message.message_id,
+            reply_markup=Menu.back_adm_contest_menu(),
+        )
+
+    # Удаление из БД и сброс кэша конкурса выполняются вместе; ответ -
+    # когда запись выполнена, поток обработчика её не ждёт
+    dispatcher.then(
+        db_executor.write(ContestManager.clear_contest),
+        cleared,
+        on_error=partial(handle_admin_error, call.message.chat.id),
     )
 
 
@@ -267,18 +311,26 @@ def handle_admin_input(message):
         bot.send_message(message.chat.id, ADMIN_STEPS[next_step])
     else:
         # Все данные собраны
-        data = storage.data[user_id]
-        ContestManager.update_contest(
-            data["theme"],
-            data["description"],
-            data["contest_date"],
-            data["end_date_of_admission"],
-        )
-        storage.clear(user_id)
-        bot.send_message(
-            message.chat.id,
-            "✅ Данные обновлены!",
-            reply_markup=Menu.back_adm_contest_menu(),
+        data = storage.get_data(user_id)
+
+        def updated(_):
+            storage.clear(user_id)
+            bot.send_message(
+                message.chat.id,
+                "✅ Данные обновлены!",
+                reply_markup=Menu.back_adm_contest_menu(),
+            )
+
+        dispatcher.then(
+            db_executor.write(
+                ContestManager.update_contest,
+                data["theme"],
+                data["description"],
+                data["contest_date"],
+                data["end_date_of_admission"],
+            ),
+            updated,
+            on_error=partial(handle_admin_error, message.chat.id),
         )
 
 
@@ -289,18 +341,15 @@ def show_stats(call):
     if not check_admin(call):
         return
     try:
-        pending = SubmissionManager.get_pending_count()
-        approved = SubmissionManager.get_approved_count()
-        rejected = SubmissionManager.get_rejected_count()
-        judges = SubmissionManager.get_judges_count()
+        stats = SubmissionManager.get_stats()
 
         bot.edit_message_text(
             text=(
                 f"📊 *Статистика конкурса:*\n\n"
-                f"⏳ Ожидают проверки: `{pending}`\n"
-                f"✅ Одобрено работ: `{approved}`\n"
-                f"❌ Отклонено работ: `{rejected}`\n"
-                f"⚖️ Подали заявку на судейство: `{judges}`"
+                f"⏳ Ожидают проверки: `{stats['pending']}`\n"
+                f"✅ Одобрено работ: `{stats['approved']}`\n"
+                f"❌ Отклонено работ: `{stats['rejected']}`\n"
+                f"⚖️ Подали заявку на судейство: `{stats['judges']}`"
             ),
             chat_id=call.message.chat.id,
             message_id=call.message.message_id,
@@ -312,12 +361,114 @@ def show_stats(call):
         handle_admin_error(call.message.chat.id, e)
 
 
+# Сверка счётчиков статистики с фактическими данными в БД
+@bot.message_handler(commands=["check_stats"])
+@private_chat_only(bot)
+def handle_check_stats(message):
+    if Role.ADMIN not in UserRoles.get(message.from_user.id):
+        bot.reply_to(message, "❌ У вас нет прав для этой команды")
+        return
+    try:
+        stored, actual = SubmissionManager.check_stats(fix=True)
+        if stored == actual:
+            bot.send_message(message.chat.id, "✅ Статистика совпадает с данными в БД")
+            return
+
+        text = "⚠️ Статистика расходилась с БД и была пересчитана:\n\n"
+        for field in actual:
+            if stored[field] != actual[field]:
+                text += f"{field}: {stored[field]} → {actual[field]}\n"
+        logger = logging.getLogger(__name__)
+        logger.warning(f"Пересчёт статистики: было {stored}, стало {actual}")
+        bot.send_message(message.chat.id, text)
+
+    except Exception as e:
+        handle_admin_error(message.chat.id, e)
+
+
+# Состояние хранилища сессий пользователей
+@bot.message_handler(commands=["session_stats"])
+@private_chat_only(bot)
+def handle_session_stats(message):
+    if Role.ADMIN not in UserRoles.get(message.from_user.id):
+        bot.reply_to(message, "❌ У вас нет прав для этой команды")
+        return
+    try:
+        stats = sessions.stats()
+        text = (
+            f"🗂 Сессий: {stats.pop('sessions')}/{stats.pop('max_sessions')}\n"
+            f"Вытеснено при переполнении: {stats.pop('evicted', 0)}\n\n"
+        )
+        for flow, count in sorted(stats.pop("flows").items()):
+            text += f"{flow}: {count}\n"
+        for name, value in sorted(stats.items()):
+            text += f"{name}: {value}\n"
+        queues = dispatcher.stats()
+        text += (
+            f"\n📥 Очереди пользователей: {queues['queues']}, "
+            f"апдейтов в них: {queues['pending']}, ждут альбома: {queues['waiting']}, "
+            f"отброшено: {queues['dropped']}\n"
+        )
+        depth = db_executor.queue_depth()
+        text += (
+            f"\n💾 Очередь записи в БД: {depth['write']} (макс. {depth['write_max']}), "
+            f"чтений в работе: {depth['read']}\n"
+        )
+        api = outbound.stats()
+        text += f"\n📤 Запросы к API, ответов 429: {api['rate_limited']}\n"
+        for lane, lane_stats in api["lanes"].items():
+            text += (
+                f"{lane}: ждут {lane_stats['waiting']}, отправлено {lane_stats['granted']}, "
+                f"ожидание {lane_stats['avg_wait']} с (макс. {lane_stats['max_wait']} с)\n"
+            )
+        relayed = relays.stats()
+        text += (
+            f"Пересылки: в очереди {relayed['pending']}, переслано {relayed['sent']}, "
+            f"с ошибкой {relayed['failed']}\n"
+        )
+        bot.send_message(message.chat.id, text)
+
+    except Exception as e:
+        handle_admin_error(message.chat.id, e)
+
+
+def format_participant(row):
+    _, full_name, username, status, number = row
+    return (
+        f"👤 {full_name}\n"
+        f"🗨️ @{username}\n"
+        f"🔄 Статус: {status}\n"
+        f"🔢 Номер: {number or 'не присвоен'}\n"
+        f"────────────────\n"
+    )
+
+
+def format_judge(row):
+    _, full_name, username = row
+    return f"👤 {full_name}\n🗨️ @{username}\n────────────────\n"
+
+
+# Списки режутся на страницы по лимиту длины сообщения
+participants_pages = TextPaginator(
+    "📋 Список участников:\n\n",
+    SubmissionManager.iter_submissions,
+    format_participant,
+    submissions_version,
+)
+judges_pages = TextPaginator(
+    "📋 Список судей:\n\n",
+    SubmissionManager.iter_judges,
+    format_judge,
+    judges_version,
+)
+
+
 @bot.callback_query_handler(
-    func=lambda call: call.data == ButtonCallback.ADM_SHOW_PARTICIPANTS
+    func=lambda call: call.data.split(":")[0] == ButtonCallback.ADM_SHOW_PARTICIPANTS
 )
 def handle_show_participants(call):
-    participants = SubmissionManager.get_all_submissions_with_info()
-    if not participants:
+    text, page = participants_pages.render(**parse_page_cursor(call.data))
+    if not text:
         bot.edit_message_text(
             text=("❌ Нет данных об участниках"),
             chat_id=call.message.chat.id,
@@ -327,30 +478,22 @@ def handle_show_participants(call):
         )
         return
 
-    text = "📋 Список участников:\n\n"
-    for p in participants:
-        text += (
-            f"👤 {p[0]}\n"
-            f"🗨️ @{p[1]}\n"
-            f"🔄 Статус: {p[2]}\n"
-            f"🔢 Номер: {p[3] or 'не присвоен'}\n"
-            f"────────────────\n"
-        )
-
     bot.edit_message_text(
         text=text,
         chat_id=call.message.chat.id,
         message_id=call.message.message_id,
-        reply_markup=Menu.adm_stat_menu(),
+        reply_markup=Menu.add_page_navigation(
+            Menu.adm_stat_menu(), ButtonCallback.ADM_SHOW_PARTICIPANTS, page
+        ),
     )
 
 
 @bot.callback_query_handler(
-    func=lambda call: call.data == ButtonCallback.ADM_SHOW_JUDGES
+    func=lambda call: call.data.split(":")[0] == ButtonCallback.ADM_SHOW_JUDGES
 )
 def handle_show_judges(call):
-    judges = SubmissionManager.get_all_judges_with_info()
-    if not judges:
+    text, page = judges_pages.render(**parse_page_cursor(call.data))
+    if not text:
         bot.edit_message_text(
             text=("❌ Нет данных о судьях"),
             chat_id=call.message.chat.id,
@@ -360,24 +503,29 @@ def handle_show_judges(call):
         )
         return
 
-    text = "📋 Список судей:\n\n"
-    for j in judges:
-        text += f"👤 {j[0]}\n🗨️ @{j[1]}\n────────────────\n"
-
     bot.edit_message_text(
         text=text,
         chat_id=call.message.chat.id,
         message_id=call.message.message_id,
-        reply_markup=Menu.adm_stat_menu(),
+        reply_markup=Menu.add_page_navigation(
+            Menu.adm_stat_menu(), ButtonCallback.ADM_SHOW_JUDGES, page
+        ),
     )
 
 
 def process_rejection(message, submission_id):
     try:
-        SubmissionManager.update_submission(submission_id, "rejected", message.text)
-
+        # Запись идёт через поток-писатель, чтение - параллельно с ней
+        rejected = db_executor.write(
+            SubmissionManager.update_submission, submission_id, "rejected", message.text
+        )
         submission = get_submission(submission_id)
         user_id = submission["user_id"]
+    except Exception as e:
+        handle_admin_error(message.chat.id, e)
+        return
+
+    def done(_):
         user_notified = False  # Флаг успешности уведомления
 
         try:
@@ -401,7 +549,7 @@ def process_rejection(message, submission_id):
             chat_id=message.chat.id,
             message_id=message.message_id,
             text=(f"Работа #{submission_id} отклонена\n{status_text}"),
-            reply_markup=Menu.adm_menu(),
+            reply_markup=Menu.add_next_pending(Menu.adm_menu(), submission_id),
         )
 
         logger.info(
@@ -411,8 +559,9 @@ def process_rejection(message, submission_id):
             f"reason={message.text}"
         )
 
-    except Exception as e:
-        handle_admin_error(message.chat.id, e)
+    dispatcher.then(
+        rejected, done, on_error=partial(handle_admin_error, message.chat.id)
+    )
 
 
 def handle_admin_error(chat_id, error):
@@ -465,39 +614,37 @@ def handle_adm_contest_reset(call):
 def confirm_reset(call):
     if not check_admin(call):
         return
-    # Очищаем БД через менеджер
-    SubmissionManager.reset_counter()
+    # Очищаем БД через менеджер (в очереди писателя, не мешая остальным записям)
+    resetting = db_executor.write(SubmissionManager.reset_counter)
 
-    logger = logging.getLogger(__name__)
-    logger.debug("Обнуление данных - сброс счётчика")
-    logger.debug(
-        f"количество работ на модерации: {SubmissionManager.get_pending_count()}/0"
-    )
-    logger.debug(
-        f"количество одобренных работ: {SubmissionManager.get_approved_count()}/0"
-    )
-    logger.debug(
-        f"количество отвергнутых работ: {SubmissionManager.get_rejected_count()}/0"
-    )
-    logger.debug(
-        f"текущее количество участников всего: {SubmissionManager.get_current_number()}/0"
-    )
-    logger.debug(
-        f"количество подавших заявку на судейство: {SubmissionManager.get_judges_count()}/0"
-    )
+    def done(_):
+        logger = logging.getLogger(__name__)
+        logger.debug("Обнуление данных - сброс счётчика")
+        stats = SubmissionManager.get_stats()
+        logger.debug(f"количество работ на модерации: {stats['pending']}/0")
+        logger.debug(f"количество одобренных работ: {stats['approved']}/0")
+        logger.debug(f"количество отвергнутых работ: {stats['rejected']}/0")
+        logger.debug(
+            f"текущее количество участников всего: {SubmissionManager.get_current_number()}/0"
+        )
+        logger.debug(f"количество подавших заявку на судейство: {stats['judges']}/0")
 
-    # Очищаем временное хранилище
-    user_submissions.clear()
+        # Очищаем временное хранилище
+        user_submissions.clear()
 
-    logger.debug(
-        f"Временных данных в хранилище: {len(user_submissions.get_all_users())}/0"
-    )
+        logger.debug(
+            f"Временных данных в хранилище: {len(user_submissions.get_all_users())}/0"
+        )
 
-    bot.edit_message_text(
-        text="✅ Счетчик участников сброшен",
-        chat_id=call.message.chat.id,
-        message_id=call.message.message_id,
-        reply_markup=Menu.adm_contests_menu(),
+        bot.edit_message_text(
+            text="✅ Счетчик участников сброшен",
+            chat_id=call.message.chat.id,
+            message_id=call.message.message_id,
+            reply_markup=Menu.adm_contests_menu(),
+        )
+
+    dispatcher.then(
+        resetting, done, on_error=partial(handle_admin_error, call.message.chat.id)
     )
 
 
@@ -505,7 +652,7 @@ def confirm_reset(call):
 def handle_cancel_reset(call):
     if not check_admin(call):
         return
-    bot.delete_message(call.message.chat.id, call.message.message_id)
+    call_soon("delete_message", call.message.chat.id, call.message.message_id)
     bot.edit_message_text(
         text="🚫 Сброс счетчика отменен",
         chat_id=call.message.chat.id,
@@ -515,26 +662,37 @@ def handle_cancel_reset(call):
 
 
 @bot.callback_query_handler(
-    func=lambda call: call.data == ButtonCallback.ADM_REVIEW_WORKS
+    func=lambda call: call.data.split(":")[0] == ButtonCallback.ADM_REVIEW_WORKS
 )
 def show_pending_submissions(call):
     if not check_admin(call):
         return
     try:
-        submissions = SubmissionManager.get_pending_submissions()
+        page = SubmissionManager.list_pending(**parse_page_cursor(call.data))
+        submissions = page.items
 
         if not submissions:
             bot.answer_callback_query(call.id, "Нет работ на проверке")
             return
 
         markup = types.InlineKeyboardMarkup()
-        for sub in submissions:
-            btn_text = f"Работа #{sub[0]} от пользователя {sub[1]}"
+        markup.add(
+            types.InlineKeyboardButton(
+                ButtonText.ADM_NEXT_PENDING,
+                callback_data=ButtonCallback.ADM_NEXT_PENDING,
+            )
+        )
+        now = time.time()
+        for sub_id, user_id, claimed_by, claimed_until in submissions:
+            btn_text = f"Работа #{sub_id} от пользователя {user_id}"
+            if claimed_by not in (None, call.from_user.id) and claimed_until > now:
+                btn_text = f"🔒 {btn_text}"
             markup.add(
                 types.InlineKeyboardButton(
-                    btn_text, callback_data=f"submission_{sub[0]}"
+                    btn_text, callback_data=f"submission_{sub_id}"
                 )
             )
+        Menu.add_page_navigation(markup, ButtonCallback.ADM_REVIEW_WORKS, page)
         markup.add(
             types.InlineKeyboardButton(
                 text=ButtonText.BACK, callback_data=ButtonCallback.ADM_CONTEST
@@ -561,33 +719,79 @@ def show_submission_details(call):
         return
     try:
         submission_id = int(call.data.split("_")[1])
-        submission = get_submission(submission_id)
+        claim = db_executor.write(
+            SubmissionManager.claim_submission, submission_id, call.from_user.id
+        )
+    except Exception as e:
+        handle_admin_error(call.message.chat.id, e)
+        return
 
-        if not submission:
-            bot.answer_callback_query(call.id, "❌ Работа не найдена")
+    def done(claimed):
+        if not claimed:
+            bot.answer_callback_query(
+                call.id, "🔒 Работу уже проверяет другой админ или она не на модерации"
+            )
             return
 
-        media_group = []
-        # Проходим по списку словарей и извлекаем file_id
-        for i, photo_dict in enumerate(submission["photos"]):
-            file_id = photo_dict.get("file_id")
-            if not file_id:
-                continue  # Пропускаем некорректные записи
-            media = types.InputMediaPhoto(
-                media=file_id,  # Передаём строку, а не словарь
-                caption=(
-                    f"Работа #{submission_id}\n\n{submission['caption']}"
-                    if i == 0
-                    else None
-                ),
+        send_submission_for_review(call, submission_id)
+
+    dispatcher.then(
+        claim, done, on_error=partial(handle_admin_error, call.message.chat.id)
+    )
+
+
+@bot.callback_query_handler(
+    func=lambda call: call.data.split(":")[0] == ButtonCallback.ADM_NEXT_PENDING
+)
+def show_next_pending(call):
+    """Следующая свободная работа в очереди (после текущей, затем с начала)"""
+    if not check_admin(call):
+        return
+    try:
+        admin_id = call.from_user.id
+        parts = call.data.split(":")
+        current_id = int(parts[1]) if len(parts) == 2 and parts[1].isdigit() else 0
+
+        if current_id:
+            # Пропущенная работа снова доступна другим админам
+            log_errors(
+                db_executor.write(SubmissionManager.release_claim, current_id, admin_id),
+                f"снятие закрепления работы {current_id}",
+            )
+        claim = db_executor.write(
+            SubmissionManager.claim_next_pending, admin_id, current_id
+        )
+    except Exception as e:
+        handle_admin_error(call.message.chat.id, e)
+        return
+    on_error = partial(handle_admin_error, call.message.chat.id)
+
+    def claimed(submission_id):
+        if submission_id is None:
+            bot.answer_callback_query(call.id, "Нет свободных работ на проверке")
+            return
+        send_submission_for_review(call, submission_id)
+
+    def claimed_after_current(submission_id):
+        if submission_id is None and current_id:
+            # После текущей свободных нет - ищем с начала очереди
+            dispatcher.then(
+                db_executor.write(SubmissionManager.claim_next_pending, admin_id),
+                claimed,
+                on_error=on_error,
             )
-            media_group.append(media)
+            return
+        claimed(submission_id)
 
-        if media_group:
-            bot.send_media_group(call.message.chat.id, media_group)
-        else:
-            bot.answer_callback_query(call.id, "❌ Нет доступных фотографий")
+    dispatcher.then(claim, claimed_after_current, on_error=on_error)
+
+
+def send_submission_for_review(call, submission_id):
+    """Фото работы и кнопки модерации (работа уже закреплена за админом)"""
+    admin_id = call.from_user.id
+    _, media_group = review_sessions.get(admin_id, submission_id)
 
+    def actions(_=None):
         markup = types.InlineKeyboardMarkup()
         markup.row(
             types.InlineKeyboardButton(
@@ -599,6 +803,7 @@ def show_submission_details(call):
                 callback_data=f"{ButtonCallback.ADM_REJECT}{submission_id}",
             ),
         )
+        Menu.add_next_pending(markup, submission_id)
 
         bot.send_message(
             call.message.chat.id,
@@ -606,8 +811,18 @@ def show_submission_details(call):
             reply_markup=markup,
         )
 
-    except Exception as e:
-        handle_admin_error(call.message.chat.id, e)
+    # Пока админ смотрит работу, готовим следующие
+    review_sessions.prefetch_after(admin_id, submission_id)
+    if media_group:
+        # Кнопки - после фото
+        dispatcher.then(
+            call_soon("send_media_group", call.message.chat.id, media_group),
+            actions,
+            on_error=partial(handle_admin_error, call.message.chat.id),
+        )
+    else:
+        bot.answer_callback_query(call.id, "❌ Нет доступных фотографий")
+        actions()
 
 
 @bot.callback_query_handler(
@@ -618,8 +833,14 @@ def approve_work(call):
         return
     try:
         submission_id = int(call.data.replace(ButtonCallback.ADM_APPROVE, ""))
-        number = SubmissionManager.approve_submission(submission_id)
+        approved = db_executor.write(
+            SubmissionManager.approve_submission, submission_id
+        )
+    except Exception as e:
+        handle_admin_error(call.message.chat.id, e)
+        return
 
+    def done(number):
         submission = get_submission(submission_id)  # Получаем данные работы
         user_id = submission["user_id"]  # Извлекаем ID пользователя
 
@@ -648,11 +869,12 @@ def approve_work(call):
             chat_id=call.message.chat.id,
             message_id=call.message.message_id,
             text=f"Работа #{submission_id} одобрена как №{number}\n{status_text}",
-            reply_markup=Menu.adm_menu(),
+            reply_markup=Menu.add_next_pending(Menu.adm_menu(), submission_id),
         )
 
-    except Exception as e:
-        handle_admin_error(call.message.chat.id, e)
+    dispatcher.then(
+        approved, done, on_error=partial(handle_admin_error, call.message.chat.id)
+    )
 
 
 @bot.callback_query_handler(
@@ -673,6 +895,224 @@ def reject_work(call):
         handle_admin_error(call.message.chat.id, e)
 
 
+def render_batch_page(call, cursor):
+    """Страница пакетной модерации с отметками выбранных работ"""
+    admin_id = call.from_user.id
+    page = SubmissionManager.list_pending(**cursor)
+    if not page.items:
+        bot.answer_callback_query(call.id, "Нет работ на проверке")
+        return
+    batch_storage.update_data(admin_id, cursor=cursor)
+    selected = batch_storage.get(admin_id, "selected", frozenset())
+
+    markup = types.InlineKeyboardMarkup()
+    now = time.time()
+    for sub_id, user_id, claimed_by, claimed_until in page.items:
+        mark = "☑️" if sub_id in selected else "⬜"
+        btn_text = f"{mark} Работа #{sub_id} от пользователя {user_id}"
+        if claimed_by not in (None, admin_id) and claimed_until > now:
+            btn_text = f"🔒 {btn_text}"
+        markup.add(
+            types.InlineKeyboardButton(
+                btn_text, callback_data=f"{ButtonCallback.ADM_BATCH_TOGGLE}{sub_id}"
+            )
+        )
+    Menu.add_page_navigation(markup, ButtonCallback.ADM_BATCH, page)
+    markup.add(
+        types.InlineKeyboardButton(
+            ButtonText.ADM_BATCH_ALL, callback_data=ButtonCallback.ADM_BATCH_ALL
+        )
+    )
+    markup.row(
+        types.InlineKeyboardButton(
+            ButtonText.ADM_BATCH_APPROVE, callback_data=ButtonCallback.ADM_BATCH_APPROVE
+        ),
+        types.InlineKeyboardButton(
+            ButtonText.ADM_BATCH_REJECT, callback_data=ButtonCallback.ADM_BATCH_REJECT
+        ),
+    )
+    markup.add(
+        types.InlineKeyboardButton(
+            text=ButtonText.BACK, callback_data=ButtonCallback.ADM_CONTEST
+        )
+    )
+
+    bot.edit_message_text(
+        f"Пакетная модерация, выбрано работ: {len(selected)}\n"
+        "Отметьте работы и выберите действие:",
+        call.message.chat.id,
+        call.message.message_id,
+        reply_markup=markup,
+    )
+
+
+@bot.callback_query_handler(
+    func=lambda call: call.data.split(":")[0] == ButtonCallback.ADM_BATCH
+)
+def show_batch_moderation(call):
+    if not check_admin(call):
+        return
+    try:
+        cursor = parse_page_cursor(call.data)
+        if not cursor:
+            # Вход из меню - начинаем с пустого выбора
+            batch_storage.clear(call.from_user.id)
+        render_batch_page(call, cursor)
+    except Exception as e:
+        handle_admin_error(call.message.chat.id, e)
+
+
+@bot.callback_query_handler(
+    func=lambda call: call.data.startswith(ButtonCallback.ADM_BATCH_TOGGLE)
+)
+def toggle_batch_submission(call):
+    if not check_admin(call):
+        return
+    try:
+        admin_id = call.from_user.id
+        submission_id = int(call.data.replace(ButtonCallback.ADM_BATCH_TOGGLE, ""))
+        selected = set(batch_storage.get(admin_id, "selected", ()))
+        selected ^= {submission_id}
+        batch_storage.update_data(admin_id, selected=frozenset(selected))
+        render_batch_page(call, batch_storage.get(admin_id, "cursor", {}))
+    except Exception as e:
+        handle_admin_error(call.message.chat.id, e)
+
+
+@bot.callback_query_handler(
+    func=lambda call: call.data == ButtonCallback.ADM_BATCH_ALL
+)
+def select_batch_page(call):
+    if not check_admin(call):
+        return
+    try:
+        admin_id = call.from_user.id
+        cursor = batch_storage.get(admin_id, "cursor", {})
+        page = SubmissionManager.list_pending(**cursor)
+        selected = set(batch_storage.get(admin_id, "selected", ()))
+        selected.update(sub[0] for sub in page.items)
+        batch_storage.update_data(admin_id, selected=frozenset(selected))
+        render_batch_page(call, cursor)
+    except Exception as e:
+        handle_admin_error(call.message.chat.id, e)
+
+
+@bot.callback_query_handler(
+    func=lambda call: call.data == ButtonCallback.ADM_BATCH_APPROVE
+)
+def approve_batch(call):
+    if not check_admin(call):
+        return
+    try:
+        admin_id = call.from_user.id
+        selected = batch_storage.get(admin_id, "selected", frozenset())
+        if not selected:
+            bot.answer_callback_query(call.id, "Не выбрано ни одной работы")
+            return
+
+        approving = db_executor.write(
+            SubmissionManager.approve_many, selected, admin_id
+        )
+    except Exception as e:
+        handle_admin_error(call.message.chat.id, e)
+        return
+
+    def done(approved):
+        batch_storage.clear(admin_id)
+
+        for submission_id, user_id, number in approved:
+            user_submissions.remove(user_id)
+            notifications.put(
+                user_id,
+                f"✅ Ваша работа одобрена!\nНомер работы: #{number}",
+                reply_markup=Menu.back_user_contest_menu(),
+            )
+
+        text = f"Одобрено работ: {len(approved)}"
+        if approved:
+            text += f" (номера №{approved[0][2]}–№{approved[-1][2]})"
+        skipped = len(selected) - len(approved)
+        if skipped:
+            text += f"\nПропущено (уже проверены или закреплены): {skipped}"
+        text += "\n📨 Пользователи получат уведомления в ближайшее время"
+
+        bot.edit_message_text(
+            chat_id=call.message.chat.id,
+            message_id=call.message.message_id,
+            text=text,
+            reply_markup=Menu.adm_menu(),
+        )
+
+        logger.info(
+            f"BATCH APPROVAL: admin={admin_id} "
+            f"submissions={[a[0] for a in approved]} skipped={skipped}"
+        )
+
+    dispatcher.then(
+        approving, done, on_error=partial(handle_admin_error, call.message.chat.id)
+    )
+
+
+@bot.callback_query_handler(
+    func=lambda call: call.data == ButtonCallback.ADM_BATCH_REJECT
+)
+def reject_batch(call):
+    if not check_admin(call):
+        return
+    try:
+        selected = batch_storage.get(call.from_user.id, "selected", frozenset())
+        if not selected:
+            bot.answer_callback_query(call.id, "Не выбрано ни одной работы")
+            return
+        msg = bot.send_message(
+            call.message.chat.id,
+            f"Выбрано работ: {len(selected)}\n"
+            "Введите общую причину отклонения в ответ на это сообщение, то есть реплаем:",
+        )
+        bot.register_for_reply(msg, lambda m: process_batch_rejection(m, selected))
+
+    except Exception as e:
+        handle_admin_error(call.message.chat.id, e)
+
+
+def process_batch_rejection(message, selected):
+    try:
+        admin_id = message.from_user.id
+        rejecting = db_executor.write(
+            SubmissionManager.reject_many, selected, message.text, admin_id
+        )
+    except Exception as e:
+        handle_admin_error(message.chat.id, e)
+        return
+
+    def done(rejected):
+        batch_storage.clear(admin_id)
+
+        for _, user_id in rejected:
+            notifications.put(
+                user_id,
+                f"❌ Работа отклонена\nПричина: {message.text}",
+                reply_markup=Menu.back_user_contest_menu(),
+            )
+
+        text = f"Отклонено работ: {len(rejected)}"
+        skipped = len(selected) - len(rejected)
+        if skipped:
+            text += f"\nПропущено (уже проверены или закреплены): {skipped}"
+        text += "\n📨 Пользователи получат уведомления в ближайшее время"
+        bot.send_message(message.chat.id, text, reply_markup=Menu.adm_menu())
+
+        logger.info(
+            f"BATCH REJECTION: admin={admin_id} "
+            f"submissions={[r[0] for r in rejected]} skipped={skipped} "
+            f"reason={message.text}"
+        )
+
+    dispatcher.then(
+        rejecting, done, on_error=partial(handle_admin_error, message.chat.id)
+    )
+
+
 @bot.callback_query_handler(func=lambda call: call.data == ButtonCallback.ADM_TURNIP)
 @private_chat_only(bot)
 def handle_adm_turnip(call):
@@ -699,8 +1139,8 @@ def handle_adm_add_guide(call):
     )
 
 
-# Глобальное хранилище для ответов
-admin_replies = {}
+# Кому отвечает админ: chat_id админа -> user_id
+admin_replies = sessions.view(Flow.ADMIN_REPLY)
 
 
 @bot.callback_query_handler(func=lambda call: call.data.startswith("reply_to_"))
@@ -740,16 +1180,15 @@ def cancel_reply(message):
         user_id = message.from_user.id
 
         # Проверка прав администратора
-        if user_id not in admin_ids and user_id not in news_ids:
+        if not UserRoles.get(user_id) & (Role.ADMIN | Role.NEWS):
             bot.reply_to(message, "❌ У вас нет прав для этой команды")
             return
 
         # Удаление состояния ответа
-        if chat_id in admin_replies:
-            del admin_replies[chat_id]
+        admin_replies.pop(chat_id, None)
 
         # Удаляем сообщение с командой /cancel_adm
-        bot.delete_message(chat_id, message.message_id)
+        call_soon("delete_message", chat_id, message.message_id)
 
         # Отправляем подтверждение
         bot.send_message(chat_id, "✅ Ответ отменён", reply_markup=Menu.adm_menu())
@@ -801,8 +1240,8 @@ def process_admin_reply(message):
 
         # Удаляем служебные сообщения
         try:
-            bot.delete_message(chat_id, message.message_id)
-            bot.delete_message(chat_id, message.reply_to_message.message_id)
+            call_soon("delete_message", chat_id, message.message_id)
+            call_soon("delete_message", chat_id, message.reply_to_message.message_id)
         except Exception as e:
             logger.warning(f"Не удалось удалить сообщения: {e}")
 
@@ -813,8 +1252,7 @@ def process_admin_reply(message):
         )
 
         # Очищаем хранилище после отправки
-        if chat_id in admin_replies:
-            del admin_replies[chat_id]
+        admin_replies.pop(chat_id, None)
 
     except ApiTelegramException as e:
         logger.error(f"Process reply error: {e}")
@@ -827,24 +1265,35 @@ def process_admin_reply(message):
 @bot.callback_query_handler(func=lambda call: call.data.startswith("block_user_"))
 def handle_block_user(call):
     user_id = int(call.data.split("_")[2])
-    user = bot.get_chat(user_id)
-
-    try:
-        SubmissionManager.insert_replace_blocked(
-            user_id, user.username, user.first_name, user.last_name
-        )
-
-        bot.answer_callback_query(call.id, "✅ Пользователь заблокирован")
 
-    except Exception as e:
+    def failed(e):
         logger.error(f"Ошибка блокировки пользователя: {e}")
         bot.answer_callback_query(call.id, "❌ Ошибка блокировки")
 
+    def block(user):
+        dispatcher.then(
+            db_executor.write(
+                SubmissionManager.insert_replace_blocked,
+                user_id,
+                user.username,
+                user.first_name,
+                user.last_name,
+            ),
+            lambda _: bot.answer_callback_query(call.id, "✅ Пользователь заблокирован"),
+            on_error=failed,
+        )
+
+    # Имя блокируемого - запросом к Bot API, запись в БД - по ответу
+    dispatcher.then(call_soon("get_chat", user_id), block, on_error=failed)
 
-@bot.callback_query_handler(func=lambda call: call.data == ButtonCallback.ADM_BLOCK)
+
+@bot.callback_query_handler(
+    func=lambda call: call.data.split(":")[0] == ButtonCallback.ADM_BLOCK
+)
 def handle_show_blocked_users(call):
     try:
-        users = SubmissionManager.select_blocked()
+        page = SubmissionManager.list_blocked(**parse_page_cursor(call.data))
+        users = page.items
 
         markup = types.InlineKeyboardMarkup()
 
@@ -860,6 +1309,7 @@ def handle_show_blocked_users(call):
                 )
             )
 
+        Menu.add_page_navigation(markup, ButtonCallback.ADM_BLOCK, page)
         markup.row(
             types.InlineKeyboardButton(
                 text=ButtonText.MAIN_MENU, callback_data=ButtonCallback.MAIN_MENU
@@ -882,12 +1332,18 @@ def handle_show_blocked_users(call):
 def handle_unblock_user(call):
     user_id = int(call.data.split("_")[1])
 
-    try:
-        SubmissionManager.delete_blocked(user_id)
+    def failed(e):
+        logger.error(f"Ошибка разблокировки: {e}")
+        bot.answer_callback_query(call.id, "❌ Ошибка разблокировки")
 
+    def unblocked(_):
         bot.answer_callback_query(call.id, "✅ Пользователь разблокирован")
         handle_show_blocked_users(call)  # Обновляем список
 
+    try:
+        unblocking = db_executor.write(SubmissionManager.delete_blocked, user_id)
     except Exception as e:
-        logger.error(f"Ошибка разблокировки: {e}")
-        bot.answer_callback_query(call.id, "❌ Ошибка разблокировки")
+        failed(e)
+        return
+
+    dispatcher.then(unblocking, unblocked, on_error=failed)
@@ -0,0 +1,301 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+
+from handlers.outbound import Lane, RelayError, RelayOverloadedError, outbound
+
+logger = logging.getLogger(__name__)
+
+# Сколько запросов к Bot API одновременно держит цикл событий
+MAX_CONCURRENCY = 100
+# Больше пересылок в работе не принимается
+MAX_RELAYS = 1000
+
+
+def load_async_telebot():
+    """AsyncTeleBot нужен только в асинхронном режиме, а ему нужен aiohttp"""
+    try:
+        from telebot import asyncio_helper
+        from telebot.async_telebot import AsyncTeleBot
+    except ImportError as e:
+        raise RuntimeError(
+            "Для BOT_RUNTIME=async нужен aiohttp: pip install -r requirements.txt"
+        ) from e
+    return AsyncTeleBot, asyncio_helper
+
+
+class AsyncRuntime:
+    """Цикл событий в отдельном потоке с AsyncTeleBot
+
+    Вызовы Bot API выполняются корутинами: тысяча одновременных запросов -
+    тысяча корутин на одном потоке, а не тысяча заблокированных потоков.
+    Синхронный код ставит вызов через call_soon и получает
+    concurrent.futures.Future; корутины вызывают await runtime.call(...).
+
+    Вызовы подчиняются тем же лимитам и приоритетам, что и запросы TeleBot:
+    перед отправкой корутина ждёт токенов планировщика (acquire_async), на
+    429 блокирует ведро чата на retry_after и повторяет запрос.
+
+    На цикле выполняются только вызовы Bot API. Обработчики остаются
+    в потоках SerialDispatcher, а запросы к БД - в DbExecutor (sqlite3
+    синхронный). Продолжения после ответа API и после записи в БД ставятся
+    через dispatcher.then, так что поток обработчика не ждёт ни сети,
+    ни диска.
+    """
+
+    def __init__(self, token, max_concurrency=MAX_CONCURRENCY, scheduler=outbound):
+        AsyncTeleBot, asyncio_helper = load_async_telebot()
+        # Пул соединений aiohttp создаётся при первом запросе с этим пределом
+        asyncio_helper.REQUEST_LIMIT = max_concurrency
+        self._helper = asyncio_helper
+        # У asyncio_helper собственный класс ошибки Bot API
+        self.api_error = asyncio_helper.ApiTelegramException
+        self.bot = AsyncTeleBot(token)
+        self.scheduler = scheduler
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="async-runtime", daemon=True
+        )
+        self._thread.start()
+        # Запросы в полёте, выполнено, с ошибкой (stats читают другие потоки)
+        self._stats_lock = threading.Lock()
+        self._counts = {"in_flight": 0, "done": 0, "failed": 0}
+
+    @property
+    def loop(self):
+        return self._loop
+
+    def submit(self, coro):
+        """Запускает корутину в цикле событий, возвращает Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def call_soon_threadsafe(self, callback, *args):
+        self._loop.call_soon_threadsafe(callback, *args)
+
+    async def call(self, method, *args, lane=Lane.REPLY, **kwargs):
+        """await bot.<method>(...) в очереди lane с ограничением одновременных
+        запросов"""
+        chat_id, cost = self.scheduler.call_target(method, args, kwargs)
+        for attempt in range(self.scheduler.retries + 1):
+            # Токены ждём до занятия слота: запрос, ждущий своего чата,
+            # не держит слоты остальных
+            await self.scheduler.acquire_async(chat_id, cost, lane)
+            async with self._slots:
+                self._count("in_flight")
+                try:
+                    result = await getattr(self.bot, method)(*args, **kwargs)
+                except self.api_error as e:
+                    if e.error_code != 429 or attempt == self.scheduler.retries:
+                        self._count("failed")
+                        raise
+                    retry_after = e.result_json.get("parameters", {}).get("retry_after", 1)
+                    logger.warning(f"429 от Telegram для чата {chat_id}, ждём {retry_after} с")
+                    await self.scheduler.penalize_async(chat_id, retry_after)
+                    continue
+                except Exception:
+                    self._count("failed")
+                    raise
+                finally:
+                    self._count("in_flight", -1)
+            self._count("done")
+            return result
+
+    def _count(self, name, delta=1):
+        with self._stats_lock:
+            self._counts[name] += delta
+
+    def call_soon(self, method, *args, **kwargs):
+        """Вызов Bot API из синхронного кода без ожидания ответа; приоритет -
+        текущий приоритет потока (with outbound.lane(...))"""
+        lane = self.scheduler.current_lane()
+        return self.submit(self.call(method, *args, lane=lane, **kwargs))
+
+    def stats(self):
+        """Метрики: запросы в полёте, выполнено, с ошибкой"""
+        with self._stats_lock:
+            return dict(self._counts)
+
+    async def _close_session(self):
+        session = self._helper.session_manager.session
+        if session is not None and not session.closed:
+            await session.close()
+
+    def shutdown(self):
+        """Закрывает соединения с Bot API и останавливает цикл событий"""
+        if self._loop.is_closed():
+            return
+        try:
+            self.submit(self._close_session()).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"Не удалось закрыть соединения с Bot API: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+class AsyncNotificationQueue:
+    """Рассылка уведомлений корутинами на цикле AsyncRuntime
+
+    Тот же интерфейс, что у NotificationQueue. Сообщения уходят не чаще
+    per_second в секунду, но каждое - отдельной задачей: медленный ответ
+    Telegram не снижает скорость рассылки. 429 и повтор отправки - забота
+    runtime.call.
+    """
+
+    def __init__(self, runtime, per_second=20, max_queue=10000):
+        self.runtime = runtime
+        self.interval = 1 / per_second
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._tasks = set()
+        self._consumer = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._sent = 0
+        self._failed = 0
+
+    def _ensure_started(self):
+        if self._consumer is not None:
+            return
+        with self._start_lock:
+            if self._consumer is None:
+                self._consumer = self.runtime.submit(self._consume())
+
+    def put(self, chat_id, text, **kwargs):
+        """Ставит сообщение в очередь (аргументы как у bot.send_message)"""
+        self._ensure_started()
+        self.runtime.call_soon_threadsafe(self._enqueue, (chat_id, text, kwargs))
+
+    def _enqueue(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Ждать места нельзя - это заблокировало бы цикл событий
+            with self._stats_lock:
+                self._failed += 1
+            logger.error(f"Очередь уведомлений переполнена, {item[0]} не уведомлён")
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        next_slot = loop.time()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                break
+            delay = next_slot - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(self._send(*item))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            next_slot = max(next_slot, loop.time()) + self.interval
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    async def _send(self, chat_id, text, kwargs):
+        try:
+            await self.runtime.call(
+                "send_message", chat_id, text, lane=Lane.NOTIFY, **kwargs
+            )
+        except Exception as e:
+            logger.error(f"Не удалось уведомить пользователя {chat_id}: {e}")
+            sent = False
+        else:
+            sent = True
+        with self._stats_lock:
+            if sent:
+                self._sent += 1
+            else:
+                self._failed += 1
+
+    def stats(self):
+        """Метрика: очередь, отправлено, не доставлено"""
+        with self._stats_lock:
+            return {
+                "pending": self._queue.qsize() + len(self._tasks),
+                "sent": self._sent,
+                "failed": self._failed,
+            }
+
+    def shutdown(self, wait=True):
+        """Досылает поставленные сообщения и останавливает рассылку"""
+        with self._start_lock:
+            consumer, self._consumer = self._consumer, None
+        if consumer is not None:
+            self.runtime.submit(self._queue.put(None))
+            if wait:
+                consumer.result()
+
+
+class AsyncRelayQueue:
+    """Пересылки в служебные чаты корутинами на цикле AsyncRuntime
+
+    Тот же интерфейс, что у RelayQueue: put(api_call(...), ...) возвращает
+    concurrent.futures.Future со списком результатов или с RelayError.
+    Вызовы одной пересылки выполняются по порядку в очереди Lane.RELAY;
+    потоков под пересылки не нужно.
+    """
+
+    def __init__(self, runtime, max_relays=MAX_RELAYS):
+        self.runtime = runtime
+        self.max_relays = max_relays
+        self._pending = set()  # Future пересылок в работе
+        self._lock = threading.Lock()
+        self._sent = 0
+        self._failed = 0
+
+    def put(self, *calls):
+        """Ставит пересылку из вызовов api_call(...), возвращает Future"""
+        with self._lock:
+            overloaded = len(self._pending) >= self.max_relays
+            if overloaded:
+                self._failed += 1
+        if overloaded:
+            future = concurrent.futures.Future()
+            future.set_exception(RelayOverloadedError("Очередь пересылок переполнена"))
+            return future
+        future = self.runtime.submit(self._relay(calls))
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._finished)
+        return future
+
+    async def _relay(self, calls):
+        results = []
+        for method, args, kwargs in calls:
+            try:
+                results.append(
+                    await self.runtime.call(method, *args, lane=Lane.RELAY, **kwargs)
+                )
+            except Exception as e:
+                raise RelayError(e, len(results)) from e
+        return results
+
+    def _finished(self, future):
+        error = None if future.cancelled() else future.exception()
+        if error is not None:
+            logger.error(f"Пересылка не выполнена: {error}")
+        with self._lock:
+            self._pending.discard(future)
+            if error is None:
+                self._sent += 1
+            else:
+                self._failed += 1
+
+    def stats(self):
+        """Метрика: в работе, переслано, с ошибкой"""
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "sent": self._sent,
+                "failed": self._failed,
+            }
+
+    def shutdown(self, wait=True):
+        """Дожидается пересылок в работе"""
+        if not wait:
+            return
+        with self._lock:
+            pending = list(self._pending)
+        concurrent.futures.wait(pending)
@@ -0,0 +1,217 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Сколько задач одного пользователя выполнить подряд, прежде чем уступить
+# поток другим пользователям
+BATCH = 8
+# Больше задач в очереди пользователя не принимается (флуд)
+MAX_QUEUE = 100
+
+
+class _Slot:
+    """Место в очереди ключа под задачу, которая станет известна позже"""
+
+    __slots__ = ("key", "task")
+
+    def __init__(self, key):
+        self.key = key
+        self.task = None  # (func, args) после fill
+
+
+def _skip():
+    pass
+
+
+class SerialDispatcher:
+    """Выполнение задач в общем пуле потоков с порядком по ключу
+
+    У каждого ключа (user_id) своя очередь FIFO: его задачи выполняются
+    строго по одной и в порядке поступления, а задачи разных ключей -
+    параллельно. Очередь существует, только пока в ней есть задачи:
+    опустевшая очередь сразу удаляется.
+
+    reserve занимает место в очереди под задачу, которой ещё нет (альбом,
+    который досылается частями): следующие задачи ключа ждут, пока место
+    не заполнят (fill) или не освободят (cancel). then - то же для
+    продолжения текущей задачи после Future (запись в БД): поток свободен,
+    пока идёт запись, а порядок задач ключа сохраняется.
+    """
+
+    def __init__(self, workers=8, batch=BATCH, max_queue=MAX_QUEUE):
+        self.batch = batch
+        self.max_queue = max_queue
+        self._queues = {}  # ключ -> deque задач; есть, пока ключ обрабатывается
+        self._parked = set()  # Ключи, чья очередь стоит на незаполненном месте
+        self._local = threading.local()  # Задача, выполняемая потоком
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dispatch")
+        self._done = 0
+        self._dropped = 0
+
+    def submit(self, key, func, *args):
+        """Ставит func(*args) в очередь ключа; key=None - без порядка"""
+        if key is None:
+            try:
+                self._pool.submit(self._run, func, args)
+            except RuntimeError:
+                # Пул остановлен (бот завершается) - выполняем здесь
+                self._run(func, args)
+            return True
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = deque()
+                queue.append((func, args))
+                started = True
+            elif len(queue) >= self.max_queue:
+                self._dropped += 1
+                logger.warning(f"Очередь {key} переполнена, задача отброшена")
+                return False
+            else:
+                queue.append((func, args))
+                started = False
+        if started:
+            # Ключ простаивал - запускаем обработку его очереди
+            self._start(key, queue)
+        return True
+
+    def reserve(self, key):
+        """Занимает место в конце очереди ключа; None - очередь переполнена"""
+        slot = _Slot(key)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None:
+                # Обрабатывать нечего, пока место не заполнено
+                queue = self._queues[key] = deque()
+                self._parked.add(key)
+            elif len(queue) >= self.max_queue:
+                self._dropped += 1
+                logger.warning(f"Очередь {key} переполнена, место не занято")
+                return None
+            queue.append(slot)
+        return slot
+
+    def fill(self, slot, func, *args):
+        """Ставит func(*args) на занятое место"""
+        with self._lock:
+            slot.task = (func, args)
+            queue = self._queues[slot.key]
+            if slot.key not in self._parked or queue[0] is not slot:
+                return
+            # Очередь стояла на этом месте - продолжаем её обработку
+            self._parked.discard(slot.key)
+        self._start(slot.key, queue)
+
+    def cancel(self, slot):
+        """Освобождает занятое место"""
+        self.fill(slot, _skip)
+
+    def then(self, future, func, on_error=None):
+        """func(результат future) - сразу после текущей задачи ключа, когда
+        future будет готов; задачи ключа, поставленные позже, ждут его.
+
+        Ошибка future или func передаётся в on_error(e) (без него -
+        в лог). Вне задачи диспетчера ждёт future в текущем потоке.
+        """
+        current = getattr(self._local, "current", None)
+        if current is None:
+            self._resume(future, func, on_error)
+            return
+        key, queue, inserted = current
+        slot = _Slot(key)
+        with self._lock:
+            # Продолжения встают за текущей задачей (queue[0]) в порядке вызова
+            queue.insert(1 + inserted, slot)
+        self._local.current = (key, queue, inserted + 1)
+        future.add_done_callback(
+            lambda done: self.fill(slot, self._resume, done, func, on_error)
+        )
+
+    def _start(self, key, queue):
+        try:
+            self._pool.submit(self._drain, key, queue)
+        except RuntimeError:
+            # Пул остановлен (бот завершается): продолжения, дописанные
+            # после остановки (ответ после записи в БД), выполняются в
+            # вызывающем потоке, а не теряются
+            self._drain(key, queue)
+
+    @staticmethod
+    def _resume(future, func, on_error):
+        try:
+            func(future.result())
+        except Exception as e:
+            if on_error is None:
+                raise
+            on_error(e)
+
+    def _run(self, func, args):
+        try:
+            func(*args)
+        except Exception as e:
+            logger.error(f"Ошибка обработки {func}: {e}", exc_info=True)
+        with self._lock:
+            self._done += 1
+
+    def _drain(self, key, queue):
+        done = 0
+        # Не None, если очередь дорабатывается внутри другой задачи
+        # (пул остановлен, см. _start)
+        outer = getattr(self._local, "current", None)
+        while True:
+            # Задача остаётся в очереди, пока выполняется: непустая очередь
+            # означает, что ключ уже обрабатывается
+            head = queue[0]
+            if isinstance(head, _Slot):
+                with self._lock:
+                    if head.task is None:
+                        # Ждём fill: он и продолжит обработку очереди
+                        self._parked.add(key)
+                        return
+                func, args = head.task
+            else:
+                func, args = head
+            self._local.current = (key, queue, 0)
+            try:
+                self._run(func, args)
+            finally:
+                self._local.current = outer
+            with self._lock:
+                queue.popleft()
+                if not queue:
+                    del self._queues[key]
+                    return
+                if isinstance(queue[0], _Slot) and queue[0].task is None:
+                    self._parked.add(key)
+                    return
+            done += 1
+            if done >= self.batch:
+                # Уступаем поток: остаток очереди - в конец пула
+                try:
+                    self._pool.submit(self._drain, key, queue)
+                    return
+                except RuntimeError:
+                    # Пул останавливается - дорабатываем очередь здесь
+                    done = 0
+
+    def stats(self):
+        """Метрики: активные очереди, задачи в них, очереди на занятом
+        месте, выполнено, отброшено"""
+        with self._lock:
+            return {
+                "queues": len(self._queues),
+                "pending": sum(len(queue) for queue in self._queues.values()),
+                "waiting": len(self._parked),
+                "done": self._done,
+                "dropped": self._dropped,
+            }
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+dispatcher = SerialDispatcher()
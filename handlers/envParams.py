@@ -5,10 +5,10 @@ from dotenv import load_dotenv
 # Загружаем переменные из .env
 load_dotenv()
 
-# Получаем список админов
-admin_ids = list(map(int, os.getenv("ADMIN_ID_LIST", "").split(","))) if os.getenv("ADMIN_ID_LIST") else []
+# Получаем список админов (множество - проверка "in" за O(1))
+admin_ids = frozenset(map(int, os.getenv("ADMIN_ID_LIST", "").split(","))) if os.getenv("ADMIN_ID_LIST") else frozenset()
 # Получаем список работников газеты
-news_ids = list(map(int, os.getenv("NEWS_ID_LIST", "").split(","))) if os.getenv("NEWS_ID_LIST") else []
+news_ids = frozenset(map(int, os.getenv("NEWS_ID_LIST", "").split(","))) if os.getenv("NEWS_ID_LIST") else frozenset()
 
 CONTEST_CHAT_ID = os.getenv("CONTEST_CHAT_ID")
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME")
@@ -18,3 +18,18 @@ if not CONTEST_CHAT_ID or not CONTEST_CHAT_ID.lstrip('-').isdigit():
 CHAT_USERNAME = os.getenv("CHAT_USERNAME").lstrip("@")
 ADMIN_CHAT_ID=os.getenv('ADMIN_CHAT_ID')
 NEWSPAPER_CHAT_ID=os.getenv('NEWSPAPER_CHAT_ID')
+
+# Режим вебхука: если задан WEBHOOK_URL (публичный https-адрес), апдейты
+# принимаются локальным HTTP-сервером на WEBHOOK_HOST:WEBHOOK_PORT вместо опроса
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+if WEBHOOK_URL and not WEBHOOK_SECRET:
+    raise ValueError("Для режима вебхука нужен WEBHOOK_SECRET!")
+
+# Режим выполнения: threaded - синхронный TeleBot; async - вызовы Bot API
+# (уведомления) идут корутинами на цикле событий AsyncTeleBot (нужен aiohttp)
+BOT_RUNTIME = os.getenv("BOT_RUNTIME", "threaded")
+if BOT_RUNTIME not in ("threaded", "async"):
+    raise ValueError("BOT_RUNTIME должен быть threaded или async!")
@@ -0,0 +1,271 @@
+import bisect
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from database.deadlines import deadlines
+
+logger = logging.getLogger(__name__)
+
+# Период тишины, пока интервалы между частями альбомов ещё не изучены (сек)
+QUIET_PERIOD = 3.0
+# Пределы адаптивного периода тишины (сек)
+MIN_QUIET_PERIOD = 0.5
+MAX_QUIET_PERIOD = 10.0
+# Период тишины - этот перцентиль интервалов между частями, умноженный на запас
+QUIET_PERCENTILE = 0.95
+QUIET_MARGIN = 1.5
+# Сколько помнить закрытый альбом, чтобы молча пропускать его части
+CLOSED_TTL = 5 * 60
+# Сколько закрытых альбомов помнить одновременно (при потоке альбомов
+# старые отметки вытесняются раньше CLOSED_TTL)
+MAX_CLOSED = 10000
+
+
+class ArrivalStats:
+    """Скользящее окно интервалов между частями альбомов и его перцентиль"""
+
+    __slots__ = ("_window", "_sorted", "min_samples")
+
+    def __init__(self, size, min_samples):
+        self._window = deque(maxlen=size)
+        self._sorted = []  # Те же интервалы по возрастанию
+        self.min_samples = min_samples
+
+    def add(self, gap):
+        if len(self._window) == self._window.maxlen:
+            old = self._window[0]
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+        self._window.append(gap)
+        bisect.insort(self._sorted, gap)
+
+    def percentile(self, q):
+        """None, пока интервалов меньше min_samples"""
+        if len(self._sorted) < self.min_samples:
+            return None
+        return self._sorted[min(len(self._sorted) - 1, int(q * len(self._sorted)))]
+
+    def __len__(self):
+        return len(self._window)
+
+
+class _Album:
+    __slots__ = (
+        "user_id", "messages", "on_complete", "on_discard", "deadline", "last_part"
+    )
+
+    def __init__(self, user_id, on_complete, on_discard):
+        self.user_id = user_id
+        self.messages = []
+        self.on_complete = on_complete
+        self.on_discard = on_discard
+        self.deadline = None
+        self.last_part = None  # time.monotonic() прихода последней части
+
+
+class MediaGroupCollector:
+    """Сборка альбомов: Telegram присылает каждое фото альбома отдельным
+    апдейтом с общим media_group_id
+
+    Части копятся по media_group_id; когда новых частей нет в течение
+    периода тишины, on_complete(messages) вызывается один раз со всеми
+    частями по порядку.
+
+    Период тишины подстраивается под реальную скорость загрузки: это
+    QUIET_PERCENTILE интервалов между частями недавних альбомов (с запасом
+    QUIET_MARGIN), сначала по пользователю, если по нему накоплено
+    достаточно интервалов, иначе по всем пользователям. Часть, опоздавшая к уже
+    собранному альбому, тоже учитывается: именно такие интервалы период
+    тишины должен покрывать.
+
+    Сроки ведёт общий планировщик (DeadlineScheduler), а сами обработчики
+    выполняются в небольшом пуле потоков - они отправляют сообщения
+    и не должны задерживать планировщик.
+    """
+
+    def __init__(
+        self,
+        closed_ttl=CLOSED_TTL,
+        max_closed=MAX_CLOSED,
+        scheduler=deadlines,
+        workers=4,
+        per_user=True,
+        max_users=1000,
+    ):
+        self.closed_ttl = closed_ttl
+        self.max_closed = max_closed
+        self.scheduler = scheduler
+        self.per_user = per_user
+        self.max_users = max_users
+        self._albums = {}  # media_group_id -> _Album
+        # Отклонённые альбомы: media_group_id -> Deadline удаления отметки,
+        # от старых к новым
+        self._closed = OrderedDict()
+        # Альбомы, собранные по периоду тишины: media_group_id -> (user_id,
+        # время последней части), от старых к новым. Опоздавшая часть такого
+        # альбома - интервал, которого не хватило периоду тишины
+        self._finished = OrderedDict()
+        self._arrivals = ArrivalStats(size=512, min_samples=20)
+        self._user_arrivals = OrderedDict()  # user_id -> ArrivalStats, порядок LRU
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="albums")
+        self._completed = 0
+
+    def _record_gap(self, user_id, gap):
+        # Вызывается под self._lock
+        self._arrivals.add(gap)
+        if not self.per_user:
+            return
+        stats = self._user_arrivals.get(user_id)
+        if stats is None:
+            stats = self._user_arrivals[user_id] = ArrivalStats(size=32, min_samples=8)
+            if len(self._user_arrivals) > self.max_users:
+                self._user_arrivals.popitem(last=False)
+        else:
+            self._user_arrivals.move_to_end(user_id)
+        stats.add(gap)
+
+    def _quiet_period(self, user_id):
+        # Вызывается под self._lock
+        gap = None
+        stats = self._user_arrivals.get(user_id) if self.per_user else None
+        if stats is not None:
+            gap = stats.percentile(QUIET_PERCENTILE)
+        if gap is None:
+            gap = self._arrivals.percentile(QUIET_PERCENTILE)
+        if gap is None:
+            return QUIET_PERIOD
+        return min(MAX_QUIET_PERIOD, max(MIN_QUIET_PERIOD, gap * QUIET_MARGIN))
+
+    def quiet_period(self, user_id=None):
+        """Текущий период тишины для пользователя (или общий)"""
+        with self._lock:
+            return self._quiet_period(user_id)
+
+    def add(self, message, on_complete, on_discard=None):
+        """Добавляет часть альбома. False - альбом закрыт, часть пропущена
+
+        on_complete и on_discard берутся у первой части альбома.
+        on_discard(messages) вызывается вместо on_complete, если альбом
+        отклонён (reject) или отменён (discard_user) до сборки.
+        """
+        media_group_id = message.media_group_id
+        user_id = message.from_user.id
+        now = time.monotonic()
+        with self._lock:
+            if media_group_id in self._closed:
+                return False
+            album = self._albums.get(media_group_id)
+            if album is None:
+                finished = self._finished.pop(media_group_id, None)
+                if finished is not None:
+                    # Альбом разрезан: учитываем интервал, чтобы следующие
+                    # альбомы пользователя ждали дольше
+                    self._record_gap(finished[0], now - finished[1])
+                album = self._albums[media_group_id] = _Album(
+                    user_id, on_complete, on_discard
+                )
+            else:
+                album.deadline.cancel()
+                self._record_gap(user_id, now - album.last_part)
+            album.messages.append(message)
+            album.last_part = now
+            album.deadline = self.scheduler.call_later(
+                self._quiet_period(user_id), self._complete, media_group_id, album
+            )
+        return True
+
+    def _complete(self, media_group_id, album):
+        """Тишина выдержана (вызывается планировщиком)"""
+        with self._lock:
+            if self._albums.get(media_group_id) is not album:
+                return
+            del self._albums[media_group_id]
+            self._completed += 1
+            self._remember_finished(media_group_id, album, time.monotonic())
+        self._pool.submit(self._run, album)
+
+    def _remember_finished(self, media_group_id, album, now):
+        # Вызывается под self._lock
+        self._finished[media_group_id] = (album.user_id, album.last_part)
+        while self._finished:
+            oldest = next(iter(self._finished.values()))
+            if len(self._finished) <= self.max_closed and now - oldest[1] < self.closed_ttl:
+                break
+            self._finished.popitem(last=False)
+
+    def _discarded(self, album):
+        # Вызывается под self._lock
+        album.deadline.cancel()
+        if album.on_discard is not None:
+            self._pool.submit(self._run, album, album.on_discard)
+
+    def _run(self, album, callback=None):
+        try:
+            (callback or album.on_complete)(album.messages)
+        except Exception as e:
+            logger.error(
+                f"Ошибка обработки альбома пользователя {album.user_id}: {e}",
+                exc_info=True,
+            )
+
+    def _close(self, media_group_id):
+        # Вызывается под self._lock
+        if media_group_id in self._closed:
+            return False
+        self._closed[media_group_id] = self.scheduler.call_later(
+            self.closed_ttl, self._forget, media_group_id
+        )
+        while len(self._closed) > self.max_closed:
+            _, deadline = self._closed.popitem(last=False)
+            deadline.cancel()
+        return True
+
+    def reject(self, media_group_id):
+        """Отбрасывает собранные части; следующие части альбома будут
+        пропускаться closed_ttl секунд. True - альбом отклонён впервые
+        (об ошибке нужно сообщить один раз)"""
+        with self._lock:
+            album = self._albums.pop(media_group_id, None)
+            if album is not None:
+                self._discarded(album)
+            return self._close(media_group_id)
+
+    def _forget(self, media_group_id):
+        with self._lock:
+            self._closed.pop(media_group_id, None)
+
+    def discard_user(self, user_id):
+        """Отменяет все несобранные альбомы пользователя"""
+        with self._lock:
+            for media_group_id in [
+                key for key, album in self._albums.items() if album.user_id == user_id
+            ]:
+                self._discarded(self._albums.pop(media_group_id))
+
+    def stats(self):
+        """Метрики: альбомы в сборке и закрытые, собранные, текущий общий
+        период тишины"""
+        with self._lock:
+            return {
+                "collecting": len(self._albums),
+                "closed": len(self._closed),
+                "finished": len(self._finished),
+                "completed": self._completed,
+                "quiet_period": round(self._quiet_period(None), 2),
+                "gap_samples": len(self._arrivals),
+            }
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait)
+
+
+albums = MediaGroupCollector()
+
+
+def album_of(message):
+    """Все части альбома, пришедшего одним сообщением (AlbumBot), или само
+    сообщение, если это не альбом"""
+    return getattr(message, "album", None) or [message]
@@ -0,0 +1,143 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from bot_instance import TOKEN, bot
+from handlers.envParams import BOT_RUNTIME
+from handlers.outbound import Lane, RelayQueue, outbound
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationQueue:
+    """Рассылка уведомлений пользователям в фоне с ограничением скорости
+
+    Сообщения отправляются одним потоком не чаще per_second в секунду
+    (лимит Telegram - около 30 сообщений в секунду на бота). 429 и повтор
+    отправки - забота планировщика (outbound.send), здесь их не ждут.
+    """
+
+    def __init__(self, per_second=20, max_queue=10000):
+        self.interval = 1 / per_second
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._sent = 0
+        self._failed = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(
+                    target=self._loop, name="notifications", daemon=True
+                )
+                thread.start()
+                self._thread = thread
+
+    def put(self, chat_id, text, **kwargs):
+        """Ставит сообщение в очередь (аргументы как у bot.send_message)"""
+        self._ensure_started()
+        try:
+            # Ставят и поток планировщика сроков, и потоки пересылок - ждать
+            # места в очереди им нельзя
+            self._queue.put_nowait((chat_id, text, kwargs))
+        except queue.Full:
+            with self._stats_lock:
+                self._failed += 1
+            logger.error(f"Очередь уведомлений переполнена, {chat_id} не уведомлён")
+
+    def _loop(self):
+        next_slot = time.monotonic()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            delay = next_slot - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._send(*item)
+            next_slot = max(next_slot, time.monotonic()) + self.interval
+
+    def _send(self, chat_id, text, kwargs):
+        try:
+            # Уведомления уступают ответам пользователям и пересылкам
+            with outbound.lane(Lane.NOTIFY):
+                bot.send_message(chat_id, text, **kwargs)
+        except Exception as e:
+            logger.error(f"Не удалось уведомить пользователя {chat_id}: {e}")
+            sent = False
+        else:
+            sent = True
+        with self._stats_lock:
+            if sent:
+                self._sent += 1
+            else:
+                self._failed += 1
+
+    def stats(self):
+        """Метрика: очередь, отправлено, не доставлено"""
+        with self._stats_lock:
+            return {
+                "pending": self._queue.qsize(),
+                "sent": self._sent,
+                "failed": self._failed,
+            }
+
+    def shutdown(self, wait=True):
+        """Досылает поставленные сообщения и останавливает поток"""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            if wait:
+                thread.join()
+
+
+# Цикл событий AsyncTeleBot есть только в асинхронном режиме
+runtime = None
+if BOT_RUNTIME == "async":
+    from handlers.async_runtime import (
+        AsyncNotificationQueue,
+        AsyncRelayQueue,
+        AsyncRuntime,
+    )
+
+    runtime = AsyncRuntime(TOKEN)
+    notifications = AsyncNotificationQueue(runtime)
+    relays = AsyncRelayQueue(runtime)
+else:
+    notifications = NotificationQueue()
+    # Пересылки в служебные чаты - в своих потоках, не в потоках обработчиков
+    relays = RelayQueue(bot)
+
+
+def call_soon(method, *args, **kwargs):
+    """bot.<method>(...) из обработчика, результат - Future
+
+    В асинхронном режиме запрос выполняет цикл событий runtime, и поток
+    обработчика его не ждёт; продолжение ставится через dispatcher.then.
+    В многопоточном режиме вызов выполняется сразу, как раньше.
+    """
+    if runtime is not None:
+        future = runtime.call_soon(method, *args, **kwargs)
+    else:
+        future = Future()
+        try:
+            future.set_result(getattr(bot, method)(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+    future.add_done_callback(_log_failure(method))
+    return future
+
+
+def _log_failure(method):
+    def done(future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"Запрос {method} не выполнен: {future.exception()}")
+
+    return done
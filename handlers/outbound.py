@@ -0,0 +1,490 @@
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from enum import IntEnum
+
+from telebot import apihelper
+
+logger = logging.getLogger(__name__)
+
+# Лимиты Telegram: около 30 сообщений в секунду на бота, 1 в секунду в личный
+# чат и 20 в минуту в группу. Ёмкость ведра - сколько можно отправить подряд
+GLOBAL_RATE = 30
+GLOBAL_BURST = 30
+PRIVATE_RATE = 1
+PRIVATE_BURST = 5
+GROUP_RATE = 20 / 60
+GROUP_BURST = 20
+# Сколько вёдер чатов помнить (старые вытесняются)
+MAX_CHATS = 10000
+# Сколько раз повторить запрос, получивший 429
+RETRIES = 3
+# По скольким последним запросам считать время ожидания
+WAIT_SAMPLES = 256
+# Как часто корутина, которой уступила очередь, проверяет её снова (сек)
+ASYNC_POLL = 0.01
+# Как часто корутина проверяет, свободен ли замок планировщика (сек)
+LOCK_POLL = 0.001
+# Потоков, выполняющих пересылки в служебные чаты
+RELAY_WORKERS = 4
+# Больше пересылок в очереди не принимается
+MAX_RELAYS = 1000
+
+# Методы Bot API, на которые действуют лимиты сообщений
+METERED = ("send", "copy", "forward", "edit")
+
+
+class Lane(IntEnum):
+    """Приоритет исходящего запроса: меньше - раньше"""
+
+    REPLY = 0  # Ответы пользователю, который ждёт бота
+    RELAY = 1  # Пересылка работ и сообщений в служебные чаты
+    NOTIFY = 2  # Фоновые уведомления
+
+
+class TokenBucket:
+    """rate токенов в секунду, не больше capacity"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0  # До этого момента - 429 с retry_after
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now, cost):
+        """Через сколько секунд можно потратить cost токенов (0 - сейчас)"""
+        self._refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if cost and self.tokens < min(cost, self.capacity):
+            wait = max(wait, (min(cost, self.capacity) - self.tokens) / self.rate)
+        return wait
+
+    def take(self, cost):
+        # Запрос дороже ёмкости (большой альбом) уводит ведро в минус
+        self.tokens -= cost
+
+
+class _Waiter:
+    __slots__ = ("lane", "seq", "chat_id", "cost")
+
+    def __init__(self, lane, seq, chat_id, cost):
+        self.lane = lane
+        self.seq = seq
+        self.chat_id = chat_id
+        self.cost = cost
+
+
+class OutboundScheduler:
+    """Планировщик исходящих запросов к Bot API
+
+    Подключается к TeleBot через apihelper.CUSTOM_REQUEST_SENDER (install),
+    поэтому обработчики по-прежнему вызывают bot.send_message и получают
+    ответ - поток просто ждёт своей очереди. Отправляющие и изменяющие
+    сообщения методы (send*, copy*, forward*, edit*) тратят токены из общего
+    ведра и ведра чата; sendMediaGroup стоит столько, сколько в нём фото.
+    Остальные методы (getUpdates, getChat, answerCallbackQuery...) не
+    ограничиваются.
+
+    Когда ведро пусто, общий токен достаётся запросу с высшим приоритетом
+    (Lane), который можно отправить: запрос, ждущий своего чата, не держит
+    запросы в другие чаты. Lane задаётся на поток: with outbound.lane(...).
+
+    На 429 ведро чата (или общее) блокируется на retry_after, и запрос
+    повторяется - до retries раз, затем ошибка уходит вызывающему как раньше.
+    """
+
+    def __init__(
+        self,
+        global_rate=GLOBAL_RATE,
+        global_burst=GLOBAL_BURST,
+        private_rate=PRIVATE_RATE,
+        private_burst=PRIVATE_BURST,
+        group_rate=GROUP_RATE,
+        group_burst=GROUP_BURST,
+        max_chats=MAX_CHATS,
+        retries=RETRIES,
+        clock=time.monotonic,
+    ):
+        self.private = (private_rate, private_burst)
+        self.group = (group_rate, group_burst)
+        self.max_chats = max_chats
+        self.retries = retries
+        self.clock = clock
+        self._global = TokenBucket(global_rate, global_burst, clock())
+        self._chats = OrderedDict()  # chat_id -> TokenBucket, порядок LRU
+        self._waiting = []  # _Waiter, ожидающие разрешения
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._granted = [0] * len(Lane)
+        self._waits = [deque(maxlen=WAIT_SAMPLES) for _ in Lane]
+        self._max_wait = [0.0] * len(Lane)
+        self._rate_limited = 0
+
+    # Приоритет
+
+    @contextmanager
+    def lane(self, lane):
+        """Запросы потока внутри блока идут с приоритетом lane"""
+        previous = getattr(self._local, "lane", Lane.REPLY)
+        self._local.lane = lane
+        try:
+            yield
+        finally:
+            self._local.lane = previous
+
+    def current_lane(self):
+        return getattr(self._local, "lane", Lane.REPLY)
+
+    # Вёдра
+
+    def _chat_bucket(self, chat_id, now, create):
+        # Вызывается под self._cond
+        bucket = self._chats.get(chat_id)
+        if bucket is not None:
+            self._chats.move_to_end(chat_id)
+        elif create:
+            # Отрицательные id - группы и каналы
+            rate, burst = self.group if chat_id < 0 else self.private
+            bucket = self._chats[chat_id] = TokenBucket(rate, burst, now)
+            if len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        return bucket
+
+    def _wait_time(self, waiter, now):
+        # Вызывается под self._cond
+        wait = self._global.wait_time(now, waiter.cost)
+        if waiter.chat_id is not None:
+            bucket = self._chat_bucket(waiter.chat_id, now, create=waiter.cost > 0)
+            if bucket is not None:
+                wait = max(wait, bucket.wait_time(now, waiter.cost))
+        return wait
+
+    def _chat_wait(self, waiter, now):
+        # Вызывается под self._cond
+        if waiter.chat_id is None:
+            return 0.0
+        bucket = self._chats.get(waiter.chat_id)
+        return bucket.wait_time(now, waiter.cost) if bucket is not None else 0.0
+
+    def _enqueue(self, chat_id, cost, lane):
+        # Вызывается под self._cond
+        self._seq += 1
+        waiter = _Waiter(lane, self._seq, chat_id, cost)
+        self._waiting.append(waiter)
+        return waiter
+
+    def _ready(self, waiter, now):
+        """0 - запрос можно отправить; иначе сколько ждать (None - пока
+        не отправят более приоритетные)"""
+        # Вызывается под self._cond
+        wait = self._wait_time(waiter, now)
+        if wait > 0:
+            return wait
+        return None if self._outranked(waiter, now) else 0
+
+    def _grant(self, waiter, waited):
+        # Вызывается под self._cond, waiter уже снят с ожидания
+        self._global.take(waiter.cost)
+        if waiter.chat_id is not None and waiter.cost:
+            self._chats[waiter.chat_id].take(waiter.cost)
+        self._granted[waiter.lane] += 1
+        self._waits[waiter.lane].append(waited)
+        self._max_wait[waiter.lane] = max(self._max_wait[waiter.lane], waited)
+        # Следующий по приоритету может оказаться готов
+        self._cond.notify_all()
+
+    def acquire(self, chat_id, cost=1, lane=None):
+        """Ждёт, пока запрос в chat_id стоимостью cost можно отправить"""
+        lane = self.current_lane() if lane is None else lane
+        started = self.clock()
+        with self._cond:
+            waiter = self._enqueue(chat_id, cost, lane)
+            try:
+                while True:
+                    now = self.clock()
+                    wait = self._ready(waiter, now)
+                    if wait == 0:
+                        break
+                    # Токены появятся не раньше wait; раньше разбудит выдача
+                    # разрешения другому запросу
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._waiting.remove(waiter)
+            self._grant(waiter, now - started)
+
+    @asynccontextmanager
+    async def _async_locked(self):
+        """with self._cond для корутин: замок, занятый потоком, ждём через
+        asyncio.sleep, а не блокируя цикл событий"""
+        while not self._cond.acquire(blocking=False):
+            await asyncio.sleep(LOCK_POLL)
+        try:
+            yield
+        finally:
+            self._cond.release()
+
+    async def acquire_async(self, chat_id, cost=1, lane=Lane.REPLY):
+        """acquire для корутин: ожидание - asyncio.sleep, цикл событий
+        не блокируется. Очередь и вёдра общие с потоками"""
+        started = self.clock()
+        async with self._async_locked():
+            waiter = self._enqueue(chat_id, cost, lane)
+        try:
+            while True:
+                async with self._async_locked():
+                    now = self.clock()
+                    wait = self._ready(waiter, now)
+                    if wait == 0:
+                        self._waiting.remove(waiter)
+                        self._grant(waiter, now - started)
+                        return
+                await asyncio.sleep(ASYNC_POLL if wait is None else wait)
+        except BaseException:
+            # Корутину отменили - не держим очередь за собой
+            async with self._async_locked():
+                if waiter in self._waiting:
+                    self._waiting.remove(waiter)
+                    self._cond.notify_all()
+            raise
+
+    def _outranked(self, waiter, now):
+        """Не хватит ли общих токенов более приоритетным запросам, которые
+        готовы к отправке (их чаты свободны)"""
+        if not waiter.cost:
+            return False
+        key = (waiter.lane, waiter.seq)
+        demand = sum(
+            min(other.cost, self._global.capacity)
+            for other in self._waiting
+            if (other.lane, other.seq) < key
+            and other.cost
+            and self._chat_wait(other, now) <= 0
+        )
+        return demand and self._global.tokens - demand < min(
+            waiter.cost, self._global.capacity
+        )
+
+    def penalize(self, chat_id, retry_after):
+        """429: не отправлять в chat_id (None - никуда) retry_after секунд"""
+        with self._cond:
+            self._penalize(chat_id, retry_after)
+
+    async def penalize_async(self, chat_id, retry_after):
+        """penalize для корутин"""
+        async with self._async_locked():
+            self._penalize(chat_id, retry_after)
+
+    def _penalize(self, chat_id, retry_after):
+        # Вызывается под self._cond
+        now = self.clock()
+        bucket = self._global
+        if chat_id is not None:
+            bucket = self._chat_bucket(chat_id, now, create=True)
+        bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+        self._rate_limited += 1
+
+    # Подключение к apihelper
+
+    @staticmethod
+    def _request_target(url, params):
+        """(chat_id, стоимость) запроса по имени метода и параметрам"""
+        method = url.rsplit("/", 1)[-1]
+        chat_id = (params or {}).get("chat_id")
+        try:
+            chat_id = int(chat_id) if chat_id is not None else None
+        except (TypeError, ValueError):
+            chat_id = None  # @username канала - только общее ведро
+        if not method.startswith(METERED):
+            return chat_id, 0
+        if method == "sendMediaGroup":
+            try:
+                return chat_id, max(1, len(json.loads(params["media"])))
+            except (KeyError, TypeError, ValueError):
+                pass
+        return chat_id, 1
+
+    @staticmethod
+    def call_target(method, args, kwargs):
+        """(chat_id, стоимость) вызова bot.<method>(*args, **kwargs)"""
+        chat_id = kwargs.get("chat_id", args[0] if args else None)
+        if not isinstance(chat_id, int):
+            chat_id = None  # @username канала - только общее ведро
+        if not method.startswith(METERED):
+            return chat_id, 0
+        if method == "send_media_group":
+            media = kwargs.get("media", args[1] if len(args) > 1 else None)
+            return chat_id, max(1, len(media or ()))
+        return chat_id, 1
+
+    @staticmethod
+    def _retry_after(response):
+        if response.status_code != 429:
+            return None
+        try:
+            return response.json().get("parameters", {}).get("retry_after", 1)
+        except ValueError:
+            return 1
+
+    def send(self, method, url, **kwargs):
+        """CUSTOM_REQUEST_SENDER: ждёт очереди, отправляет, повторяет на 429"""
+        chat_id, cost = self._request_target(url, kwargs.get("params"))
+        for attempt in range(self.retries + 1):
+            self.acquire(chat_id, cost)
+            response = apihelper._get_req_session().request(method, url, **kwargs)
+            retry_after = self._retry_after(response)
+            if retry_after is None:
+                return response
+            logger.warning(f"429 от Telegram для чата {chat_id}, ждём {retry_after} с")
+            self.penalize(chat_id, retry_after)
+            # Файлы из потоков уже прочитаны - повторить такой запрос нельзя
+            if attempt == self.retries or kwargs.get("files"):
+                return response
+        return response
+
+    def install(self):
+        apihelper.CUSTOM_REQUEST_SENDER = self.send
+
+    # Метрики
+
+    def stats(self):
+        """Метрики по приоритетам: ждут сейчас, пропущено, среднее и
+        максимальное ожидание (сек); ответов 429; вёдер чатов"""
+        with self._cond:
+            lanes = {}
+            for lane in Lane:
+                waits = self._waits[lane]
+                lanes[lane.name.lower()] = {
+                    "waiting": sum(1 for waiter in self._waiting if waiter.lane == lane),
+                    "granted": self._granted[lane],
+                    "avg_wait": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                    "max_wait": round(self._max_wait[lane], 3),
+                }
+            return {
+                "lanes": lanes,
+                "rate_limited": self._rate_limited,
+                "chats": len(self._chats),
+            }
+
+
+outbound = OutboundScheduler()
+
+
+class RelayOverloadedError(Exception):
+    """Очередь пересылок переполнена - пересылка не принята"""
+
+
+class RelayError(Exception):
+    """Пересылка прервана ошибкой error; sent - сколько её вызовов уже
+    выполнено (их сообщения уже в чате)"""
+
+    def __init__(self, error, sent):
+        super().__init__(str(error))
+        self.error = error
+        self.sent = sent
+
+
+def api_call(method, *args, **kwargs):
+    """Вызов bot.<method>(*args, **kwargs) для очереди пересылок"""
+    return method, args, kwargs
+
+
+class RelayQueue:
+    """Пересылки в служебные чаты (чат конкурса, админов, новостей) в фоне
+
+    Обработчик ставит пересылку (put) и сразу отвечает пользователю, а
+    вызовы Bot API ждут своей очереди в планировщике (Lane.RELAY) в потоках
+    этой очереди, не занимая потоки диспетчера. Вызовы одной пересылки
+    (альбом и текст к нему) выполняются по порядку; put возвращает Future
+    со списком их результатов или с RelayError.
+    """
+
+    def __init__(self, bot, workers=RELAY_WORKERS, max_queue=MAX_RELAYS, scheduler=outbound):
+        self.bot = bot
+        self.workers = workers
+        self.scheduler = scheduler
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._sent = 0
+        self._failed = 0
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(
+                        target=self._loop, name=f"relay-{i}", daemon=True
+                    )
+                    thread.start()
+                    self._threads.append(thread)
+
+    def put(self, *calls):
+        """Ставит пересылку из вызовов api_call(...), возвращает Future"""
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put_nowait((future, calls))
+        except queue.Full:
+            with self._stats_lock:
+                self._failed += 1
+            future.set_exception(RelayOverloadedError("Очередь пересылок переполнена"))
+        return future
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, calls = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            results = []
+            try:
+                with self.scheduler.lane(Lane.RELAY):
+                    for method, args, kwargs in calls:
+                        results.append(getattr(self.bot, method)(*args, **kwargs))
+            except Exception as e:
+                logger.error(f"Пересылка не выполнена: {e}")
+                with self._stats_lock:
+                    self._failed += 1
+                future.set_exception(RelayError(e, len(results)))
+            else:
+                with self._stats_lock:
+                    self._sent += 1
+                future.set_result(results)
+
+    def stats(self):
+        """Метрика: очередь, переслано, с ошибкой"""
+        with self._stats_lock:
+            return {
+                "pending": self._queue.qsize(),
+                "sent": self._sent,
+                "failed": self._failed,
+            }
+
+    def shutdown(self, wait=True):
+        """Выполняет поставленные пересылки и останавливает потоки"""
+        with self._start_lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
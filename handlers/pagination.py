@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from contextlib import closing
+from threading import Lock
+
+from database.db_classes import Page
+
+# Максимальная длина текста сообщения в Telegram
+MESSAGE_LIMIT = 4096
+
+
+def telegram_len(text):
+    """Длина текста так, как её считает Telegram (в UTF-16 единицах)"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+class TextPaginator:
+    """Список из БД, разбитый на страницы по лимиту длины сообщения
+
+    Строки читаются потоком из курсора (rows(after_id=..., before_id=...),
+    первый столбец - ключ) и добавляются на страницу, пока текст
+    помещается в limit. Готовые страницы кэшируются до изменения
+    version (DataVersion таблицы), так что листание туда-обратно
+    не повторяет запросы.
+    """
+
+    def __init__(
+        self, title, rows, format_row, version, limit=MESSAGE_LIMIT, cache_size=64
+    ):
+        self.title = title
+        self.rows = rows
+        self.format_row = format_row
+        self.version = version
+        self.limit = limit
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def render(self, after_id=0, before_id=None):
+        """Текст страницы и Page с курсорами соседних страниц
+
+        Текст пустой, если строк нет.
+        """
+        key = (self.version.value, after_id, before_id)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        result = self._build(after_id, before_id)
+
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _build(self, after_id, before_id):
+        budget = self.limit - telegram_len(self.title)
+        blocks = []
+        keys = []
+        has_more = False
+
+        with closing(self.rows(after_id=after_id, before_id=before_id)) as rows:
+            for row in rows:
+                block = self.format_row(row)
+                size = telegram_len(block)
+                if size > budget:
+                    if blocks:
+                        has_more = True
+                        break
+                    # Одна строка длиннее лимита - обрезаем, чтобы не потерять страницу
+                    block = block[: max(budget - 1, 0)]
+                    while block and telegram_len(block) >= budget:
+                        block = block[:-1]
+                    block += "…"
+                    size = telegram_len(block)
+                blocks.append(block)
+                keys.append(row[0])
+                budget -= size
+
+        if before_id is not None:
+            # Шли назад по убыванию ключа
+            blocks.reverse()
+            keys.reverse()
+            next_cursor = keys[-1] if keys else None
+            prev_cursor = keys[0] if has_more else None
+        else:
+            next_cursor = keys[-1] if has_more else None
+            prev_cursor = keys[0] if after_id and keys else None
+
+        text = self.title + "".join(blocks) if blocks else ""
+        return text, Page(keys, next_cursor, prev_cursor)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,147 @@
+import logging
+import time
+from threading import Lock
+
+from telebot import types
+
+from database.db_classes import SubmissionManager, get_submission
+from database.executor import DbOverloadedError, db_executor, log_errors
+
+logger = logging.getLogger(__name__)
+
+# Сколько следующих работ держать наготове
+PREFETCH_COUNT = 3
+# Сессия без действий админа считается брошенной через (сек)
+SESSION_TTL = 30 * 60
+
+
+def build_media_group(submission):
+    """InputMediaPhoto для отправки работы админу (подпись - у первого фото)"""
+    media_group = []
+    for i, photo_dict in enumerate(submission["photos"]):
+        file_id = photo_dict.get("file_id")
+        if not file_id:
+            continue  # Пропускаем некорректные записи
+        media_group.append(
+            types.InputMediaPhoto(
+                media=file_id,
+                caption=(
+                    f"Работа #{submission['id']}\n\n{submission['caption']}"
+                    if i == 0
+                    else None
+                ),
+            )
+        )
+    return media_group
+
+
+def load_review(submission_id):
+    """Работа и готовый media group - то, что нужно для показа"""
+    submission = get_submission(submission_id)
+    return submission, build_media_group(submission)
+
+
+class ReviewSession:
+    def __init__(self):
+        self.prefetched = {}  # submission_id -> Future(load_review)
+        self.last_activity = time.monotonic()
+        self.cancelled = False
+
+
+class ReviewSessions:
+    """Сессии проверки работ: пока админ смотрит одну работу, следующие
+    PREFETCH_COUNT из очереди загружаются в пуле читателей БД
+
+    Сессия отменяется, когда админ уходит с экрана проверки (cancel),
+    или истекает через SESSION_TTL без действий.
+    """
+
+    def __init__(self, prefetch=PREFETCH_COUNT, ttl=SESSION_TTL):
+        self.prefetch = prefetch
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = Lock()
+
+    def get(self, admin_id, submission_id):
+        """(работа, media group): из предзагрузки, если она готова, иначе из БД"""
+        with self._lock:
+            session = self._sessions.get(admin_id)
+            future = session.prefetched.pop(submission_id, None) if session else None
+        if future is not None and not future.cancelled():
+            try:
+                return future.result()
+            except Exception as e:
+                logger.warning(f"Предзагрузка работы {submission_id} не удалась: {e}")
+        return load_review(submission_id)
+
+    def prefetch_after(self, admin_id, submission_id):
+        """Запускает фоновую загрузку работ, следующих за submission_id"""
+        self._expire()
+        with self._lock:
+            session = self._sessions.get(admin_id)
+            if session is None:
+                session = self._sessions[admin_id] = ReviewSession()
+            session.last_activity = time.monotonic()
+            # Работы до текущей уже не понадобятся
+            for old_id in [i for i in session.prefetched if i <= submission_id]:
+                session.prefetched.pop(old_id).cancel()
+        try:
+            log_errors(
+                db_executor.read(self._prefetch, session, admin_id, submission_id),
+                f"предзагрузка работ после {submission_id}",
+            )
+        except DbOverloadedError:
+            # Предзагрузка необязательна - следующая работа загрузится по нажатию
+            pass
+
+    def _prefetch(self, session, admin_id, submission_id):
+        page = SubmissionManager.list_pending(after_id=submission_id, limit=self.prefetch)
+        now = time.time()
+        next_ids = [
+            next_id
+            for next_id, _, claimed_by, claimed_until in page.items
+            # Занятые другим админом всё равно не достанутся
+            if claimed_by in (None, admin_id) or claimed_until <= now
+        ]
+        with self._lock:
+            if session.cancelled:
+                return
+            next_ids = [i for i in next_ids if i not in session.prefetched]
+
+        futures = {i: db_executor.read(load_review, i) for i in next_ids}
+
+        with self._lock:
+            for next_id, future in futures.items():
+                if session.cancelled or next_id in session.prefetched:
+                    future.cancel()
+                else:
+                    session.prefetched[next_id] = future
+
+    def cancel(self, admin_id):
+        """Админ ушёл с экрана проверки - отменяем предзагрузку"""
+        with self._lock:
+            session = self._sessions.pop(admin_id, None)
+            if session is None:
+                return
+            session.cancelled = True
+            for future in session.prefetched.values():
+                future.cancel()
+            session.prefetched.clear()
+
+    def _expire(self):
+        deadline = time.monotonic() - self.ttl
+        with self._lock:
+            expired = [
+                admin_id
+                for admin_id, session in self._sessions.items()
+                if session.last_activity < deadline
+            ]
+        for admin_id in expired:
+            self.cancel(admin_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+review_sessions = ReviewSessions()
@@ -0,0 +1,38 @@
+from enum import IntFlag
+
+from database.db_classes import approved_users, blocked_users, judge_users
+from handlers.envParams import admin_ids, news_ids
+
+
+class Role(IntFlag):
+    NONE = 0
+    ADMIN = 1
+    NEWS = 2
+    JUDGE = 4
+    APPROVED = 8  # Есть одобренная работа на конкурсе
+    BLOCKED = 16
+
+
+class UserRoles:
+    """Роли пользователя одной битовой маской из закэшированных множеств"""
+
+    @staticmethod
+    def get(user_id) -> Role:
+        roles = Role.NONE
+        if user_id in admin_ids:
+            roles |= Role.ADMIN
+        if user_id in news_ids:
+            roles |= Role.NEWS
+        if user_id in judge_users:
+            roles |= Role.JUDGE
+        if user_id in approved_users:
+            roles |= Role.APPROVED
+        if user_id in blocked_users:
+            roles |= Role.BLOCKED
+        return roles
+
+    @staticmethod
+    def refresh():
+        """Перечитать роли из БД (например, после изменений другим процессом)"""
+        for cached in (judge_users, approved_users, blocked_users):
+            cached.refresh()
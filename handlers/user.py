@@ -1,9 +1,9 @@
 from datetime import datetime
+from concurrent.futures import Future
+from functools import partial
 import logging
-import threading
 import re
 from telebot.apihelper import ApiTelegramException
-from collections import defaultdict
 from venv import logger
 from telebot import types
 import time
@@ -11,10 +11,11 @@ from database.db_classes import (
     ContestManager,
     ContestSubmission,
     SubmissionManager,
-    is_user_approved,
     user_submissions,
     user_content_storage,
 )
+from database.executor import db_executor
+from database.sessions import Flow, sessions
 from bot_instance import bot
 from handlers.envParams import (
     ADMIN_CHAT_ID,
@@ -25,10 +26,14 @@ from handlers.envParams import (
     CHAT_USERNAME,
 )
 from handlers.decorator import private_chat_only
+from handlers.dispatcher import dispatcher
+from handlers.media_groups import album_of
+from handlers.notifications import call_soon, notifications, relays
+from handlers.outbound import RelayError, api_call
+from handlers.roles import Role, UserRoles
 from menu.links import Links
 from menu.menu import Menu
 from menu.constants import (
-    MONTHS_RU,
     ButtonCallback,
     ButtonText,
     ConstantLinks,
@@ -36,7 +41,6 @@ from menu.constants import (
 )
 
 
-from threading import Lock
 from weakref import WeakValueDictionary
 
 logging.basicConfig(
@@ -46,24 +50,28 @@ logging.basicConfig(
 )
 
 
-# Глобальный словарь для отслеживания медиагрупп
-media_groups = defaultdict(list)
-# Временное хранилище для данных
-temp_storage = {}
+# Готовый контент, ожидающий отправки админам
+temp_storage = sessions.view(Flow.RELAY)
 
 
-def is_user_in_chat(user_id):
-    try:
-        chat_member = bot.get_chat_member(CHAT_ID, user_id)
-        return chat_member.status not in ["left", "kicked"]
-    except Exception as e:
-        logger = logging.getLogger(__name__)
-        logger.error(f"Ошибка проверки участника чата: {e}")
-        return False
+def chat_membership(user_id):
+    """Future: состоит ли пользователь в чате (ошибка проверки - не состоит)"""
+    membership = Future()
+
+    def checked(future):
+        try:
+            membership.set_result(future.result().status not in ["left", "kicked"])
+        except Exception as e:
+            logger = logging.getLogger(__name__)
+            logger.error(f"Ошибка проверки участника чата: {e}")
+            membership.set_result(False)
+
+    call_soon("get_chat_member", CHAT_ID, user_id).add_done_callback(checked)
+    return membership
 
 
 def is_user_blocked(call):
-    if SubmissionManager.is_blocked(call.from_user.id):
+    if Role.BLOCKED in UserRoles.get(call.from_user.id):
         bot.answer_callback_query(
             call.id,
             "⚠️ Вы заблокированы ботом\nЕсли считаете это ошибкой, свяжитесь с админами чата",
@@ -73,113 +81,26 @@ def is_user_blocked(call):
     return False
 
 
-# Система блокировки ввода
-class UserLock:
-    def __init__(self):
-        self.locks = defaultdict(Lock)  # Базовые блокировки по user_id
-        self.media_group_locks = defaultdict(
-            Lock
-        )  # Отдельные блокировки для медиагрупп
-        self.current_media_groups = {}  # Текущие обрабатываемые медиагруппы
-        self.global_lock = Lock()
-        self.last_activity = {}  # Добавляем недостающий атрибут
-
-    def acquire(self, user_id: int) -> bool:
-        """Пытается захватить блокировку для пользователя"""
-        with self.global_lock:
-            acquired = self.locks[user_id].acquire(blocking=False)
-            if acquired:
-                self.last_activity[user_id] = time.time()  # Обновляем время активности
-            return acquired
-
-    def release(self, user_id: int) -> None:
-        """Освобождает блокировку пользователя"""
-        with self.global_lock:
-            if user_id in self.locks:
-                try:
-                    self.locks[user_id].release()
-                    self.last_activity[user_id] = time.time()  # Обновляем время
-                except RuntimeError:
-                    pass  # Игнорируем ошибку повторного освобождения
-
-    def acquire_for_media_group(self, user_id: int, media_group_id: str) -> bool:
-        """Захват блокировки для медиагруппы"""
-        if media_group_id in self.current_media_groups.get(user_id, set()):
-            return True  # Уже обрабатывается
-        with self.locks[user_id]:
-            self.current_media_groups.setdefault(user_id, set()).add(media_group_id)
-            return self.media_group_locks[media_group_id].acquire(blocking=False)
-
-    def release_media_group(self, user_id: int, media_group_id: str):
-        """Освобождение блокировки медиагруппы"""
-        with self.locks[user_id]:
-            if media_group_id in self.current_media_groups.get(user_id, set()):
-                self.media_group_locks[media_group_id].release()
-                self.current_media_groups[user_id].remove(media_group_id)
-
-    def cleanup(self, max_age=300):
-        """Удаляет неактивные блокировки старше max_age секунд"""
-        with self.global_lock:
-            now = time.time()
-            # Создаем копию ключей для безопасной итерации
-            for user_id in list(self.last_activity.keys()):
-                if now - self.last_activity.get(user_id, 0) > max_age:
-                    del self.locks[user_id]
-                    del self.last_activity[user_id]
-
-
-# Инициализируем глобальный экземпляр
-user_locks = UserLock()
-
-
-def lock_input(allow_media_groups: bool = False):
-    """Декоратор с поддержкой медиагрупп"""
-
-    def decorator(func):
-        def wrapper(message_or_call):
-            user_id = message_or_call.from_user.id
-            media_group_id = getattr(message_or_call, "media_group_id", None)
-
-            # Для медиагрупп используем специальные блокировки
-            if allow_media_groups and media_group_id:
-                if not user_locks.acquire_for_media_group(user_id, media_group_id):
-                    return
-            else:
-                if not user_locks.acquire(user_id):
-                    error_msg = (
-                        "⏳ Пожалуйста, дождитесь завершения предыдущей операции"
-                    )
-                    if hasattr(message_or_call, "message"):
-                        bot.answer_callback_query(message_or_call.id, error_msg)
-                    else:
-                        bot.reply_to(message_or_call, error_msg)
-                    return
-
-            try:
-                return func(message_or_call)
-            finally:
-                if allow_media_groups and media_group_id:
-                    user_locks.release_media_group(user_id, media_group_id)
-                else:
-                    user_locks.release(user_id)
-
-        return wrapper
-
-    return decorator
-
-
-# Функция для фоновой очистки
-def run_cleanup():
-    while True:
-        try:
-            user_locks.cleanup()
-        except Exception as e:
-            logger.error(f"Cleanup error: {str(e)}")
-        time.sleep(60)  # Проверка каждую минуту
-
-
-# Запуск в отдельном потоке
-threading.Thread(target=run_cleanup, daemon=True).start()
+def collect_photos(message, photos, limit):
+    """Добавляет в photos оригиналы фото сообщения (у альбома - всех частей)
+    без дубликатов и сверх limit. Возвращает (добавлено, дубликатов, лишних)"""
+    existing_ids = {p["unique_id"] for p in photos}
+    added = duplicates = overflow = 0
+    for part in album_of(message):
+        if not part.photo:
+            continue  # В альбоме может быть видео
+        # Оригинальное изображение - последний (наибольший) размер
+        original_photo = part.photo[-1]
+        unique_id = original_photo.file_unique_id
+        if unique_id in existing_ids:
+            duplicates += 1
+        elif len(photos) >= limit:
+            overflow += 1
+        else:
+            photos.append({"file_id": original_photo.file_id, "unique_id": unique_id})
+            existing_ids.add(unique_id)
+            added += 1
+    return added, duplicates, overflow
 
 
 # Сбор "Юзер инфо"
@@ -326,18 +247,9 @@ def handle_user_guides(call):
     )
 
 
-def format_date_ru(date_str: str) -> str:
-    try:
-        date_obj = datetime.strptime(date_str, "%d.%m.%Y")
-        return f"{date_obj.day} {MONTHS_RU[date_obj.month]} {date_obj.year}"
-    except:
-        return date_str
-
-
 @bot.callback_query_handler(
     func=lambda call: call.data == ButtonCallback.USER_CONTEST_INFO,
 )
-@lock_input()
 @private_chat_only(bot)
 def handle_user_contest_info(call):
     try:
@@ -352,13 +264,13 @@ def handle_user_contest_info(call):
             markup = Menu.back_user_contest_menu()
         else:
             current_date = datetime.now().date()
-            end_date_obj = datetime.strptime(contest[4], "%d.%m.%Y").date()
+            end_date_obj = contest.end_date
 
             # Основной текст сообщения
-            theme = contest[1]
-            description = contest[2]
-            contest_date = format_date_ru(contest[3])
-            end_date_of_admission = format_date_ru(contest[4])
+            theme = contest.theme
+            description = contest.description
+            contest_date = contest.contest_date_ru
+            end_date_of_admission = contest.end_date_ru
 
             text = (
                 f"🏆 *Актуальный конкурс*\n\n"
@@ -370,7 +282,7 @@ def handle_user_contest_info(call):
             )
 
             # Добавляем предупреждение если срок подачи истёк
-            if end_date_obj < current_date:
+            if end_date_obj and end_date_obj < current_date:
                 text += "❗️*Приём работ на конкурс завершён,* _следите за обновлениями_ ^^\n\n"
 
             text += "Можете ознакомиться с правилами участия _и списком предыдущих конкурсов_ по ссылке:"
@@ -414,13 +326,11 @@ SUBMISSION_TIMEOUT = 300  # 5 минут на подтверждение
 @bot.callback_query_handler(
     func=lambda call: call.data == ButtonCallback.USER_CONTEST_SEND,
 )
-@lock_input()
 @private_chat_only(bot)
 def start_contest_submission(call):
     try:
         user_id = call.from_user.id
-        if user_id in temp_storage:
-            del temp_storage[user_id]
+        temp_storage.pop(user_id, None)
 
         # Получаем данные о текущем конкурсе
         contest = ContestManager.get_current_contest()
@@ -434,8 +344,8 @@ def start_contest_submission(call):
             return
         else:
             current_date = datetime.now().date()
-            end_date_obj = datetime.strptime(contest[4], "%d.%m.%Y").date()
-            if end_date_obj < current_date:
+            end_date_obj = contest.end_date
+            if end_date_obj and end_date_obj < current_date:
                 bot.answer_callback_query(
                     call.id,
                     "❗️Приём работ на конкурс завершён\nСледите за обновлениями",
@@ -443,8 +353,10 @@ def start_contest_submission(call):
                 )
                 return
 
+            roles = UserRoles.get(user_id)
+
             # Проверка через метод exists
-            if user_submissions.exists(user_id) or is_user_approved(user_id):
+            if user_submissions.exists(user_id) or Role.APPROVED in roles:
                 bot.answer_callback_query(
                     call.id,
                     "⚠️ Вы уже отправляли работу\n\nЕсли хотите изменить работу, свяжитесь с админами",
@@ -452,67 +364,91 @@ def start_contest_submission(call):
                 )
                 return
 
-            # Проверяем, состоит ли пользователь в чате
-            if not is_user_in_chat(call.from_user.id):
-                bot.send_message(
-                    call.message.chat.id,
-                    "❌ Для участия в конкурсе необходимо состоять в нашем чате\n"
-                    + Links.get_chat_url(),
-                    reply_markup=Menu.contests_menu(),
-                )
-                return
+            def member_checked(in_chat):
+                # Проверяем, состоит ли пользователь в чате
+                if not in_chat:
+                    bot.send_message(
+                        call.message.chat.id,
+                        "❌ Для участия в конкурсе необходимо состоять в нашем чате\n"
+                        + Links.get_chat_url(),
+                        reply_markup=Menu.contests_menu(),
+                    )
+                    return
 
-            user_id = call.from_user.id
-            submission = ContestSubmission()
+                user_id = call.from_user.id
+                submission = ContestSubmission()
 
-            text = "Должен Вас предупредить:\n"
-            text += "\n⚠️ Подготовьте работу полностью, напишите текст к работе заранее,_ например, в заметках_, так как время на отправку ограничено\n"
-            text += "\n⚠️ Обязательно проверьте, что на фото присутствует кристаллик MO–67KW–B1M9–C352, без него работа может быть отклонена\n"
-            if SubmissionManager.delete_judge(user_id):
-                text += "\n⚠️ Ещё вижу, что у Вас есть заявка на судейство – при отправке работы Вы будете удалены из списка судей"
+                text = "Должен Вас предупредить:\n"
+                text += "\n⚠️ Подготовьте работу полностью, напишите текст к работе заранее,_ например, в заметках_, так как время на отправку ограничено\n"
+                text += "\n⚠️ Обязательно проверьте, что на фото присутствует кристаллик MO–67KW–B1M9–C352, без него работа может быть отклонена\n"
 
-            markup = types.InlineKeyboardMarkup()
-            markup.row(
-                types.InlineKeyboardButton(
-                    text="✅ Начать отправку", callback_data=f"contest_start:{user_id}"
-                )
-            )
-            markup.row(
-                types.InlineKeyboardButton(
-                    text="🚫 Отменить", callback_data=f"contest_cancel:{user_id}"
-                )
-            )
-            markup.row(
-                types.InlineKeyboardButton(
-                    text=ButtonText.USER_HELP_SITE, url=ConstantLinks.HELP_LINK
-                )
-            )
+                def show(judge_removed):
+                    warning = text
+                    if judge_removed:
+                        warning += "\n⚠️ Ещё вижу, что у Вас есть заявка на судейство – при отправке работы Вы будете удалены из списка судей"
 
-            bot.edit_message_text(
-                chat_id=call.message.chat.id,
-                message_id=call.message.message_id,
-                text=text,
-                reply_markup=markup,
-                parse_mode="MarkdownV2",
+                    markup = types.InlineKeyboardMarkup()
+                    markup.row(
+                        types.InlineKeyboardButton(
+                            text="✅ Начать отправку", callback_data=f"contest_start:{user_id}"
+                        )
+                    )
+                    markup.row(
+                        types.InlineKeyboardButton(
+                            text="🚫 Отменить", callback_data=f"contest_cancel:{user_id}"
+                        )
+                    )
+                    markup.row(
+                        types.InlineKeyboardButton(
+                            text=ButtonText.USER_HELP_SITE, url=ConstantLinks.HELP_LINK
+                        )
+                    )
+
+                    bot.edit_message_text(
+                        chat_id=call.message.chat.id,
+                        message_id=call.message.message_id,
+                        text=warning,
+                        reply_markup=markup,
+                        parse_mode="MarkdownV2",
+                    )
+
+                if Role.JUDGE in roles:
+                    # Предупреждение показываем, когда заявка на судейство удалена
+                    dispatcher.then(
+                        db_executor.write(SubmissionManager.delete_judge, user_id),
+                        show,
+                        on_error=partial(submission_start_failed, call),
+                    )
+                else:
+                    show(False)
+
+            # Членство проверяется запросом к Bot API - продолжаем по ответу
+            dispatcher.then(
+                chat_membership(user_id),
+                member_checked,
+                on_error=partial(submission_start_failed, call),
             )
 
     except Exception as e:
-        logger = logging.getLogger(__name__)
-        logger.error(f"Ошибка начала отправки: {e}")
-        handle_submission_error(call.from_user.id, e)
+        submission_start_failed(call, e)
+
+
+def submission_start_failed(call, error):
+    logger = logging.getLogger(__name__)
+    logger.error(f"Ошибка начала отправки: {error}")
+    handle_submission_error(call.from_user.id, error)
 
 
 @bot.callback_query_handler(
     func=lambda call: call.data.startswith(("contest_start", "contest_cancel"))
 )
-@lock_input()
 def handle_contest_start(call):
     try:
         action, user_id = call.data.split(":")
         user_id = int(user_id)
 
         # Удаляем сообщение с кнопками
-        bot.delete_message(call.message.chat.id, call.message.message_id)
+        call_soon("delete_message", call.message.chat.id, call.message.message_id)
 
         if action == "contest_start":
             submission = ContestSubmission()
@@ -549,7 +485,6 @@ def handle_contest_start(call):
     func=lambda m: user_submissions.exists(m.from_user.id)
     and user_submissions.get(m.from_user.id).status == UserState.WAITING_CONTEST_PHOTOS,
 )
-@lock_input(allow_media_groups=True)
 def handle_contest_photos(message):
     user_id = message.from_user.id
     submission = user_submissions.get(user_id)
@@ -559,33 +494,19 @@ def handle_contest_photos(message):
     user_submissions.update_last_activity(user_id)
 
     try:
-        # Удаляем предыдущее сообщение с прогрессом
-        if submission.progress_message_id:
-            try:
-                bot.delete_message(message.chat.id, submission.progress_message_id)
-            except Exception as e:
-                logger.warning(f"Не удалось удалить сообщение: {e}")
-
-        # Получаем оригинальное фото (последний элемент всегда наибольший)
-        original_photo = message.photo[-1]
-        unique_id = original_photo.file_unique_id
-
-        # Проверка дубликатов
-        existing_ids = {p["unique_id"] for p in submission.photos}
-        if unique_id in existing_ids:
-            bot.reply_to(message, "❌ Это фото уже было добавлено!")
-            return
+        # Сохраняем фото (альбом приходит целиком)
+        added, duplicates, overflow = collect_photos(message, submission.photos, 10)
 
         # Проверка лимита
-        if len(submission.photos) >= 10:
+        if overflow:
             bot.reply_to(message, "❌ Достигнут максимум 10 фото!")
             request_contest_description(user_id)
             return
 
-        # Сохраняем данные
-        submission.photos.append(
-            {"file_id": original_photo.file_id, "unique_id": unique_id}
-        )
+        # Проверка дубликатов
+        if not added:
+            bot.reply_to(message, "❌ Это фото уже было добавлено!")
+            return
 
         # Обновляем таймер последней активности
         submission.last_activity = time.time()
@@ -594,32 +515,43 @@ def handle_contest_photos(message):
         if len(submission.photos) == 10:
             request_contest_description(user_id)
         else:
-            # Формируем прогресс-бар
-            progress_bar = "🟪" * len(submission.photos) + "◻️" * (
-                10 - len(submission.photos)
-            )
-
-            # Отправляем обновлённое сообщение
-            sent_msg = bot.reply_to(
-                message,
-                f"{progress_bar}\n"
-                f"✅ Фото добавлено! Всего: {len(submission.photos)}/10\n"
-                "Отправьте еще фото или нажмите /done\n\n"
-                "🚫 Для отмены используйте /cancel",
-            )
-            submission.progress_message_id = sent_msg.message_id
+            send_contest_progress(message)
 
     except Exception as e:
         handle_submission_error(user_id, e)
 
 
+def send_contest_progress(message):
+    user_id = message.from_user.id
+    submission = user_submissions.get(user_id)
+
+    # Удаляем предыдущее сообщение с прогрессом
+    if submission.progress_message_id:
+        try:
+            call_soon("delete_message", message.chat.id, submission.progress_message_id)
+        except Exception as e:
+            logger.warning(f"Не удалось удалить сообщение: {e}")
+
+    # Формируем прогресс-бар
+    progress_bar = "🟪" * len(submission.photos) + "◻️" * (10 - len(submission.photos))
+
+    # Отправляем обновлённое сообщение
+    sent_msg = bot.reply_to(
+        message,
+        f"{progress_bar}\n"
+        f"✅ Фото добавлено! Всего: {len(submission.photos)}/10\n"
+        "Отправьте еще фото или нажмите /done\n\n"
+        "🚫 Для отмены используйте /cancel",
+    )
+    submission.progress_message_id = sent_msg.message_id
+
+
 # Обработчик команды /done для завершения загрузки фото
 @bot.message_handler(
     commands=["done"],
     func=lambda m: user_submissions.exists(m.from_user.id)
     and user_submissions.get(m.from_user.id).status == UserState.WAITING_CONTEST_PHOTOS,
 )
-@lock_input()
 def handle_done_contest_photos(message):
     user_id = message.from_user.id
     submission = user_submissions.get(user_id)
@@ -636,7 +568,7 @@ def handle_done_contest_photos(message):
     # Удаляем сообщение прогресса
     if submission.progress_message_id:
         try:
-            bot.delete_message(message.chat.id, submission.progress_message_id)
+            call_soon("delete_message", message.chat.id, submission.progress_message_id)
         except Exception as e:
             logger.warning(f"Не удалось удалить сообщение: {e}")
 
@@ -668,7 +600,6 @@ def request_contest_description(user_id):
     func=lambda m: user_submissions.exists(m.from_user.id)
     and user_submissions.get(m.from_user.id).status == UserState.WAITING_CONTEST_TEXT,
 )
-@lock_input()
 def handle_text(message):
     user_id = message.from_user.id
     submission = user_submissions.get(user_id)
@@ -684,8 +615,12 @@ def handle_text(message):
 
         # Показываем предпросмотр
         media = [types.InputMediaPhoto(pid["file_id"]) for pid in submission.photos]
-        bot.send_media_group(user_id, media)
+        previewed = call_soon("send_media_group", user_id, media)
+    except Exception as e:
+        handle_submission_error(user_id, e)
+        return
 
+    def ask(_):
         # Создаем клавиатуру
         markup = types.InlineKeyboardMarkup()
         markup.row(
@@ -702,19 +637,18 @@ def handle_text(message):
             )
         )
 
-        # Отправляем вопрос
+        # Отправляем вопрос - после фото
         bot.send_message(
             message.chat.id,
             f"Предпросмотр вашей работы\n\nТекст:\n{submission.caption}\n\n\nОтправить работу во время проведения конкурса за Вас?",
             reply_markup=markup,
         )
-    except Exception as e:
-        handle_submission_error(user_id, e)
+
+    dispatcher.then(previewed, ask, on_error=partial(handle_submission_error, user_id))
 
 
 # Обработчик ответов
 @bot.callback_query_handler(func=lambda call: call.data.startswith("send_by_bot_"))
-@lock_input()
 def handle_send_method(call):
     user_id = call.from_user.id
     if not user_submissions.exists(user_id):
@@ -728,69 +662,101 @@ def handle_send_method(call):
         submission.update_activity()
         user_submissions.update_last_activity(user_id)
 
-        user = bot.get_chat(user_id)
+        # Имя и username есть в самом апдейте - getChat не нужен. Недоступный
+        # чат конкурса обнаружится при пересылке, и работа будет удалена
+        user = call.from_user
         full_name = (
             f"{user.first_name} {user.last_name}" if user.last_name else user.first_name
         )
         username = user.username if user.username else "отсутствует"
-        # Сохраняем работу в БД со статусом "pending"
-        submission_id = SubmissionManager.create_submission(
-            user_id=user_id,
-            username=username,
-            full_name=full_name,
-            photos=submission.photos,
-            caption=submission.caption,
-        )
-        # Обновляем статус в БД
-        SubmissionManager.update_submission(submission_id, status="pending")
 
         send_by_bot = call.data == "send_by_bot_yes"
 
         # Логирование перед отправкой
         logger.info(f"Отправка работы для {user_id}: {len(submission.photos)} фото")
 
-        # Проверяем доступность чата
-        try:
-            chat_info = bot.get_chat(CONTEST_CHAT_ID)
-        except Exception as e:
-            raise Exception(f"Чат {CONTEST_CHAT_ID} недоступен: {str(e)}")
-
-        user_info = get_user_info(bot.get_chat(user_id))
+        user_info = get_user_info(user)
         # Формируем медиагруппу
         media = [types.InputMediaPhoto(pid["file_id"]) for pid in submission.photos]
 
-        # Отправляем в чат конкурса
-        try:
-            sent_messages = bot.send_media_group(chat_id=CONTEST_CHAT_ID, media=media)
-            logger.info(
-                f"Медиа работы отправлены в чат {CONTEST_CHAT_ID}: {sent_messages}"
-            )
-            sent_messages = bot.send_message(
+        # Сохраняем работу в БД со статусом "pending" - запись выполняется
+        # в потоке-писателе, поток обработчика её не ждёт
+        saving = db_executor.write(
+            SubmissionManager.create_submission,
+            user_id=user_id,
+            username=username,
+            full_name=full_name,
+            photos=submission.photos,
+            caption=submission.caption,
+        )
+    except Exception as e:
+        send_failed(call, e)
+        return
+
+    def saved(submission_id):
+        # В чат конкурса уходит только сохранённая работа. Пересылка идёт
+        # в фоне и уступает ответам пользователям; пользователю отвечаем,
+        # когда работа дошла до админов
+        relay = relays.put(
+            api_call("send_media_group", chat_id=CONTEST_CHAT_ID, media=media),
+            api_call(
+                "send_message",
                 chat_id=CONTEST_CHAT_ID,
                 text=f"{submission.caption}\n\nОтправка ботом: {'✅ Да' if send_by_bot else '❌ Нет'}{user_info}",
+            ),
+        )
+
+        def relayed(_):
+            logger.info(f"Работа {submission_id} отправлена в чат {CONTEST_CHAT_ID}")
+            # Уведомление пользователю
+            bot.send_message(
+                chat_id=user_id,
+                text="✅ Работа отправлена админам! После проверки я пришлю номер!",
+                reply_markup=Menu.contests_menu(),
             )
-            logger.info(
-                f"Текст работы отправлен в чат {CONTEST_CHAT_ID}: {sent_messages}"
+            bot.delete_state(user_id)
+
+        def relay_failed(error):
+            if isinstance(error, RelayError) and error.sent:
+                # Фото уже в чате конкурса - работа остаётся на модерации
+                logger.error(f"Работа {submission_id} переслана не полностью: {error}")
+                relayed(None)
+                return
+            logger.error(f"Ошибка отправки в чат: {str(error)}")
+            # Админы работу не увидят - не оставляем её висеть на модерации
+            dispatcher.then(
+                db_executor.write(SubmissionManager.delete_submission, submission_id),
+                unsent,
+                on_error=partial(send_failed, call),
             )
-        except Exception as e:
-            logger.error(f"Ошибка отправки в чат: {str(e)}")
-            raise
 
-        # Уведомление пользователю
-        bot.send_message(
-            chat_id=user_id,
-            text="✅ Работа отправлена админам! После проверки я пришлю номер!",
-            reply_markup=Menu.contests_menu(),
-        )
-        bot.delete_state(user_id)
+        def unsent(deleted):
+            if not deleted:
+                # Админ уже взял работу на проверку - она не потеряна
+                relayed(None)
+                return
+            # Сессия больше не нужна: иначе повторная отправка упрётся
+            # в "уже отправляли", а позже придёт сообщение о таймауте
+            if user_submissions.exists(user_id):
+                user_submissions.remove(user_id)
+            bot.delete_state(user_id)
+            bot.send_message(
+                user_id,
+                "⚠️ Ошибка при отправке работы админам, попробуйте отправить ещё раз",
+                reply_markup=Menu.contests_menu(),
+            )
 
-    except Exception as e:
-        handle_submission_error(user_id, e)
-        bot.answer_callback_query(call.id, "⚠️ Ошибка при отправке работы админам")
+        dispatcher.then(relay, relayed, on_error=relay_failed)
+
+    dispatcher.then(saving, saved, on_error=partial(send_failed, call))
+
+
+def send_failed(call, error):
+    handle_submission_error(call.from_user.id, error)
+    bot.answer_callback_query(call.id, "⚠️ Ошибка при отправке работы админам")
 
 
 @bot.callback_query_handler(func=lambda call: call.data == "cancel_submission")
-@lock_input()
 def handle_cancel_submission(call):
     user_id = call.from_user.id
     try:
@@ -802,8 +768,8 @@ def handle_cancel_submission(call):
             # Удаляем сообщения с предпросмотром
             for _ in range(2):  # Удаляем предпросмотр и кнопки
                 try:
-                    bot.delete_message(
-                        call.message.chat.id, call.message.message_id - _
+                    call_soon(
+                        "delete_message", call.message.chat.id, call.message.message_id - _
                     )
                 except:
                     pass
@@ -827,28 +793,19 @@ def handle_submission_error(user_id, error):
 
 
 # Таймаут
-def check_timeout():
-    while True:
-        try:
-            current_time = time.time()
-            for user_id in user_submissions.get_all_users():
-                submission = user_submissions.get(user_id)
-                if current_time - submission.submission_time > 600:
-                    user_submissions.remove(user_id)
-                    try:
-                        bot.send_message(
-                            user_id,
-                            "⌛ Время на отправку истекло, начните заново",
-                            reply_markup=Menu.contests_menu(),
-                        )
-                    except Exception as e:
-                        logger.error(f"Ошибка отправки уведомления: {str(e)}")
-            time.sleep(60)
-        except Exception as e:
-            logger.error(f"Ошибка таймера: {str(e)}", exc_info=True)
+def notify_submission_timeout(user_id, submission):
+    # Вызывается в потоке планировщика - сама отправка идёт через очередь
+    notifications.put(
+        user_id,
+        "⌛ Время на отправку истекло, начните заново",
+        reply_markup=Menu.contests_menu(),
+    )
 
 
-threading.Thread(target=check_timeout, daemon=True).start()
+# Работу нужно отправить за 10 минут с начала, а не с последнего действия
+sessions.register(
+    Flow.CONTEST, ttl=600, sliding=False, on_expire=notify_submission_timeout
+)
 
 
 @bot.callback_query_handler(
@@ -879,56 +836,72 @@ def handle_new_judge(call):
     user_id = call.from_user.id
 
     try:
+        roles = UserRoles.get(user_id)
         # Проверяем существующую запись
-        if SubmissionManager.is_judge(user_id):
+        if Role.JUDGE in roles:
             bot.answer_callback_query(
                 call.id, "❌ Вы уже подавали заявку на судейство", show_alert=True
             )
             return
         # Провекряем на участие
-        if is_user_approved(user_id):
+        if Role.APPROVED in roles:
             bot.answer_callback_query(
                 call.id, "❌ Вы уже записаны в качестве участника", show_alert=True
             )
             return
         # Добавляем в БД
-        user = bot.get_chat(user_id)
+        user = call.from_user
         full_name = (
             f"{user.first_name} {user.last_name}" if user.last_name else user.first_name
         )
         username = user.username if user.username else "отсутствует"
-        if SubmissionManager.add_judge(
-            user_id=user_id, username=username, full_name=full_name
-        ):
-            user_info = get_user_info(bot.get_chat(user_id))
-            markup = types.InlineKeyboardMarkup()
-            markup.add(
-                types.InlineKeyboardButton(
-                    "💬 Ответить", callback_data=f"reply_to_{user_id}"
-                )
-            )
-            full_text = f"Новая заявка на судейство!\n{user_info}"
-            bot.send_message(CONTEST_CHAT_ID, full_text, reply_markup=markup)
+        adding = db_executor.write(
+            SubmissionManager.add_judge,
+            user_id=user_id,
+            username=username,
+            full_name=full_name,
+        )
+    except Exception as e:
+        judge_request_failed(call, e)
+        return
 
-            bot.send_message(
-                user_id,
-                "✅ Заявка успешно отправлена!",
-                reply_markup=Menu.back_only_main_menu(),
-            )
-        else:
+    def added(success):
+        if not success:
             bot.answer_callback_query(
                 call.id,
                 "❌ Не удалось отправить заявку, свяжитесь с админами",
                 show_alert=True,
             )
-    except Exception as e:
-        logger.error(f"handle_new_judge error: {e}")
-        bot.answer_callback_query(
-            call.id,
-            "⚠️ Произошла ошибка при отправке, свяжитесь с админами",
-            show_alert=True,
+            return
+        user_info = get_user_info(call.from_user)
+        markup = types.InlineKeyboardMarkup()
+        markup.add(
+            types.InlineKeyboardButton(
+                "💬 Ответить", callback_data=f"reply_to_{user_id}"
+            )
+        )
+        full_text = f"Новая заявка на судейство!\n{user_info}"
+        relay = relays.put(
+            api_call("send_message", CONTEST_CHAT_ID, full_text, reply_markup=markup)
+        )
+        reply_after_relay(
+            relay,
+            user_id,
+            "✅ Заявка успешно отправлена!",
+            "❌ Не удалось отправить заявку, свяжитесь с админами",
         )
 
+    dispatcher.then(adding, added, on_error=partial(judge_request_failed, call))
+
+
+def judge_request_failed(call, error):
+    logger.error(f"handle_new_judge error: {error}")
+    bot.answer_callback_query(
+        call.id,
+        "⚠️ Произошла ошибка при отправке, свяжитесь с админами",
+        show_alert=True,
+    )
+
 
 # РЕПКА
 
@@ -982,22 +955,19 @@ def handle_cancel(message):
         "🚫 Отправка отменена",
         reply_markup=Menu.back_only_main_menu(),
     )
-    if user_id in temp_storage:
-        del temp_storage[user_id]
+    temp_storage.pop(user_id, None)
 
 
 # СООБЩЕНИЕ АДМИНАМ
 
 
 @bot.callback_query_handler(func=lambda call: call.data == ButtonCallback.USER_TO_ADMIN)
-@lock_input()
 @private_chat_only(bot)
 def handle_user_to_admin(call):
     if is_user_blocked(call):
         return
     user_id = call.from_user.id
-    if user_id in temp_storage:
-        del temp_storage[user_id]
+    temp_storage.pop(user_id, None)
     user_content_storage.init_content(user_id)
 
     bot.set_state(
@@ -1020,11 +990,10 @@ def handle_user_to_admin(call):
         and not message.text.startswith("/")
     ),
 )
-@lock_input()
 def handle_user_text(message):
     user_id = message.from_user.id
     content_data = user_content_storage.get_data(user_id, "content")
-    content_data["text"] = message.text
+    content_data.text = message.text
     bot.set_state(user_id, UserState.WAITING_ADMIN_CONTENT_PHOTO)
     markup = types.InlineKeyboardMarkup()
     markup.row(
@@ -1050,7 +1019,6 @@ def handle_user_text(message):
         ("confirm_admphoto", "skip_admphoto", "cancel_admphoto")
     ),
 )
-@lock_input()
 def handle_confirmation(call):
     try:
         # Проверка и парсинг данных
@@ -1069,7 +1037,7 @@ def handle_confirmation(call):
 
         # Удаление сообщения с кнопками
         try:
-            bot.delete_message(call.message.chat.id, call.message.message_id)
+            call_soon("delete_message", call.message.chat.id, call.message.message_id)
         except Exception as e:
             logger.warning(f"Ошибка удаления сообщения: {str(e)}")
 
@@ -1091,7 +1059,7 @@ def handle_confirmation(call):
 
         elif action == "skip_admphoto":
             # Проверка обязательных полей
-            if "text" not in content_data or not content_data["text"].strip():
+            if not content_data.text or not content_data.text.strip():
                 bot.send_message(user_id, "❌ Текст сообщения обязателен")
                 return
 
@@ -1121,27 +1089,29 @@ def handle_confirmation(call):
     func=lambda message: bot.get_state(message.from_user.id)
     in [UserState.WAITING_ADMIN_CONTENT_PHOTO],
 )
-@lock_input(allow_media_groups=True)
 def handle_adm_photo(message):
     user_id = message.from_user.id
     content_data = user_content_storage.get_data(user_id, "content")
     try:
         if message.photo:
-            # Берем самое высокое разрешение (последний элемент в списке)
-            photo_id = message.photo[-1].file_id
+            # Берем самое высокое разрешение (последний элемент в списке),
+            # у альбома - из всех частей
+            photo_ids = [part.photo[-1].file_id for part in album_of(message) if part.photo]
 
-            if len(content_data["photos"]) > 10:
+            free = 10 - len(content_data.photos)
+            if free <= 0:
                 bot.send_message(message.chat.id, "Максимум 10 скриншотов")
                 return
 
-            content_data["photos"].append(photo_id)
-            new_count = len(content_data["photos"])
+            content_data.photos.extend(photo_ids[:free])
+            new_count = len(content_data.photos)
             # Удаляем предыдущее сообщение-счетчик если есть
-            if content_data.get("counter_msg_id"):
+            if content_data.counter_msg_id:
                 try:
-                    bot.delete_message(
+                    call_soon(
+                        "delete_message",
                         chat_id=message.chat.id,
-                        message_id=content_data["counter_msg_id"],
+                        message_id=content_data.counter_msg_id,
                     )
                 except Exception as delete_error:
                     logger.debug(f"Не удалось удалить сообщение: {delete_error}")
@@ -1154,13 +1124,13 @@ def handle_adm_photo(message):
             )
 
             # Обновляем ID последнего сообщения в хранилище
-            content_data["counter_msg_id"] = msg.message_id
+            content_data.counter_msg_id = msg.message_id
             user_content_storage.update_data(user_id, content_data)
 
             if new_count == 10:
                 preview_to_admin_chat(user_id, content_data)
                 # Удаляем сообщение-счетчик
-                bot.delete_message(message.chat.id, content_data["counter_msg_id"])
+                call_soon("delete_message", message.chat.id, content_data.counter_msg_id)
 
         else:
             bot.send_message(message.chat.id, "Пожалуйста, отправляйте только фото")
@@ -1175,14 +1145,13 @@ def handle_adm_photo(message):
     func=lambda message: bot.get_state(message.from_user.id)
     in [UserState.WAITING_ADMIN_CONTENT_PHOTO],
 )
-@lock_input()
 def handle_done(message):
     user_id = message.from_user.id
     content_data = user_content_storage.get_data(user_id, "content")
     # Удаляем последнее сообщение-счетчик
-    if content_data.get("counter_msg_id"):
+    if content_data.counter_msg_id:
         try:
-            bot.delete_message(message.chat.id, content_data["counter_msg_id"])
+            call_soon("delete_message", message.chat.id, content_data.counter_msg_id)
         except Exception as e:
             logger.debug(f"Ошибка удаления сообщения: {e}")
 
@@ -1196,40 +1165,42 @@ def preview_to_admin_chat(user_id, content_data):
     # Сохраняем данные во временное хранилище
     temp_storage[user_id] = content_data
 
-    # Показываем предпросмотр
-    if content_data["photos"]:
-        media = [types.InputMediaPhoto(pid) for pid in content_data["photos"]]
-        bot.send_media_group(user_id, media)
+    def ask(_=None):
+        # Создаем клавиатуру
+        markup = types.InlineKeyboardMarkup()
+        markup.row(
+            types.InlineKeyboardButton(
+                "✅ Отправить", callback_data=f"confirm_send:{user_id}"
+            ),
+            types.InlineKeyboardButton(
+                "🚫 Отменить", callback_data=f"cancel_send:{user_id}"
+            ),
+        )
+        bot.send_message(
+            user_id,
+            f"Предпросмотр:\n{content_data.text}\n\nОтправить сообщение админам?",
+            reply_markup=markup,
+        )
 
-    # Создаем клавиатуру
-    markup = types.InlineKeyboardMarkup()
-    markup.row(
-        types.InlineKeyboardButton(
-            "✅ Отправить", callback_data=f"confirm_send:{user_id}"
-        ),
-        types.InlineKeyboardButton(
-            "🚫 Отменить", callback_data=f"cancel_send:{user_id}"
-        ),
-    )
-    bot.send_message(
-        user_id,
-        f"Предпросмотр:\n{content_data['text']}\n\nОтправить сообщение админам?",
-        reply_markup=markup,
-    )
+    # Показываем предпросмотр: кнопки - после фото
+    if content_data.photos:
+        media = [types.InputMediaPhoto(pid) for pid in content_data.photos]
+        dispatcher.then(call_soon("send_media_group", user_id, media), ask)
+    else:
+        ask()
 
 
 # Обработчик кнопок подтверждения
 @bot.callback_query_handler(
     func=lambda call: call.data.startswith(("confirm_send", "cancel_send")),
 )
-@lock_input()
 def handle_confirmation(call):
     try:
         action, user_id = call.data.split(":")
         user_id = int(user_id)
 
         # Удаляем сообщение с кнопками
-        bot.delete_message(call.message.chat.id, call.message.message_id)
+        call_soon("delete_message", call.message.chat.id, call.message.message_id)
 
         if action == "confirm_send":
             # Получаем данные из хранилища
@@ -1237,7 +1208,7 @@ def handle_confirmation(call):
 
             if content_data:
                 # Вызываем функцию отправки
-                send_to_admin_chat(user_id, content_data)
+                send_to_admin_chat(call.from_user, content_data)
                 bot.answer_callback_query(call.id, "✅ Отправлено администраторам")
             else:
                 bot.answer_callback_query(call.id, "❌ Данные устарели")
@@ -1250,18 +1221,32 @@ def handle_confirmation(call):
 
     finally:
         # Очищаем хранилище
-        if user_id in temp_storage:
-            del temp_storage[user_id]
+        temp_storage.pop(user_id, None)
+
+
+def reply_after_relay(relay, user_id, sent_text, failed_text):
+    """Пользователю отвечаем, когда пересылка выполнена: sent_text, а если
+    она не удалась - failed_text. Его следующие апдейты ждут этого ответа"""
+
+    def reply(text):
+        bot.send_message(user_id, text, reply_markup=Menu.back_only_main_menu())
+
+    dispatcher.then(
+        relay,
+        lambda _: reply(sent_text),
+        on_error=lambda _: reply(failed_text),
+    )
 
 
-def send_to_admin_chat(user_id, content_data):
+def send_to_admin_chat(user, content_data):
+    user_id = user.id
     try:
         logger.debug("send_to_admin_chat: ", content_data)
         target_chat = ADMIN_CHAT_ID
-        text = content_data["text"]
-        photos = content_data["photos"]
+        text = content_data.text
+        photos = content_data.photos
 
-        user_info = get_user_info(bot.get_chat(user_id))
+        user_info = get_user_info(user)
 
         markup = types.InlineKeyboardMarkup()
         markup.add(
@@ -1273,32 +1258,45 @@ def send_to_admin_chat(user_id, content_data):
             ),
         )
 
+        relay = None
         if photos:
             media = [
                 types.InputMediaPhoto(
-                    media=photo_id, caption=content_data["text"] if i == 0 else ""
+                    media=photo_id, caption=content_data.text if i == 0 else ""
                 )
-                for i, photo_id in enumerate(content_data["photos"])
+                for i, photo_id in enumerate(content_data.photos)
             ]
 
             # Отправляем медиагруппу БЕЗ reply_markup
-            bot.send_media_group(target_chat, media)
-
-            bot.send_message(
-                target_chat,
-                text=f"{user_info}\nХотите ответить?",
-                reply_markup=markup,
+            relay = relays.put(
+                api_call("send_media_group", target_chat, media),
+                api_call(
+                    "send_message",
+                    target_chat,
+                    text=f"{user_info}\nХотите ответить?",
+                    reply_markup=markup,
+                ),
             )
 
         elif text:
             full_text = f"{text}{user_info}"
-            bot.send_message(target_chat, full_text, reply_markup=markup)
+            relay = relays.put(
+                api_call("send_message", target_chat, full_text, reply_markup=markup)
+            )
 
-        bot.send_message(
-            user_id,
-            "✅ Контент успешно отправлен",
-            reply_markup=Menu.back_only_main_menu(),
-        )
+        if relay is not None:
+            reply_after_relay(
+                relay,
+                user_id,
+                "✅ Контент успешно отправлен",
+                "❌ Ошибка при отправке контента",
+            )
+        else:
+            bot.send_message(
+                user_id,
+                "✅ Контент успешно отправлен",
+                reply_markup=Menu.back_only_main_menu(),
+            )
 
     except Exception as e:
         logger.error(f"Forward error: {e}")
@@ -1309,45 +1307,45 @@ def send_to_admin_chat(user_id, content_data):
         )
     finally:
         # Очищаем хранилище
-        if user_id in temp_storage:
-            del temp_storage[user_id]
+        temp_storage.pop(user_id, None)
 
 
 # ОТПРАВКА НОВОСТЕЙ
 
 
 @bot.callback_query_handler(func=lambda call: call.data == ButtonCallback.USER_TO_NEWS)
-@lock_input()
 @private_chat_only(bot)
 def handle_user_to_news(call):
     if is_user_blocked(call):
         return
-    # Проверяем, состоит ли пользователь в чате
-    if not is_user_in_chat(call.from_user.id):
-        bot.send_message(
-            call.message.chat.id,
-            "❌ Для отправки новостей необходимо состоять в нашем чате\n"
-            + Links.get_chat_url(),
-            reply_markup=Menu.back_only_main_menu(),
+
+    def member_checked(in_chat):
+        # Проверяем, состоит ли пользователь в чате
+        if not in_chat:
+            bot.send_message(
+                call.message.chat.id,
+                "❌ Для отправки новостей необходимо состоять в нашем чате\n"
+                + Links.get_chat_url(),
+                reply_markup=Menu.back_only_main_menu(),
+            )
+            return
+
+        bot.edit_message_text(
+            text="Что Вы хотите прислать в новостную колонку?",
+            chat_id=call.message.chat.id,
+            message_id=call.message.message_id,
+            reply_markup=Menu.news_menu(),
         )
-        return
 
-    bot.edit_message_text(
-        text="Что Вы хотите прислать в новостную колонку?",
-        chat_id=call.message.chat.id,
-        message_id=call.message.message_id,
-        reply_markup=Menu.news_menu(),
-    )
+    dispatcher.then(chat_membership(call.from_user.id), member_checked)
 
 
 @bot.callback_query_handler(
     func=lambda call: call.data == ButtonCallback.USER_NEWS_NEWS
 )
-@lock_input()
 def handle_user_news_news(call):
     user_id = call.from_user.id
-    if user_id in temp_storage:
-        del temp_storage[user_id]
+    temp_storage.pop(user_id, None)
     user_content_storage.init_news(user_id)
     bot.set_state(user_id, UserState.WAITING_NEWS_SCREENSHOTS)
     # Сначала редактируем сообщение БЕЗ ForceReply
@@ -1361,11 +1359,9 @@ def handle_user_news_news(call):
 @bot.callback_query_handler(
     func=lambda call: call.data == ButtonCallback.USER_NEWS_CODE_DREAM
 )
-@lock_input()
 def handle_news_code(call):
     user_id = call.from_user.id
-    if user_id in temp_storage:
-        del temp_storage[user_id]
+    temp_storage.pop(user_id, None)
     user_content_storage.init_code(user_id)
     bot.set_state(user_id, UserState.WAITING_CODE_VALUE)
     bot.edit_message_text(
@@ -1381,11 +1377,9 @@ def handle_news_code(call):
 @bot.callback_query_handler(
     func=lambda call: call.data == ButtonCallback.USER_NEWS_CODE_DLC
 )
-@lock_input()
 def handle_news_code(call):
     user_id = call.from_user.id
-    if user_id in temp_storage:
-        del temp_storage[user_id]
+    temp_storage.pop(user_id, None)
     user_content_storage.init_code(user_id)
     bot.set_state(user_id, UserState.WAITING_CODE_VALUE)
     bot.edit_message_text(
@@ -1401,11 +1395,9 @@ def handle_news_code(call):
 @bot.callback_query_handler(
     func=lambda call: call.data == ButtonCallback.USER_NEWS_POCKET,
 )
-@lock_input()
 def handle_news_pocket(call):
     user_id = call.from_user.id
-    if user_id in temp_storage:
-        del temp_storage[user_id]
+    temp_storage.pop(user_id, None)
     user_content_storage.init_pocket(user_id)
     bot.set_state(user_id, UserState.WAITING_POCKET_SCREEN)
     bot.edit_message_text(
@@ -1421,11 +1413,9 @@ def handle_news_pocket(call):
 @bot.callback_query_handler(
     func=lambda call: call.data == ButtonCallback.USER_NEWS_DESIGN,
 )
-@lock_input()
 def handle_news_design(call):
     user_id = call.from_user.id
-    if user_id in temp_storage:
-        del temp_storage[user_id]
+    temp_storage.pop(user_id, None)
     user_content_storage.init_design(user_id)
     bot.set_state(user_id, UserState.WAITING_DESIGN_CODE)
     bot.edit_message_text(
@@ -1449,59 +1439,53 @@ def parse_speaker_info(text):
     content_types=["photo"],
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_NEWS_SCREENSHOTS,
 )
-@lock_input(allow_media_groups=True)
 def handle_news_screenshots(message):
     user_id = message.from_user.id
     data = user_content_storage.get_data(user_id, "news")
 
-    try:
-        # Удаляем предыдущее сообщение с прогрессом
-        if data.get("progress_message_id"):
-            bot.delete_message(message.chat.id, data["progress_message_id"])
-    except Exception as e:
-        logger.warning(f"Не удалось удалить сообщение: {e}")
-
-    # 1. Определяем оригинальное изображение (последний элемент всегда наибольший)
-    original_photo = message.photo[-1]
+    # 1. Сохраняем только оригиналы (альбом приходит целиком)
+    added, duplicates, overflow = collect_photos(message, data.photos, 10)
 
-    # 2. Группируем все превью этого изображения по уникальному ID оригинала
-    unique_id = original_photo.file_unique_id
+    # 2. Проверяем лимит
+    if overflow:
+        bot.reply_to(message, "❌ Достигнут максимум 10 скриншотов")
+        request_description(user_id)
+        return
 
     # 3. Проверяем дубликаты
-    existing_ids = {p["unique_id"] for p in data.get("photos", [])}
-    if unique_id in existing_ids:
+    if not added:
         bot.reply_to(message, "❌ Это изображение уже было добавлено")
         return
 
-    # 4. Проверяем лимит
-    if len(data.get("photos", [])) > 10:
-        bot.reply_to(message, "❌ Достигнут максимум 10 скриншотов")
+    if len(data.photos) == 10:
         request_description(user_id)
+    else:
+        # 4. Отправляем подтверждение - одно на альбом
+        send_news_progress(message)
 
-    # 5. Сохраняем только оригинал
-    data.setdefault("photos", []).append(
-        {"file_id": original_photo.file_id, "unique_id": unique_id}
-    )
 
-    # 6. Обновляем хранилище
-    user_content_storage.update_data(user_id, data)
+def send_news_progress(message):
+    user_id = message.from_user.id
+    data = user_content_storage.get_data(user_id, "news")
 
-    if len(data["photos"]) == 10:
-        request_description(user_id)
-    else:
-        # Добавим графический индикатор
-        progress_bar = "🟪" * len(data["photos"]) + "⬜" * (10 - len(data["photos"]))
-
-        # 7. Отправляем подтверждение
-        sent_msg = bot.reply_to(
-            message,
-            f"{progress_bar}\n"
-            f"✅ Скриншот добавлен, всего: {len(data['photos'])}/10\n"
-            "Отправьте еще или нажмите /done\n\n🚫 Для отмены используйте /cancel",
-        )
-        # Сохраняем ID сообщения для последующего удаления
-        data["progress_message_id"] = sent_msg.message_id
-        user_content_storage.update_data(user_id, data)
+    try:
+        # Удаляем предыдущее сообщение с прогрессом
+        if data.progress_message_id:
+            call_soon("delete_message", message.chat.id, data.progress_message_id)
+    except Exception as e:
+        logger.warning(f"Не удалось удалить сообщение: {e}")
+
+    # Добавим графический индикатор
+    progress_bar = "🟪" * len(data.photos) + "⬜" * (10 - len(data.photos))
+
+    sent_msg = bot.reply_to(
+        message,
+        f"{progress_bar}\n"
+        f"✅ Скриншот добавлен, всего: {len(data.photos)}/10\n"
+        "Отправьте еще или нажмите /done\n\n🚫 Для отмены используйте /cancel",
+    )
+    # Сохраняем ID сообщения для последующего удаления
+    data.progress_message_id = sent_msg.message_id
 
 
 def request_description(user_id):
@@ -1516,19 +1500,18 @@ def request_description(user_id):
     commands=["done"],
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_NEWS_SCREENSHOTS,
 )
-@lock_input()
 def handle_done_news_photos(message):
     user_id = message.from_user.id
     data = user_content_storage.get_data(user_id, "news")
 
     # Удаляем сообщение прогресса
-    if data.get("progress_msg_id"):
+    if data.progress_message_id:
         try:
-            bot.delete_message(message.chat.id, data["progress_msg_id"])
+            call_soon("delete_message", message.chat.id, data.progress_message_id)
         except Exception as e:
             logger.warning(f"Не удалось удалить сообщение: {e}")
 
-    if len(data.get("photos", [])) == 0:
+    if len(data.photos) == 0:
         bot.reply_to(message, "❌ Вы не отправили ни одного фото")
         return
 
@@ -1539,7 +1522,6 @@ def handle_done_news_photos(message):
     commands=["skip"],
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_NEWS_DESCRIPTION,
 )
-@lock_input()
 def skip_news_description(message):
     user_id = message.from_user.id
     bot.set_state(user_id, UserState.WAITING_NEWS_SPEAKER)
@@ -1552,11 +1534,10 @@ def skip_news_description(message):
     content_types=["text"],
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_NEWS_DESCRIPTION,
 )
-@lock_input()
 def handle_news_description(message):
     user_id = message.from_user.id
     data = user_content_storage.get_data(user_id, "news")
-    data["description"] = message.text
+    data.description = message.text
     bot.set_state(user_id, UserState.WAITING_NEWS_SPEAKER)
     bot.send_message(
         message.chat.id, "👤 Введите имя спикера:\n🚫 Для отмены используйте /cancel"
@@ -1567,11 +1548,10 @@ def handle_news_description(message):
     content_types=["text"],
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_NEWS_SPEAKER,
 )
-@lock_input()
 def handle_news_speaker(message):
     user_id = message.from_user.id
     data = user_content_storage.get_data(user_id, "news")
-    data["speaker"] = message.text
+    data.speaker = message.text
     bot.set_state(user_id, UserState.WAITING_NEWS_ISLAND)
     bot.send_message(
         message.chat.id,
@@ -1583,11 +1563,10 @@ def handle_news_speaker(message):
     content_types=["text"],
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_NEWS_ISLAND,
 )
-@lock_input()
 def handle_news_island(message):
     user_id = message.from_user.id
     data = user_content_storage.get_data(user_id, "news")
-    data["island"] = message.text
+    data.island = message.text
     preview_send_to_news_chat(user_id)
 
 
@@ -1596,7 +1575,6 @@ def handle_news_island(message):
     content_types=["text"],
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_CODE_VALUE,
 )
-@lock_input()
 def handle_code_value(message):
     user_id = message.from_user.id
     code = message.text.upper()
@@ -1605,7 +1583,7 @@ def handle_code_value(message):
         bot.reply_to(message, "❌ Неверный формат кода\nПример: DA-1234-5678-9012")
         return
 
-    user_content_storage.get_data(user_id, "code")["code"] = code
+    user_content_storage.get_data(user_id, "code").code = code
     bot.set_state(user_id, UserState.WAITING_CODE_SCREENSHOTS)
     bot.send_message(
         message.chat.id,
@@ -1617,59 +1595,53 @@ def handle_code_value(message):
     content_types=["photo"],
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_CODE_SCREENSHOTS,
 )
-@lock_input(allow_media_groups=True)
 def handle_code_screenshots(message):
     user_id = message.from_user.id
     data = user_content_storage.get_data(user_id, "code")
 
-    try:
-        # Удаляем предыдущее сообщение с прогрессом
-        if data.get("progress_message_id"):
-            bot.delete_message(message.chat.id, data["progress_message_id"])
-    except Exception as e:
-        logger.warning(f"Не удалось удалить сообщение: {e}")
-
-    # 1. Определяем оригинальное изображение (последний элемент всегда наибольший)
-    original_photo = message.photo[-1]
+    # 1. Сохраняем только оригиналы (альбом приходит целиком)
+    added, duplicates, overflow = collect_photos(message, data.photos, 10)
 
-    # 2. Группируем все превью этого изображения по уникальному ID оригинала
-    unique_id = original_photo.file_unique_id
+    # 2. Проверяем лимит
+    if overflow:
+        bot.reply_to(message, "❌ Достигнут максимум 10 скриншотов")
+        request_speaker(user_id)
+        return
 
     # 3. Проверяем дубликаты
-    existing_ids = {p["unique_id"] for p in data.get("photos", [])}
-    if unique_id in existing_ids:
+    if not added:
         bot.reply_to(message, "❌ Это изображение уже было добавлено")
         return
 
-    # 4. Проверяем лимит
-    if len(data.get("photos", [])) > 10:
-        bot.reply_to(message, "❌ Достигнут максимум 10 скриншотов")
+    if len(data.photos) == 10:
         request_speaker(user_id)
+    else:
+        # 4. Отправляем подтверждение - одно на альбом
+        send_code_progress(message)
 
-    # 5. Сохраняем только оригинал
-    data.setdefault("photos", []).append(
-        {"file_id": original_photo.file_id, "unique_id": unique_id}
-    )
 
-    # 6. Обновляем хранилище
-    user_content_storage.update_data(user_id, data)
+def send_code_progress(message):
+    user_id = message.from_user.id
+    data = user_content_storage.get_data(user_id, "code")
 
-    if len(data["photos"]) == 10:
-        request_speaker(user_id)
-    else:
-        # Добавим графический индикатор
-        progress_bar = "🟪" * len(data["photos"]) + "⬜" * (10 - len(data["photos"]))
-
-        # 7. Отправляем подтверждение
-        sent_msg = bot.reply_to(
-            message,
-            f"{progress_bar}\n"
-            f"✅ Скриншот добавлен, всего: {len(data['photos'])}/10\n"
-            "Отправьте еще или нажмите /done\n\n🚫 Для отмены используйте /cancel",
-        )
-        # Сохраняем ID сообщения для последующего удаления
-        data["progress_message_id"] = sent_msg.message_id
-        user_content_storage.update_data(user_id, data)
+    try:
+        # Удаляем предыдущее сообщение с прогрессом
+        if data.progress_message_id:
+            call_soon("delete_message", message.chat.id, data.progress_message_id)
+    except Exception as e:
+        logger.warning(f"Не удалось удалить сообщение: {e}")
+
+    # Добавим графический индикатор
+    progress_bar = "🟪" * len(data.photos) + "⬜" * (10 - len(data.photos))
+
+    sent_msg = bot.reply_to(
+        message,
+        f"{progress_bar}\n"
+        f"✅ Скриншот добавлен, всего: {len(data.photos)}/10\n"
+        "Отправьте еще или нажмите /done\n\n🚫 Для отмены используйте /cancel",
+    )
+    # Сохраняем ID сообщения для последующего удаления
+    data.progress_message_id = sent_msg.message_id
 
 
 def request_speaker(user_id):
@@ -1683,19 +1655,18 @@ def request_speaker(user_id):
     commands=["done"],
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_CODE_SCREENSHOTS,
 )
-@lock_input()
 def handle_done_news_photos(message):
     user_id = message.from_user.id
     data = user_content_storage.get_data(user_id, "code")
 
     # Удаляем сообщение прогресса
-    if data.get("progress_msg_id"):
+    if data.progress_message_id:
         try:
-            bot.delete_message(message.chat.id, data["progress_msg_id"])
+            call_soon("delete_message", message.chat.id, data.progress_message_id)
         except Exception as e:
             logger.warning(f"Не удалось удалить сообщение: {e}")
 
-    if len(data.get("photos", [])) == 0:
+    if len(data.photos) == 0:
         bot.reply_to(message, "❌ Вы не отправили ни одного фото")
         return
 
@@ -1706,11 +1677,10 @@ def handle_done_news_photos(message):
     content_types=["text"],
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_CODE_SPEAKER,
 )
-@lock_input()
 def handle_code_speaker(message):
     user_id = message.from_user.id
     data = user_content_storage.get_data(user_id, "code")
-    data["speaker"] = message.text
+    data.speaker = message.text
     bot.set_state(user_id, UserState.WAITING_CODE_ISLAND)
     bot.send_message(
         message.chat.id,
@@ -1722,18 +1692,14 @@ def handle_code_speaker(message):
     content_types=["text"],
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_CODE_ISLAND,
 )
-@lock_input()
 def handle_code_island(message):
     user_id = message.from_user.id
     data = user_content_storage.get_data(user_id, "code")
-    data["island"] = message.text
+    data.island = message.text
     preview_send_to_news_chat(user_id)
 
 
-pocket_media_groups = {}
 pocket_user_locks = {}
-# Добавляем кэш для отслеживания отправленных ошибок
-error_media_groups = {}
 
 
 # Обработчики для USER_NEWS_POCKET
@@ -1741,7 +1707,6 @@ error_media_groups = {}
     content_types=["photo"],
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_POCKET_SCREEN,
 )
-@lock_input(allow_media_groups=True)
 def handle_pocket_screens(message):
     user_id = message.from_user.id
 
@@ -1761,107 +1726,70 @@ def handle_pocket_screens(message):
 
 
 def handle_media_group(message, data, user_id):
-    media_group_id = message.media_group_id
-    # Проверяем, была ли уже обработана эта группа
-    if media_group_id in error_media_groups:
-        return  # Пропускаем повторную обработку
-
     # Проверяем, есть ли уже сохраненные фото
-    existing_photos = user_content_storage.get_data(user_id, "pocket").get("photos", [])
-    if len(existing_photos) > 0:
-        # Помечаем группу как обработанную с ошибкой
-        error_media_groups[media_group_id] = True
+    if len(data.photos) > 0:
+        # Альбом отклоняется целиком
         bot.send_message(
             user_id,
             "❌ _Вы уже отправили 1 фото ранее, а сейчас отправляете ещё несколько_\nПришлите второе фото заново",
             parse_mode="MarkdownV2",
         )
-        # Устанавливаем таймер для очистки кэша (5 минут)
-        threading.Timer(
-            300, lambda: error_media_groups.pop(media_group_id, None)
-        ).start()
         return
 
-    largest_photo = max(message.photo, key=lambda p: p.file_size)
-    mg_id = message.media_group_id
-
-    # Если группа новая - сбрасываем предыдущие данные
-    if mg_id not in pocket_media_groups:
-        pocket_media_groups[mg_id] = {
-            "user_id": user_id,
-            "photos": [],
-            "timer": threading.Timer(3.0, process_pocket_group, [mg_id]),
-        }
-        pocket_media_groups[mg_id]["timer"].start()
-    else:
-        # Если в группе уже 2+ фото - отменяем обработку
-        if len(pocket_media_groups[mg_id]["photos"]) >= 2:
-            pocket_media_groups[mg_id]["timer"].cancel()
-            del pocket_media_groups[mg_id]
-            handle_pocket_error(user_id, "❌ Можно отправить только 2 фото")
-            return
-
-    # Добавляем уникальные фото
-    if not any(
-        p["unique_id"] == largest_photo.file_unique_id
-        for p in pocket_media_groups[mg_id]["photos"]
-    ):
-        pocket_media_groups[mg_id]["photos"].append(
-            {
-                "file_id": largest_photo.file_id,
-                "unique_id": largest_photo.file_unique_id,
-            }
-        )
-
-        # Если превысили лимит - сразу отменяем
-        if len(pocket_media_groups[mg_id]["photos"]) > 2:
-            handle_pocket_error(user_id, "❌ Можно отправить только 2 фото")
-            pocket_media_groups[mg_id]["timer"].cancel()
-            del pocket_media_groups[mg_id]
+    process_pocket_group(album_of(message))
 
 
 def handle_single_photo(message, data, user_id):
-    # Проверка инициализации
-    if "photos" not in data:
-        user_content_storage.init_pocket(user_id)
-        data = user_content_storage.get_data(user_id)
-
     largest_photo = max(message.photo, key=lambda p: p.file_size)
 
     # Добавление фото
-    data["photos"].append(
+    data.photos.append(
         {"file_id": largest_photo.file_id, "unique_id": largest_photo.file_unique_id}
     )
 
     # Лимит фото
-    if len(data["photos"]) > 2:
+    if len(data.photos) > 2:
         handle_pocket_error(user_id, "❌ Максимум 2 фото")
         return
 
     user_content_storage.update_data(user_id, data)
 
     # Логика переходов
-    if len(data["photos"]) == 1:
+    if len(data.photos) == 1:
         bot.send_message(user_id, "📸 Отправьте второе фото")
-    elif len(data["photos"]) == 2:
+    elif len(data.photos) == 2:
         finish_pocket_submission(user_id)
 
 
-def process_pocket_group(media_group_id):
-    group_data = pocket_media_groups.pop(media_group_id, None)
-    if not group_data:
-        return
+def process_pocket_group(messages):
+    user_id = messages[0].from_user.id
+
+    # Уникальные фото альбома (берём наибольший размер)
+    photos = []
+    for message in messages:
+        if not message.photo:
+            continue  # В альбоме может быть видео
+        largest_photo = max(message.photo, key=lambda p: p.file_size)
+        if not any(p["unique_id"] == largest_photo.file_unique_id for p in photos):
+            photos.append(
+                {
+                    "file_id": largest_photo.file_id,
+                    "unique_id": largest_photo.file_unique_id,
+                }
+            )
 
-    user_id = group_data["user_id"]
     try:
         # Проверяем окончательное количество
-        if len(group_data["photos"]) != 2:
+        if len(photos) > 2:
+            handle_pocket_error(user_id, "❌ Можно отправить только 2 фото")
+            return
+        if len(photos) != 2:
             handle_pocket_error(user_id, "❌ Нужно отправить 2 фото")
             return
 
         # Сохраняем и обрабатываем
         data = user_content_storage.get_data(user_id, "pocket")
-        data["photos"] = group_data["photos"]
+        data.photos = photos
         user_content_storage.update_data(user_id, data)
         finish_pocket_submission(user_id)
 
@@ -1873,11 +1801,6 @@ def handle_pocket_error(user_id, message="❌ Ошибка обработки"):
     user_content_storage.clear(user_id)
     bot.delete_state(user_id)
     bot.send_message(user_id, message, reply_markup=Menu.news_menu())
-    # Отменяем все таймеры для пользователя
-    for mg_id, group in list(pocket_media_groups.items()):
-        if group["user_id"] == user_id:
-            group["timer"].cancel()
-            del pocket_media_groups[mg_id]
 
 
 def finish_pocket_submission(user_id):
@@ -1894,7 +1817,6 @@ def finish_pocket_submission(user_id):
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_POCKET_SCREEN
     and m.content_type != "photo",
 )
-@lock_input()
 def handle_invalid_content(message):
     bot.send_message(
         message.chat.id,
@@ -1907,7 +1829,6 @@ def handle_invalid_content(message):
     content_types=["text"],
     func=lambda m: bot.get_state(m.from_user.id) == UserState.WAITING_DESIGN_CODE,
 )
-@lock_input()
 def handle_design_code(message):
     user_id = message.from_user.id
     code = message.text.upper()
@@ -1916,7 +1837,7 @@ def handle_design_code(message):
         bot.reply_to(message, "❌ Неверный формат\nПример: MA-1234-5678-9012")
         return
 
-    user_content_storage.get_data(user_id, "design")["code"] = code
+    user_content_storage.get_data(user_id, "design").code = code
     bot.set_state(user_id, UserState.WAITING_DESIGN_DESIGN_SCREEN)
     bot.send_message(
         message.chat.id,
@@ -1929,7 +1850,6 @@ def handle_design_code(message):
     func=lambda m: bot.get_state(m.from_user.id)
     == UserState.WAITING_DESIGN_DESIGN_SCREEN,
 )
-@lock_input(allow_media_groups=True)
 def handle_design_screen(message):
     user_id = message.from_user.id
     data = user_content_storage.get_data(user_id, "design")
@@ -1945,7 +1865,7 @@ def handle_design_screen(message):
         "unique_id": message.photo[-1].file_unique_id,
     }
 
-    data["design_screen"].append(photo_data)
+    data.design_screen.append(photo_data)
     user_content_storage.update_data(user_id, data)
 
     bot.set_state(user_id, UserState.WAITING_DESIGN_GAME_SCREENS)
@@ -1960,58 +1880,52 @@ def handle_design_screen(message):
     func=lambda m: bot.get_state(m.from_user.id)
     == UserState.WAITING_DESIGN_GAME_SCREENS,
 )
-@lock_input(allow_media_groups=True)
 def handle_game_screens(message):
     user_id = message.from_user.id
     data = user_content_storage.get_data(user_id, "design")
 
-    try:
-        # Удаляем предыдущее сообщение с прогрессом
-        if data.get("progress_message_id"):
-            bot.delete_message(message.chat.id, data["progress_message_id"])
-    except Exception as e:
-        logger.warning(f"Не удалось удалить сообщение: {e}")
-
-    # 1. Определяем оригинальное изображение (последний элемент всегда наибольший)
-    original_photo = message.photo[-1]
+    # 1. Сохраняем только оригиналы (альбом приходит целиком)
+    added, duplicates, overflow = collect_photos(message, data.game_screens, 9)
 
-    # 2. Группируем все превью этого изображения по уникальному ID оригинала
-    unique_id = original_photo.file_unique_id
+    # 2. Проверяем лимит
+    if overflow:
+        bot.reply_to(message, "❌ Достигнут максимум 9 скриншотов")
+        if not added:
+            return
 
     # 3. Проверяем дубликаты
-    existing_ids = {p["unique_id"] for p in data.get("game_screens", [])}
-    if unique_id in existing_ids:
+    elif not added:
         bot.reply_to(message, "❌ Это изображение уже было добавлено")
         return
 
-    # 4. Проверяем лимит
-    if len(data.get("game_screens", [])) >= 9:
-        bot.reply_to(message, "❌ Достигнут максимум 9 скриншотов")
-        return
+    # 4. Отправляем подтверждение - одно на альбом
+    send_game_screens_progress(message)
 
-    # 5. Сохраняем только оригинал
-    data.setdefault("game_screens", []).append(
-        {"file_id": original_photo.file_id, "unique_id": unique_id}
-    )
 
-    # 6. Обновляем хранилище
-    user_content_storage.update_data(user_id, data)
+def send_game_screens_progress(message):
+    user_id = message.from_user.id
+    data = user_content_storage.get_data(user_id, "design")
+
+    try:
+        # Удаляем предыдущее сообщение с прогрессом
+        if data.progress_message_id:
+            call_soon("delete_message", message.chat.id, data.progress_message_id)
+    except Exception as e:
+        logger.warning(f"Не удалось удалить сообщение: {e}")
 
     # Добавим графический индикатор
-    progress_bar = "🟪" * len(data["game_screens"]) + "⬜" * (
-        9 - len(data["game_screens"])
+    progress_bar = "🟪" * len(data.game_screens) + "⬜" * (
+        9 - len(data.game_screens)
     )
 
-    # 7. Отправляем подтверждение
     sent_msg = bot.reply_to(
         message,
         f"{progress_bar}\n"
-        f"✅ Скриншот добавлен, всего: {len(data['game_screens'])}/9\n"
+        f"✅ Скриншот добавлен, всего: {len(data.game_screens)}/9\n"
         "Отправьте еще или нажмите /done\n\n🚫 Для отмены используйте /cancel",
     )
     # Сохраняем ID сообщения для последующего удаления
-    data["progress_message_id"] = sent_msg.message_id
-    user_content_storage.update_data(user_id, data)
+    data.progress_message_id = sent_msg.message_id
 
 
 @bot.message_handler(
@@ -2019,14 +1933,13 @@ def handle_game_screens(message):
     func=lambda message: bot.get_state(message.from_user.id)
     == UserState.WAITING_DESIGN_GAME_SCREENS,
 )
-@lock_input()
 def handle_done(message):
     user_id = message.from_user.id
     data = user_content_storage.get_data(user_id, "design")
 
     try:
-        if data.get("progress_message_id"):
-            bot.delete_message(message.chat.id, data["progress_message_id"])
+        if data.progress_message_id:
+            call_soon("delete_message", message.chat.id, data.progress_message_id)
     except Exception as e:
         logger.warning(f"Ошибка удаления прогресса: {e}")
 
@@ -2034,10 +1947,18 @@ def handle_done(message):
 
 
 def preview_send_to_news_chat(user_id):
+    # Данные отправителя - запросом к Bot API, предпросмотр - по ответу
+    dispatcher.then(
+        call_soon("get_chat", user_id),
+        partial(show_news_preview, user_id),
+        on_error=partial(news_preview_failed, user_id),
+    )
+
+
+def show_news_preview(user_id, user):
     try:
         # Получаем данные из хранилища
         data = user_content_storage.get_data(user_id, "design")
-        user = bot.get_chat(user_id)
         logger = logging.getLogger(__name__)
 
         # Формируем информацию об отправителе
@@ -2068,17 +1989,17 @@ def preview_send_to_news_chat(user_id):
         text = ""
 
         # Обработка для каждого типа контента
-        if data["type"] == "news":
+        if data.type == "news":
             text = f"{ButtonText.USER_NEWS_NEWS}\n"
-            if data.get("description"):
-                text += f"\n📝 {data['description']}"
-            text += f"\n👤 Спикер: {data.get('speaker', 'Не указан')}"
-            text += f"\n🏝️ Остров: {data.get('island', 'Не указан')}"
+            if data.description:
+                text += f"\n📝 {data.description}"
+            text += f"\n👤 Спикер: {data.speaker or 'Не указан'}"
+            text += f"\n🏝️ Остров: {data.island or 'Не указан'}"
 
             # Формируем медиагруппу с дедупликацией
             seen_ids = set()
             unique_photos = []
-            for photo in data["photos"]:
+            for photo in data.photos:
                 if photo["unique_id"] not in seen_ids:
                     seen_ids.add(photo["unique_id"])
                     unique_photos.append(photo)
@@ -2086,16 +2007,16 @@ def preview_send_to_news_chat(user_id):
             # Формируем медиагруппу
             media = [types.InputMediaPhoto(p["file_id"]) for p in unique_photos[:10]]
 
-        elif data["type"] == "code":
+        elif data.type == "code":
             text = f"Отправка кода (сон или курорт)\n"
-            text += f"\nКод: {data.get('code', 'Не указан')}"
-            text += f"\n👤 Спикер: {data.get('speaker', 'Не указан')}"
-            text += f"\n🏝️ Остров: {data.get('island', 'Не указан')}"
+            text += f"\nКод: {data.code or 'Не указан'}"
+            text += f"\n👤 Спикер: {data.speaker or 'Не указан'}"
+            text += f"\n🏝️ Остров: {data.island or 'Не указан'}"
 
             # Дедупликация фото
             seen_ids = set()
             unique_photos = []
-            for photo in data["photos"]:
+            for photo in data.photos:
                 if photo["unique_id"] not in seen_ids:
                     seen_ids.add(photo["unique_id"])
                     unique_photos.append(photo)
@@ -2103,13 +2024,13 @@ def preview_send_to_news_chat(user_id):
             # Формируем медиагруппу
             media = [types.InputMediaPhoto(p["file_id"]) for p in unique_photos[:10]]
 
-        elif data["type"] == "pocket":
+        elif data.type == "pocket":
             text = f"{ButtonText.USER_NEWS_POCKET}"
 
             # Проверка уникальности
             seen_ids = set()
             unique_photos = []
-            for photo in data["photos"]:
+            for photo in data.photos:
                 if photo["unique_id"] not in seen_ids:
                     seen_ids.add(photo["unique_id"])
                     unique_photos.append(photo)
@@ -2122,19 +2043,19 @@ def preview_send_to_news_chat(user_id):
                 types.InputMediaPhoto(unique_photos[1]["file_id"]),
             ]
 
-        elif data["type"] == "design":
+        elif data.type == "design":
             text = f"{ButtonText.USER_NEWS_DESIGN}\n"
-            text += f"\nКод: {data.get('code', 'Не указан')}"
+            text += f"\nКод: {data.code or 'Не указан'}"
 
             # Основной скриншот
-            if not data.get("design_screen"):
+            if not data.design_screen:
                 raise ValueError("Отсутствует скриншот дизайна")
 
-            media = [types.InputMediaPhoto(data["design_screen"][0]["file_id"])]
+            media = [types.InputMediaPhoto(data.design_screen[0]["file_id"])]
 
             # Игровые скриншоты
             seen_ids = set()
-            for photo in data.get("game_screens", []):
+            for photo in data.game_screens:
                 if photo["unique_id"] not in seen_ids:
                     media.append(types.InputMediaPhoto(photo["file_id"]))
                     seen_ids.add(photo["unique_id"])
@@ -2148,39 +2069,50 @@ def preview_send_to_news_chat(user_id):
             "user_info": user_info,
         }
 
-        # Отправляем превью пользователю
+        def confirm(_=None):
+            bot.send_message(user_id, text)
+            confirm_markup = types.InlineKeyboardMarkup()
+            confirm_markup.row(
+                types.InlineKeyboardButton(
+                    "✅ Подтвердить отправку", callback_data=f"news_confirm_{user_id}"
+                ),
+                types.InlineKeyboardButton(
+                    "🚫 Отменить", callback_data=f"news_cancel_{user_id}"
+                ),
+            )
+            bot.send_message(
+                user_id,
+                "Это предпросмотр вашей публикации. Все верно?",
+                reply_markup=confirm_markup,
+            )
+
+        # Отправляем превью пользователю: кнопки - после фото
         if media:
-            bot.send_media_group(user_id, media)
-        bot.send_message(user_id, text)
-        confirm_markup = types.InlineKeyboardMarkup()
-        confirm_markup.row(
-            types.InlineKeyboardButton(
-                "✅ Подтвердить отправку", callback_data=f"news_confirm_{user_id}"
-            ),
-            types.InlineKeyboardButton(
-                "🚫 Отменить", callback_data=f"news_cancel_{user_id}"
-            ),
-        )
-        bot.send_message(
-            user_id,
-            "Это предпросмотр вашей публикации. Все верно?",
-            reply_markup=confirm_markup,
-        )
+            dispatcher.then(
+                call_soon("send_media_group", user_id, media),
+                confirm,
+                on_error=partial(news_preview_failed, user_id),
+            )
+        else:
+            confirm()
 
     except Exception as e:
-        error_msg = f"❌ Ошибка: {str(e)}"
-        logger.error(error_msg, exc_info=True)
-        bot.send_message(
-            user_id,
-            "❌ Произошла ошибка\nПопробуйте начать заново.",
-            reply_markup=Menu.back_only_main_menu(),
-        )
+        news_preview_failed(user_id, e)
+
+
+def news_preview_failed(user_id, error):
+    error_msg = f"❌ Ошибка: {str(error)}"
+    logger.error(error_msg, exc_info=error)
+    bot.send_message(
+        user_id,
+        "❌ Произошла ошибка\nПопробуйте начать заново.",
+        reply_markup=Menu.back_only_main_menu(),
+    )
 
 
 @bot.callback_query_handler(
     func=lambda call: call.data.startswith(("news_confirm_", "news_cancel_")),
 )
-@lock_input()
 def handle_preview_actions_send_to_news_chat(call):
     user_id = call.from_user.id
     action, target_user_id = call.data.split("_")[-2:]
@@ -2211,24 +2143,42 @@ def handle_preview_actions_send_to_news_chat(call):
 
             # Отправка в целевой чат
             # Отправка медиагруппы
+            relay = None
             if data["media"]:
                 logger.debug(f"Отправка медиагруппы из {len(data['media'])} элементов")
-                bot.send_media_group(target_chat, data["media"])
-                bot.send_message(
-                    target_chat,
-                    text=f"Текст:\n{data['text']}\n\nИнфо о пользователе:\n{data['user_info']}\n\nХотите ответить?",
-                    reply_markup=markup,
+                relay = relays.put(
+                    api_call("send_media_group", target_chat, data["media"]),
+                    api_call(
+                        "send_message",
+                        target_chat,
+                        text=f"Текст:\n{data['text']}\n\nИнфо о пользователе:\n{data['user_info']}\n\nХотите ответить?",
+                        reply_markup=markup,
+                    ),
                 )
 
-            bot.answer_callback_query(
-                call.id,
-                "✅ Публикация отправлена",
-            )
-            bot.send_message(
-                user_id,
-                "Вернуться в главное меню?",
-                reply_markup=Menu.back_only_main_menu(),
-            )
+            if relay is not None:
+                # На нажатие отвечаем сразу, а пересылка ещё ждёт очереди -
+                # о её итоге пользователь узнает отдельным сообщением
+                bot.answer_callback_query(
+                    call.id,
+                    "⏳ Публикация поставлена в очередь на отправку",
+                )
+                reply_after_relay(
+                    relay,
+                    user_id,
+                    "✅ Публикация отправлена\n\nВернуться в главное меню?",
+                    "❌ Не удалось отправить публикацию",
+                )
+            else:
+                bot.answer_callback_query(
+                    call.id,
+                    "✅ Публикация отправлена",
+                )
+                bot.send_message(
+                    user_id,
+                    "Вернуться в главное меню?",
+                    reply_markup=Menu.back_only_main_menu(),
+                )
         else:
             bot.answer_callback_query(
                 call.id,
@@ -2241,7 +2191,7 @@ def handle_preview_actions_send_to_news_chat(call):
             )
 
         # Удаляем сообщение с кнопками
-        bot.delete_message(call.message.chat.id, call.message.message_id)
+        call_soon("delete_message", call.message.chat.id, call.message.message_id)
 
     except Exception as e:
         logger.error(f"handle_preview_actions_send_to_news_chat error:\n{e}")
@@ -2253,8 +2203,7 @@ def handle_preview_actions_send_to_news_chat(call):
     finally:
         # Гарантированная очистка данных
         # Очищаем хранилище
-        if user_id in temp_storage:
-            del temp_storage[user_id]
+        temp_storage.pop(user_id, None)
         user_content_storage.clear(user_id)
         bot.delete_state(user_id)
         logger.debug("Данные пользователя очищены")
@@ -0,0 +1,97 @@
+import hmac
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telebot import types
+
+logger = logging.getLogger(__name__)
+
+# Заголовок, в котором Telegram присылает secret_token из setWebhook
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# Апдейт больше этого размера не принимается (байт)
+MAX_BODY = 1024 * 1024
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 - Telegram держит соединения открытыми между апдейтами
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        if self.path != server.path:
+            return self._reply(404)
+        # http.server декодирует заголовки как latin-1 - обратное кодирование
+        # даёт исходные байты; compare_digest не принимает строки не из ASCII
+        secret = self.headers.get(SECRET_HEADER, "").encode("latin-1")
+        if server.secret_token and not hmac.compare_digest(secret, server.secret_bytes):
+            server.count("forbidden")
+            return self._reply(403)
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            return self._reply(400)
+        if length <= 0 or length > MAX_BODY:
+            return self._reply(413 if length > MAX_BODY else 400)
+        try:
+            update = types.Update.de_json(json.loads(self.rfile.read(length)))
+        except Exception as e:
+            logger.warning(f"Некорректный апдейт от вебхука: {e}")
+            server.count("invalid")
+            return self._reply(400)
+        # Апдейт только ставится в очередь пользователя (AlbumBot) - отвечаем
+        # Telegram сразу, не дожидаясь обработки
+        server.bot.process_new_updates([update])
+        server.count("accepted")
+        self._reply(200)
+
+    def do_GET(self):
+        self._reply(404)
+
+    def _reply(self, status):
+        if status != 200:
+            # Тело запроса могло остаться непрочитанным - соединение
+            # дальше использовать нельзя
+            self.close_connection = True
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug(f"Вебхук {self.address_string()}: {format % args}")
+
+
+class WebhookServer(ThreadingHTTPServer):
+    """Приём апдейтов от Telegram вместо infinity_polling
+
+    Принимает POST на path, проверяет заголовок с secret_token и передаёт
+    апдейт bot.process_new_updates. HTTPS обычно завершается на обратном
+    прокси (nginx), который проксирует запросы на этот сервер.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, bot, host="127.0.0.1", port=8080, path="/webhook", secret_token=None):
+        super().__init__((host, port), _WebhookHandler)
+        self.bot = bot
+        self.path = path
+        self.secret_token = secret_token
+        self.secret_bytes = secret_token.encode() if secret_token else b""
+        self.metrics = {"accepted": 0, "forbidden": 0, "invalid": 0}
+        # Запросы обрабатываются в потоках сервера - счётчики под блокировкой
+        self._metrics_lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def count(self, name):
+        with self._metrics_lock:
+            self.metrics[name] += 1
+
+    def stats(self):
+        with self._metrics_lock:
+            return dict(self.metrics)
@@ -1,11 +1,23 @@
 import logging
+from urllib.parse import urlparse
 from telebot import types
 from bot_instance import bot
 import handlers.admin
 import handlers.user
 import database.db_classes
+from database.connection import db
+from database.deadlines import deadlines
+from database.executor import db_executor
+from database.migrations import migrate
 from database.db_classes import user_content_storage
-from handlers.envParams import admin_ids
+from handlers.dispatcher import dispatcher
+from handlers.envParams import WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_SECRET, WEBHOOK_URL
+from handlers.media_groups import albums
+from handlers.notifications import notifications, relays, runtime
+from handlers.outbound import outbound
+from handlers.review import review_sessions
+from handlers.roles import Role, UserRoles
+from handlers.webhook import WebhookServer
 from menu.constants import ButtonCallback
 from menu.menu import Menu
 
@@ -15,6 +27,8 @@ logging.basicConfig(
     level=logging.DEBUG,
 )
 
+ALLOWED_UPDATES = ["message", "callback_query"]
+
 
 # После нажатия старт - проверка в списке админов, выдача меню админа или пользователя
 @bot.message_handler(commands=["start"])
@@ -29,7 +43,7 @@ def start(message):
         user_content_storage.clear(user_id)
 
         # Проверка администратора
-        if message.from_user.id in admin_ids:
+        if Role.ADMIN in UserRoles.get(user_id):
             logger.debug(f"Admin detected - {user_id}")
             main_menu = Menu.adm_menu()
             welcome_text = "Добро пожаловать, администратор👑"
@@ -59,7 +73,8 @@ def start(message):
 def handle_back(call):
     logger = logging.getLogger(__name__)
     logger.debug(f"Received callback: {call.data}, chat_id: {call.message.chat.id}")
-    if call.message.chat.id in admin_ids:
+    if Role.ADMIN in UserRoles.get(call.message.chat.id):
+        review_sessions.cancel(call.from_user.id)
         main_menu = Menu.adm_menu()
     else:
         main_menu = Menu.user_menu()
@@ -71,5 +86,56 @@ def handle_back(call):
     )
 
 
+def run_webhook():
+    """Приём апдейтов HTTP-сервером: Telegram сам присылает их на WEBHOOK_URL"""
+    server = WebhookServer(
+        bot,
+        host=WEBHOOK_HOST,
+        port=WEBHOOK_PORT,
+        path=urlparse(WEBHOOK_URL).path or "/",
+        secret_token=WEBHOOK_SECRET,
+    )
+    bot.set_webhook(
+        url=WEBHOOK_URL,
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=ALLOWED_UPDATES,
+    )
+    logging.getLogger(__name__).info(
+        f"Вебхук {WEBHOOK_URL} -> {WEBHOOK_HOST}:{WEBHOOK_PORT}"
+    )
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def run_polling():
+    # Пока установлен вебхук, getUpdates недоступен
+    bot.remove_webhook()
+    bot.infinity_polling(allowed_updates=ALLOWED_UPDATES)
+
+
 if __name__ == "__main__":
-    bot.infinity_polling(allowed_updates=["message", "callback_query"])
+    # Схема БД обновляется один раз при старте, до приёма апдейтов
+    migrate()
+    # Загружаем множества ролей (ЧС, судьи, участники) в память
+    UserRoles.refresh()
+    # Исходящие запросы - через планировщик с лимитами Telegram
+    outbound.install()
+    try:
+        if WEBHOOK_URL:
+            run_webhook()
+        else:
+            run_polling()
+    finally:
+        deadlines.shutdown()
+        albums.shutdown()
+        # Дообрабатываем апдейты, уже стоящие в очередях пользователей
+        dispatcher.shutdown()
+        # Досылаем поставленные в очередь пересылки и уведомления
+        relays.shutdown()
+        notifications.shutdown()
+        if runtime is not None:
+            runtime.shutdown()
+        db_executor.shutdown()
+        db.close_all()
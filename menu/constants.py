@@ -2,6 +2,9 @@ class ButtonText:
     # Кнопки назад
     BACK = "🔙 Назад"
     MAIN_MENU = "🏠 В главное меню"
+    # Листание страниц
+    PAGE_PREV = "◀️"
+    PAGE_NEXT = "▶️"
 
     # Пользовательские
     USER_HELP = "🆘 Помощь"
@@ -44,6 +47,11 @@ class ButtonText:
     ADM_SHOW_JUDGES = "⚖️ Список судей"
     ADM_APPROVE = "✅ Одобрить"
     ADM_REJECT = "❌ Отклонить"
+    ADM_NEXT_PENDING = "⏭ Следующая работа"
+    ADM_BATCH = "☑️ Пакетная модерация"
+    ADM_BATCH_ALL = "Выбрать все на странице"
+    ADM_BATCH_APPROVE = "✅ Одобрить выбранные"
+    ADM_BATCH_REJECT = "❌ Отклонить выбранные"
     ADM_CONTEST_RESET = "Сбросить счётчик работ"
 
 
@@ -86,6 +94,12 @@ class ButtonCallback:
     ADM_SHOW_JUDGES = "adm_show_judges"
     ADM_APPROVE = "adm_approve_"
     ADM_REJECT = "adm_reject_"
+    ADM_NEXT_PENDING = "adm_next_pending"
+    ADM_BATCH = "adm_batch"
+    ADM_BATCH_TOGGLE = "adm_batch_toggle_"
+    ADM_BATCH_ALL = "adm_batch_all"
+    ADM_BATCH_APPROVE = "adm_batch_approve"
+    ADM_BATCH_REJECT = "adm_batch_reject"
 
 
 class ConstantLinks:
@@ -17,6 +17,42 @@ class Menu:
 
         return back_menu
 
+    @staticmethod
+    def add_page_navigation(markup, callback_prefix, page):
+        """Добавляет ряд ◀️ ▶️ для страницы списка (если есть куда листать)
+
+        callback_data: "<prefix>:p:<id>" - назад, "<prefix>:n:<id>" - вперёд
+        """
+        buttons = []
+        if page.prev_cursor is not None:
+            buttons.append(
+                types.InlineKeyboardButton(
+                    text=ButtonText.PAGE_PREV,
+                    callback_data=f"{callback_prefix}:p:{page.prev_cursor}",
+                )
+            )
+        if page.next_cursor is not None:
+            buttons.append(
+                types.InlineKeyboardButton(
+                    text=ButtonText.PAGE_NEXT,
+                    callback_data=f"{callback_prefix}:n:{page.next_cursor}",
+                )
+            )
+        if buttons:
+            markup.row(*buttons)
+        return markup
+
+    @staticmethod
+    def add_next_pending(markup, submission_id):
+        """Добавляет кнопку перехода к следующей работе на модерации"""
+        markup.row(
+            types.InlineKeyboardButton(
+                text=ButtonText.ADM_NEXT_PENDING,
+                callback_data=f"{ButtonCallback.ADM_NEXT_PENDING}:{submission_id}",
+            )
+        )
+        return markup
+
     @staticmethod
     def user_to_admin_or_main_menu():
         """Пользовательское меню - написать админам или назад в главное"""
@@ -282,6 +318,12 @@ class Menu:
                 callback_data=ButtonCallback.ADM_REVIEW_WORKS,
             ),
         )
+        menu.add(
+            types.InlineKeyboardButton(
+                text=ButtonText.ADM_BATCH,
+                callback_data=ButtonCallback.ADM_BATCH,
+            ),
+        )
         menu.add(
             types.InlineKeyboardButton(
                 text=ButtonText.ADM_CONTEST_STATS,